@@ -0,0 +1,148 @@
+"""Conversion of several workbooks at once, fanned out across a bounded process pool."""
+import json
+import posixpath
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+from common_entities import InvalidDataModelError
+from converter.pipeline import excel_to_model
+from datamodel.model import DataModelEncoder
+
+MANIFEST_NAME = "manifest.json"
+WORKBOOK_EXTENSION = ".xlsx"
+
+
+class InvalidBatchError(Exception):
+    """Exception raised for uploads that cannot be processed as a batch."""
+
+
+def convert_workbook(name, content):
+    """
+    Validates and converts a single workbook of a batch, in a worker process.
+    Returns its manifest entry and its pretty-printed data model, or None when it failed.
+    """
+    try:
+        data_model = excel_to_model(BytesIO(content))
+    except InvalidDataModelError as e:
+        return {"file": name, "status": "invalid", "error": str(e)}, None
+    except Exception as e:
+        return {"file": name, "status": "failed", "error": str(e)}, None
+    return {"file": name, "status": "converted"}, json.dumps(data_model, indent=4, cls=DataModelEncoder)
+
+
+def read_zip_workbooks(stream, max_files, max_bytes):
+    """Yields the (name, content) of the workbooks of a zip archive, skipping other entries."""
+    try:
+        archive = zipfile.ZipFile(stream)
+    except zipfile.BadZipFile:
+        raise InvalidBatchError("The uploaded archive is not a valid zip file.")
+    with archive:
+        entries = [
+            info
+            for info in archive.infolist()
+            if not info.is_dir()
+            and info.filename.lower().endswith(WORKBOOK_EXTENSION)
+            and not posixpath.basename(info.filename).startswith(("._", "~$"))
+            and not info.filename.startswith("__MACOSX/")
+        ]
+        check_batch_size(len(entries), sum(info.file_size for info in entries), max_files, max_bytes)
+        for info in entries:
+            yield info.filename, archive.read(info)
+
+
+def check_batch_size(file_count, total_bytes, max_files, max_bytes):
+    """Rejects empty batches and batches over the file count or size limits."""
+    if not file_count:
+        raise InvalidBatchError("No .xlsx workbooks found in the upload.")
+    if file_count > max_files:
+        raise InvalidBatchError(f"A batch can contain at most {max_files} workbooks, got {file_count}.")
+    if total_bytes > max_bytes:
+        raise InvalidBatchError(f"A batch can contain at most {max_bytes} bytes of workbooks, got {total_bytes}.")
+
+
+def collect_workbooks(files, max_files, max_bytes):
+    """
+    Returns the (name, content) of the uploaded workbooks, either a zip archive
+    under the 'file' field or any number of workbooks under the 'files' field.
+    """
+    uploads = [file for file in files.getlist("files") if file.filename]
+    archive = files.get("file")
+    if archive and archive.filename:
+        return list(read_zip_workbooks(archive.stream, max_files, max_bytes))
+    if not uploads:
+        raise InvalidBatchError("No zip archive or workbooks provided.")
+    workbooks = [(file.filename, file.read()) for file in uploads]
+    check_batch_size(len(workbooks), sum(len(content) for _, content in workbooks), max_files, max_bytes)
+    return workbooks
+
+
+def output_name(name, used_names):
+    """
+    Names the JSON model of a workbook after it, without clashing with the other outputs
+    or pointing outside of the archive.
+    """
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".", "..")]
+    stem = posixpath.splitext("/".join(parts))[0] or "data_model"
+    candidate, suffix = f"{stem}.json", 1
+    while candidate in used_names or candidate == MANIFEST_NAME:
+        suffix += 1
+        candidate = f"{stem}_{suffix}.json"
+    used_names.add(candidate)
+    return candidate
+
+
+class BatchConverter:
+    """
+    Converts the workbooks of a batch on a process pool of at most max_workers processes.
+    The pool is created on first use, so that it is not inherited by forked gunicorn workers.
+    """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def _reset_pool(self, pool):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    def convert(self, workbooks):
+        """
+        Returns a zip archive with the JSON model of every converted workbook and a manifest
+        with the status of each one. A failing workbook does not affect the others.
+        """
+        pool = self._get_pool()
+        futures = [(name, pool.submit(convert_workbook, name, content)) for name, content in workbooks]
+        manifest, used_names = [], set()
+        output = BytesIO()
+        with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, future in futures:
+                try:
+                    entry, data_model = future.result()
+                except BrokenProcessPool as e:
+                    self._reset_pool(pool)
+                    entry, data_model = {"file": name, "status": "failed", "error": str(e)}, None
+                if data_model is not None:
+                    entry["output"] = output_name(name, used_names)
+                    archive.writestr(entry["output"], data_model)
+                manifest.append(entry)
+            archive.writestr(MANIFEST_NAME, json.dumps(manifest, indent=4))
+        output.seek(0)
+        return output, manifest
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
@@ -0,0 +1,163 @@
+"""
+Times every stage of the conversions on a synthetic data model and writes the results as JSON.
+
+    python -m benchmarks.run --cdes 10000 --depth 3 --fan-out 4 --output results.json
+    python -m benchmarks.run --cdes 10000 --baseline results.json
+
+Run from the data_quality_tool directory. Each stage is timed on its own, fed with the output
+of the previous one, and repeated --repeat times.
+"""
+import argparse
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from io import BytesIO
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_data_model
+from common_entities import CONVERTER_VERSION, EXCEL_COLUMNS
+from controller import app
+from converter.excel_to_json import convert_excel_to_json
+from converter.excel_writer import write_excel_rows
+from converter.json_to_excel import convert_json_to_excel, iter_json_rows
+from converter.pipeline import excel_to_data_model, excel_to_model
+from datamodel.model import DataModelEncoder, load_json
+from validator.excel_validator import validate_excel
+from validator.json_validator import validate_json
+
+
+def write_workbook(data_model):
+    output = BytesIO()
+    write_excel_rows(output, EXCEL_COLUMNS, iter_json_rows(data_model))
+    return output.getvalue()
+
+
+def read_workbook(content):
+    return pd.read_excel(BytesIO(content), engine="openpyxl")
+
+
+def validate_json_request(data_model):
+    """A function posting the data model to /validate-json, end to end, from its JSON body to the response."""
+    client = app.test_client()
+    body = json.dumps(data_model)
+    # A new query string on every request, so that the response is never served from the result cache.
+    requests = itertools.count()
+
+    def post():
+        response = client.post(f"/validate-json?run={next(requests)}", data=body, content_type="application/json")
+        if response.status_code != 200:
+            raise RuntimeError(f"/validate-json failed: {response.get_data(as_text=True)}")
+
+    return post
+
+
+def stages(data_model):
+    """Yields the name of each stage along with a function running it on the output of the previous ones."""
+    yield "validate_json", lambda: validate_json(data_model)
+    yield "validate_json_endpoint", validate_json_request(data_model)
+    # The loading of a valid model into a DataModel, the one step /models adds to its validation.
+    yield "load_json", lambda: load_json(data_model)
+    yield "convert_json_to_excel", lambda: convert_json_to_excel(data_model)
+    content = write_workbook(data_model)
+    yield "xlsx_write", lambda: write_workbook(data_model)
+    df = read_workbook(content)
+    yield "workbook_read", lambda: read_workbook(content)
+    yield "validate_excel", lambda: validate_excel(df)
+    yield "convert_excel_to_json", lambda: convert_excel_to_json(df)
+    yield "excel_to_data_model", lambda: excel_to_data_model(BytesIO(content))
+    # What /excel-to-json runs: the single-pass conversion into a DataModel, then its pretty-printed encoding.
+    yield "excel_to_model", lambda: excel_to_model(BytesIO(content))
+    model = excel_to_model(BytesIO(content))
+    encoder = DataModelEncoder(indent=4)
+    yield "encode_model", lambda: encoder.encode(model)
+    yield "excel_to_json", lambda: encoder.encode(excel_to_model(BytesIO(content)))
+
+
+def time_stage(function, repeat):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    return {"seconds": seconds, "min": min(seconds), "median": statistics.median(seconds)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(parameters, repeat=3):
+    """Times every stage on the data model generated from parameters and returns the results."""
+    data_model = generate_data_model(**parameters)
+    results = {name: time_stage(function, repeat) for name, function in stages(data_model)}
+    return {
+        "commit": git_commit(),
+        "converter_version": CONVERTER_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "parameters": {**parameters, "repeat": repeat},
+        "stages": results,
+    }
+
+
+def compare(results, baseline):
+    """Returns a line per stage with its median time and its ratio to the baseline median."""
+    lines = []
+    for name, stage in results["stages"].items():
+        line = f"{name:<28}{stage['median']:>10.4f}s"
+        previous = baseline.get("stages", {}).get(name)
+        if previous:
+            line += f"{stage['median'] / previous['median']:>8.2f}x"
+        lines.append(line)
+    return lines
+
+
+def parse_arguments(arguments):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cdes", type=int, default=1000, help="number of CDEs besides the dataset one")
+    parser.add_argument("--depth", type=int, default=3, help="depth of the group tree")
+    parser.add_argument("--fan-out", type=int, default=4, help="number of sub groups of each group")
+    parser.add_argument("--enumeration-size", type=int, default=10, help="number of values of the nominal CDEs")
+    parser.add_argument("--nominal-share", type=float, default=0.5, help="share of nominal CDEs, the others are numeric")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="number of timings of each stage")
+    parser.add_argument("--output", help="file to write the results to, as JSON")
+    parser.add_argument("--baseline", help="results of a previous run to compare with")
+    return parser.parse_args(arguments)
+
+
+def main(arguments=None):
+    arguments = parse_arguments(arguments)
+    parameters = {
+        "cdes": arguments.cdes,
+        "depth": arguments.depth,
+        "fan_out": arguments.fan_out,
+        "enumeration_size": arguments.enumeration_size,
+        "nominal_share": arguments.nominal_share,
+        "seed": arguments.seed,
+    }
+    results = run_benchmarks(parameters, arguments.repeat)
+    baseline = {}
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            baseline = json.load(file)
+    print("\n".join(compare(results, baseline)))
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(results, file, indent=4)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Generator of synthetic, valid data models of any size, for benchmarking."""
+import random
+
+NUMERIC_TYPES = (("integer", "int"), ("real", "real"))
+
+
+def generate_groups(depth, fan_out):
+    """Returns the nested groups of a tree of the given depth and fan-out, along with a flat list of them."""
+    root_groups, flat = [], []
+    level = [("", root_groups)]
+    for _ in range(depth):
+        next_level = []
+        for prefix, siblings in level:
+            for index in range(fan_out):
+                code = f"group{prefix}_{index}"
+                group = {"code": code, "label": code, "variables": [], "groups": []}
+                siblings.append(group)
+                flat.append(group)
+                next_level.append((f"{prefix}_{index}", group["groups"]))
+        level = next_level
+    return root_groups, flat
+
+
+def generate_cde(rng, index, enumeration_size, nominal_share):
+    code = f"cde_{index}"
+    cde = {
+        "code": code,
+        "label": f"CDE {index}",
+        "description": f"Synthetic common data element {index}",
+        "methodology": "synthetic",
+    }
+    if rng.random() < nominal_share:
+        cde.update(
+            type="nominal",
+            sql_type="text",
+            isCategorical=True,
+            enumerations=[
+                {"code": f"{code}_{value}", "label": f"Value {value} of {code}"}
+                for value in range(enumeration_size)
+            ],
+        )
+    else:
+        cde_type, sql_type = rng.choice(NUMERIC_TYPES)
+        min_value = rng.randint(0, 100)
+        cde.update(
+            type=cde_type,
+            sql_type=sql_type,
+            isCategorical=False,
+            minValue=min_value,
+            maxValue=min_value + rng.randint(1, 1000),
+            units="units",
+        )
+    return cde
+
+
+def generate_data_model(cdes=1000, depth=3, fan_out=4, enumeration_size=10, nominal_share=0.5, seed=0):
+    """
+    Generates a valid data model with the dataset CDE at its root and cdes other CDEs, spread
+    over a tree of groups of the given depth (at least 1) and fan-out. A nominal_share of the
+    CDEs are nominal with enumeration_size values, the others are integer or real with a range.
+    The same arguments always give the same model.
+    """
+    if depth < 1 or fan_out < 1:
+        raise ValueError("A data model needs at least one group: depth and fan_out must be at least 1.")
+    rng = random.Random(seed)
+    groups, flat_groups = generate_groups(depth, fan_out)
+    for index in range(cdes):
+        group = flat_groups[index % len(flat_groups)]
+        group["variables"].append(generate_cde(rng, index, enumeration_size, nominal_share))
+    dataset = {
+        "code": "dataset",
+        "label": "Dataset",
+        "sql_type": "text",
+        "isCategorical": True,
+        "type": "nominal",
+        "enumerations": [{"code": "synthetic", "label": "Synthetic"}],
+    }
+    return {
+        "code": "synthetic",
+        "version": "1.0",
+        "label": "Synthetic",
+        "longitudinal": False,
+        "variables": [dataset],
+        "groups": groups,
+    }
@@ -1,3 +1,10 @@
+import json
+import re
+from json.decoder import scanstring
+
+# Version of the conversion logic, part of the result cache keys so that upgrades invalidate them.
+CONVERTER_VERSION = "0.1.0"
+
 # Mapping of Excel columns to JSON keys, adjust as necessary,
 # Did not contain the values because it is not in a 1 to 1 scenario.
 EXCEL_JSON_FIELDS_MAP = {
@@ -42,6 +49,130 @@ class InvalidDataModelError(Exception):
     """Exception raised for errors in the input data model."""
 
 
+# Default cap of the errors reported when collecting all validation errors.
+DEFAULT_MAX_ERRORS = 100
+
+
+class ErrorLimitReached(Exception):
+    """Raised by ValidationErrors.add once the maximum number of errors has been collected."""
+
+
+class ValidationErrors:
+    """
+    Collects the violations found in a single validation pass, each one with its location
+    (sheet row or JSON path), the id of the rule it breaks and a message.
+    """
+
+    def __init__(self, max_errors=DEFAULT_MAX_ERRORS):
+        self.max_errors = max_errors
+        self.errors = []
+        self.truncated = False
+
+    def add(self, rule, message, **location):
+        if len(self.errors) >= self.max_errors:
+            self.truncated = True
+            raise ErrorLimitReached()
+        self.errors.append({**location, "rule": rule, "message": message})
+
+    def __bool__(self):
+        return bool(self.errors)
+
+    def to_dict(self):
+        return {"errors": self.errors, "truncated": self.truncated}
+
+
+# JSON whitespace, allowed around the braces, strings and separators of the nominal values.
+WHITESPACE_REGEX = re.compile(r"[ \t\n\r]*")
+# The code and label are separated by a comma followed by at most one space, or by a colon.
+CODE_LABEL_SEPARATOR_REGEX = re.compile(r", ?|[ \t\n\r]*:[ \t\n\r]*")
+# An enumeration without escapes or control characters in its strings, the common case.
+ENUMERATION_ENTRY = r'\{{[ \t\n\r]*"{0}"(?:, ?|[ \t\n\r]*:[ \t\n\r]*)"{0}"[ \t\n\r]*\}}'
+ENUMERATION_ENTRY_REGEX = re.compile(ENUMERATION_ENTRY.format(r'([^"\\\x00-\x1f]*)'))
+# Nominal values made only of such enumerations, which can then be split with a single findall.
+ENUMERATIONS_REGEX = re.compile(
+    r"[ \t\n\r]*(?:{0}(?:[ \t\n\r]*,[ \t\n\r]*{0})*[ \t\n\r]*)?".format(
+        ENUMERATION_ENTRY.format(r'[^"\\\x00-\x1f]*')
+    )
+)
+
+
+class EnumerationSyntaxError(InvalidDataModelError):
+    """Raised by parse_enumerations, with the offset in the values where parsing failed and why."""
+
+    def __init__(self, values, position, reason):
+        super().__init__(
+            'Nominal values format error: \'{"code", "label"}, {"code", "label"}\' expected but got ' + values + "."
+        )
+        self.position = position
+        self.reason = reason
+
+
+def scan_enumeration_string(values, position):
+    """Reads the JSON string starting at position, returning it and the offset right after it."""
+    if values.startswith('"', position):
+        try:
+            return scanstring(values, position + 1, True)
+        except json.JSONDecodeError as e:
+            raise EnumerationSyntaxError(values, e.pos, e.msg)
+    raise EnumerationSyntaxError(values, position, "Expecting '\"'")
+
+
+def scan_enumeration(values, position):
+    """
+    Reads the enumeration starting at position, character by character, for the entries
+    the fast path does not match. Returns its (code, label) and the offset right after it.
+    """
+    if not values.startswith("{", position):
+        raise EnumerationSyntaxError(values, position, "Expecting '{'")
+    position = WHITESPACE_REGEX.match(values, position + 1).end()
+    code, position = scan_enumeration_string(values, position)
+    separator = CODE_LABEL_SEPARATOR_REGEX.match(values, position)
+    if separator is None:
+        raise EnumerationSyntaxError(values, position, "Expecting ',' between code and label")
+    position = separator.end()
+    label, position = scan_enumeration_string(values, position)
+    position = WHITESPACE_REGEX.match(values, position).end()
+    if not values.startswith("}", position):
+        raise EnumerationSyntaxError(values, position, "Expecting '}'")
+    return (code, label), position + 1
+
+
+def parse_enumerations(values):
+    """
+    Parses the nominal 'values' of a sheet row into a list of (code, label) pairs, in a single
+    pass over the string. Shared by the Excel validator and converter so that a row can be parsed
+    only once. Expected format: '{"code1", "label1"}, {"code2", "label2"}', the strings being
+    JSON strings. The code and label can also be separated by a colon, but a comma cannot have
+    whitespace before it or more than one space after it. Raises an EnumerationSyntaxError with
+    the offset of the first malformed character.
+    """
+    if not isinstance(values, str):
+        raise EnumerationSyntaxError(str(values), 0, "Expecting a string")
+    if ENUMERATIONS_REGEX.fullmatch(values):
+        return ENUMERATION_ENTRY_REGEX.findall(values)
+
+    enumerations = []
+    position = WHITESPACE_REGEX.match(values).end()
+    end = len(values)
+    while position < end:
+        match = ENUMERATION_ENTRY_REGEX.match(values, position)
+        if match is not None:
+            enumerations.append(match.groups())
+            position = match.end()
+        else:
+            enumeration, position = scan_enumeration(values, position)
+            enumerations.append(enumeration)
+        position = WHITESPACE_REGEX.match(values, position).end()
+        if position == end:
+            break
+        if values[position] != ",":
+            raise EnumerationSyntaxError(values, position, "Expecting ',' between enumerations")
+        position = WHITESPACE_REGEX.match(values, position + 1).end()
+        if position == end:
+            raise EnumerationSyntaxError(values, position, "Expecting '{'")
+    return enumerations
+
+
 JSON_EXCEL_FIELDS_MAP = {
     "label": "name",
     "code": "code",
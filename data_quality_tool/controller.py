@@ -1,25 +1,132 @@
 from flask import Flask, request, jsonify, send_file
 import json
 import logging
-from io import BytesIO
-import pandas as pd
+import os
+import tempfile
 from flask_cors import CORS
-from converter.excel_to_json import convert_excel_to_json
-from converter.json_to_excel import convert_json_to_excel
+from werkzeug.exceptions import RequestEntityTooLarge
+from batch import BatchConverter, InvalidBatchError, collect_workbooks
+from common_entities import DEFAULT_MAX_ERRORS, EXCEL_COLUMNS
+from datamodel.diff import diff_data_models
+from datamodel.model import load_json
+from datamodel.patch import JsonPatchError, JsonPatchTestFailed, patch_data_model
+from converter.excel_writer import CHUNK_SIZE, SPOOL_MAX_BYTES, iter_file_chunks, spool_excel_rows
+from converter.json_to_excel import iter_json_rows
+from converter.table_writer import EXPORT_MIMETYPES, EXPORT_WRITERS
+from converter.pipeline import convert_rows_to_model, excel_to_model
+from converter.row_reader import csv_delimiter, open_rows
+from instrumentation import instrument, record, record_failed_rules, timed, timed_rows
+from jobs import FAILED, STALE_AFTER_SECONDS, SUCCEEDED, JobRunner, JobStore
+from json_responses import json_response
+from metrics import exposition, observe_request
+from model_store import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    IndexedModel,
+    ModelStore,
+    cde_summary,
+    content_hash,
+    group_summary,
+    page,
+    stream_hash,
+)
+from request_logging import MAX_MESSAGE_LENGTH, PAYLOAD_MAX_BYTES, PayloadLogger, configure_logging, track_requests
+from result_cache import ResultCache, cached_response
+from uploads import UPLOAD_SPOOL_MAX_BYTES, SpooledUploadRequest, sheet_upload
 from validator import json_validator, excel_validator
 
 app = Flask(__name__)
+app.request_class = SpooledUploadRequest
+app.config["UPLOAD_SPOOL_MAX_BYTES"] = int(os.environ.get("UPLOAD_SPOOL_MAX_BYTES", UPLOAD_SPOOL_MAX_BYTES))
+# Larger bodies are rejected with a 413 before they are read.
+app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("MAX_CONTENT_LENGTH", 512 * 1024 * 1024))
 CORS(app, resources={r"/*": {"origins": "*"}})
+instrument(app, observers=[observe_request])
+track_requests(app)
 
-logging.basicConfig(level=logging.INFO)
+configure_logging(
+    level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+    max_message_length=int(os.environ.get("LOG_MAX_MESSAGE_LENGTH", MAX_MESSAGE_LENGTH)),
+)
 logger = logging.getLogger(__name__)
+payloads = PayloadLogger(
+    sample_rate=float(os.environ.get("LOG_PAYLOAD_SAMPLE_RATE", 0)),
+    max_bytes=int(os.environ.get("LOG_PAYLOAD_MAX_BYTES", PAYLOAD_MAX_BYTES)),
+)
+
+result_cache = ResultCache(
+    memory_max_bytes=int(os.environ.get("RESULT_CACHE_MEMORY_BYTES", 64 * 1024 * 1024)),
+    disk_directory=os.environ.get("RESULT_CACHE_DIR"),
+    disk_max_bytes=int(os.environ.get("RESULT_CACHE_DISK_BYTES", 1024 * 1024 * 1024)),
+)
+
+batch_converter = BatchConverter(max_workers=int(os.environ.get("BATCH_MAX_WORKERS", os.cpu_count() or 1)))
+BATCH_MAX_FILES = int(os.environ.get("BATCH_MAX_FILES", 100))
+BATCH_MAX_BYTES = int(os.environ.get("BATCH_MAX_BYTES", 512 * 1024 * 1024))
+
+MAX_ERRORS_LIMIT = int(os.environ.get("MAX_ERRORS_LIMIT", 10000))
+# The rule counted in the metrics for the first errors of validations that do not identify it.
+UNCLASSIFIED_RULE = "unclassified"
+
+EXCEL_SPOOL_MAX_BYTES = int(os.environ.get("EXCEL_SPOOL_MAX_BYTES", SPOOL_MAX_BYTES))
+EXCEL_CHUNK_SIZE = int(os.environ.get("EXCEL_CHUNK_SIZE", CHUNK_SIZE))
+
+job_runner = JobRunner(
+    JobStore(
+        path=os.environ.get("JOBS_DB_PATH", os.path.join(tempfile.gettempdir(), "data_quality_tool_jobs.sqlite3")),
+        ttl=int(os.environ.get("JOBS_TTL_SECONDS", 3600)),
+        stale_after=int(os.environ.get("JOBS_STALE_SECONDS", STALE_AFTER_SECONDS)),
+    ),
+    max_workers=int(os.environ.get("JOBS_MAX_WORKERS", 2)),
+)
+
+model_store = ModelStore(max_size=int(os.environ.get("MODEL_STORE_MAX_ELEMENTS", 1000000)))
+
+def collect_errors_requested():
+    """Whether the request opted in to collecting every validation error with '?collect_errors=true'."""
+    return request.args.get("collect_errors", "false").lower() in ("1", "true", "yes")
+
+def max_errors_requested():
+    """The '?max_errors=' cap of the collected validation errors, bounded by MAX_ERRORS_LIMIT."""
+    max_errors = request.args.get("max_errors", DEFAULT_MAX_ERRORS, type=int)
+    return min(max(max_errors, 1), MAX_ERRORS_LIMIT)
+
+def page_requested():
+    """The '?offset=' and '?limit=' of a listing, the limit being bounded by MAX_PAGE_SIZE."""
+    offset = request.args.get("offset", 0, type=int)
+    limit = request.args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+    return max(offset, 0), min(max(limit, 1), MAX_PAGE_SIZE)
+
+def export_format_requested():
+    """
+    The format of /json-to-excel, from '?format=' or else the Accept header, xlsx by default.
+    None when the requested format is not supported.
+    """
+    export_format = request.args.get("format")
+    if export_format is not None:
+        export_format = export_format.lower()
+        return export_format if export_format in EXPORT_MIMETYPES else None
+    formats = {mimetype: name for name, mimetype in EXPORT_MIMETYPES.items()}
+    return formats[request.accept_mimetypes.best_match(formats, default=EXPORT_MIMETYPES["xlsx"])]
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_entity_too_large(e):
+    logger.error("Request body over MAX_CONTENT_LENGTH rejected")
+    return jsonify({"error": f"The request body exceeds the limit of {app.config['MAX_CONTENT_LENGTH']} bytes"}), 413
 
 @app.route("/")
 def home():
     logger.info("Home endpoint accessed")
     return "Welcome to the Excel-JSON Converter API!"
 
+@app.route("/metrics")
+def metrics():
+    body, content_type = exposition()
+    return app.response_class(body, content_type=content_type)
+
 @app.route("/excel-to-json", methods=["POST"])
+@sheet_upload
+@cached_response(result_cache)
 def excel_to_json():
     logger.info("excel_to_json endpoint accessed")
     if "file" not in request.files:
@@ -31,70 +138,110 @@ def excel_to_json():
         return jsonify({"error": "No selected file"}), 400
     if file:
         try:
-            logger.info(f"Processing file: {file.filename}")
-            file_stream = BytesIO(file.read())
-            df = pd.read_excel(file_stream, engine="openpyxl")
-            logger.info("Excel file read into DataFrame")
-            excel_validator.validate_excel(df)
-            logger.info("Excel file validated")
-            json_data = convert_excel_to_json(df)
-            logger.info("Excel file converted to JSON")
-            pretty_json_data = json.dumps(json_data, indent=4)
-            logger.info("JSON data pretty-printed")
-            response = app.response_class(
-                response=pretty_json_data,
-                status=200,
-                mimetype='application/json'
-            )
-            return response
+            logger.info("Processing file: %s", file.filename)
+            # Opening the sheet and producing its rows are both timed as reading it.
+            with timed("read"), open_rows(file.stream, file.filename, file.mimetype) as (columns, rows):
+                with timed("validate_convert"):
+                    data_model = convert_rows_to_model(columns, timed_rows(rows))
+            record(cdes=data_model.cde_count)
+            logger.info("Excel file validated and converted to JSON")
+            with timed("serialize"):
+                return json_response(data_model)
         except Exception as e:
-            logger.error(f"Error processing file: {str(e)}")
+            logger.error("Error processing file: %s", e)
             return jsonify({"error": str(e)}), 500
 
 @app.route("/json-to-excel", methods=["POST"])
+@cached_response(result_cache)
 def json_to_excel():
     logger.info("json_to_excel endpoint accessed")
-    if not request.json:
+    with timed("parse"):
+        json_data = request.json
+    if not json_data:
         logger.error("No JSON provided in request")
         return jsonify({"error": "No JSON provided"}), 400
-    json_data = request.json
+    export_format = export_format_requested()
+    if export_format is None:
+        logger.error("Unsupported export format requested")
+        return jsonify({"error": f"Unsupported format, expected one of: {', '.join(EXPORT_MIMETYPES)}"}), 400
     try:
-        logger.info(f"Processing JSON data: {json_data}")
-        json_validator.validate_json(json_data)
-        logger.info("JSON data validated")
-        df = convert_json_to_excel(json_data)
-        logger.info("JSON data converted to Excel")
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-            df.to_excel(writer, index=False)
-        output.seek(0)
-        logger.info("Excel file created and saved to buffer")
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name="output.xlsx",
-            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        payloads.log(logger, "Processing JSON data")
+        with timed("validate"):
+            json_validator.validate_json(json_data)
+        cdes = json_validator.count_cdes(json_data)
+        record(cdes=cdes)
+        logger.info("JSON data validated: %d CDEs", cdes)
+        if export_format != "xlsx":
+            # The rows are all built before the response starts, so that a model whose rows cannot be exported
+            # gets an error rather than a cut-off file. Only their encoding is streamed.
+            with timed("convert"):
+                rows = list(iter_json_rows(json_data))
+            logger.info("Streaming %d rows as %s", len(rows), export_format)
+            return app.response_class(
+                EXPORT_WRITERS[export_format](EXCEL_COLUMNS, rows),
+                mimetype=EXPORT_MIMETYPES[export_format],
+                headers={"Content-Disposition": f"attachment; filename=output.{export_format}"},
+            )
+        with timed("write"):
+            output, size = spool_excel_rows(
+                EXCEL_COLUMNS, timed_rows(iter_json_rows(json_data), "convert"), EXCEL_SPOOL_MAX_BYTES
+            )
+        logger.info("Excel file of %d bytes created", size)
+        if size <= result_cache.max_entry_bytes:
+            # Small enough to be cached, so read back whole rather than streamed.
+            with output:
+                body = output.read()
+            return app.response_class(
+                body,
+                mimetype=EXPORT_MIMETYPES["xlsx"],
+                headers={"Content-Disposition": "attachment; filename=output.xlsx"},
+            )
+        return app.response_class(
+            iter_file_chunks(output, EXCEL_CHUNK_SIZE),
+            mimetype=EXPORT_MIMETYPES["xlsx"],
+            headers={
+                "Content-Disposition": "attachment; filename=output.xlsx",
+                "Content-Length": str(size),
+            },
         )
     except Exception as e:
-        logger.error(f"Error processing JSON: {str(e)}")
+        logger.error("Error processing JSON: %s", e)
         return jsonify({"error": str(e)}), 500
 
 @app.route("/validate-json", methods=["POST"])
+@cached_response(result_cache)
 def validate_json():
     logger.info("validate_json endpoint accessed")
-    if not request.json:
+    with timed("parse"):
+        json_data = request.json
+    if not json_data:
         logger.error("No JSON provided in request")
         return jsonify({"error": "No JSON provided"}), 400
-    json_data = request.json
+    payloads.log(logger, "Validating JSON data")
+    if collect_errors_requested():
+        with timed("validate"):
+            errors = json_validator.collect_json_errors(json_data, max_errors_requested())
+        if errors:
+            logger.error("JSON validation found %d errors", len(errors.errors))
+            record_failed_rules(error["rule"] for error in errors.errors)
+            return jsonify(errors.to_dict()), 400
+        record(cdes=json_validator.count_cdes(json_data))
+        logger.info("JSON data is valid")
+        return jsonify({"message": "Data model is valid."})
     try:
-        json_validator.validate_json(json_data)
+        with timed("validate"):
+            json_validator.validate_json(json_data)
+        record(cdes=json_validator.count_cdes(json_data))
         logger.info("JSON data is valid")
         return jsonify({"message": "Data model is valid."})
     except json_validator.InvalidDataModelError as e:
-        logger.error(f"JSON validation error: {str(e)}")
+        logger.error("JSON validation error: %s", e)
+        record_failed_rules([getattr(e, "rule", UNCLASSIFIED_RULE)])
         return jsonify({"error": str(e)}), 400
 
 @app.route("/validate-excel", methods=["POST"])
+@sheet_upload
+@cached_response(result_cache)
 def validate_excel():
     logger.info("validate_excel endpoint accessed")
     if "file" not in request.files:
@@ -106,17 +253,278 @@ def validate_excel():
         return jsonify({"error": "No selected file"}), 400
     if file:
         try:
-            logger.info(f"Processing file: {file.filename}")
-            file_stream = BytesIO(file.read())
-            df = pd.read_excel(file_stream, engine="openpyxl")
-            logger.info("Excel file read into DataFrame")
-            excel_validator.validate_excel(df)
+            logger.info("Processing file: %s", file.filename)
+            with timed("read"), open_rows(file.stream, file.filename, file.mimetype) as (columns, rows):
+                rows = timed_rows(rows)
+                if collect_errors_requested():
+                    with timed("validate"):
+                        errors = excel_validator.collect_excel_errors(columns, rows, max_errors_requested())
+                    if errors:
+                        logger.error("Excel validation found %d errors", len(errors.errors))
+                        record_failed_rules(error["rule"] for error in errors.errors)
+                        return jsonify(errors.to_dict()), 400
+                else:
+                    with timed("validate"):
+                        excel_validator.validate_excel_rows(columns, rows)
             logger.info("Excel file is valid")
             return jsonify({"message": "Data model is valid."})
         except json_validator.InvalidDataModelError as e:
-            logger.error(f"Excel validation error: {str(e)}")
+            logger.error("Excel validation error: %s", e)
+            record_failed_rules([getattr(e, "rule", UNCLASSIFIED_RULE)])
             return jsonify({"error": str(e)}), 400
 
+def read_data_model(side):
+    """
+    Reads and validates the side, 'old' or 'new', of a comparison, either a JSON model under
+    that key of the request body or a workbook or CSV/TSV sheet uploaded under that field.
+    """
+    if request.files:
+        file = request.files.get(side)
+        if not file or file.filename == "":
+            raise json_validator.InvalidDataModelError("no file uploaded")
+        with timed("read"):
+            return excel_to_model(file.stream, filename=file.filename, content_type=file.mimetype)
+    with timed("parse"):
+        json_data = request.get_json(silent=True) or {}
+    data_model = json_data.get(side) if isinstance(json_data, dict) else None
+    if not data_model:
+        raise json_validator.InvalidDataModelError("missing from the request body")
+    with timed("validate"):
+        json_validator.validate_json(data_model)
+    return data_model
+
+@app.route("/diff", methods=["POST"])
+@sheet_upload
+@cached_response(result_cache)
+def diff():
+    logger.info("diff endpoint accessed")
+    data_models = {}
+    for side in ("old", "new"):
+        try:
+            data_models[side] = read_data_model(side)
+        except json_validator.InvalidDataModelError as e:
+            logger.error("Invalid %s data model: %s", side, e)
+            return jsonify({"error": f"Invalid '{side}' data model: {e}"}), 400
+        except Exception as e:
+            logger.error("Error reading %s data model: %s", side, e)
+            return jsonify({"error": str(e)}), 500
+    with timed("diff"):
+        changes = diff_data_models(data_models["old"], data_models["new"])
+    logger.info("Data models compared: %s", changes["summary"])
+    with timed("serialize"):
+        return json_response(changes)
+
+@app.route("/patch-json", methods=["POST"])
+@cached_response(result_cache)
+def patch_json():
+    logger.info("patch_json endpoint accessed")
+    with timed("parse"):
+        json_data = request.json
+    if not isinstance(json_data, dict) or "data_model" not in json_data or "patch" not in json_data:
+        logger.error("No data model or patch provided in request")
+        return jsonify({"error": "Expected a JSON object with a 'data_model' and a 'patch'"}), 400
+    payloads.log(logger, "Patching JSON data")
+    try:
+        # The patch only revalidates what it touched, so the submitted model is validated whole first.
+        with timed("validate"):
+            json_validator.validate_json(json_data["data_model"])
+    except json_validator.InvalidDataModelError as e:
+        logger.error("Submitted data model is invalid: %s", e)
+        record_failed_rules([getattr(e, "rule", UNCLASSIFIED_RULE)])
+        return jsonify({"error": f"The submitted data model is invalid: {e}"}), 400
+    try:
+        with timed("patch"):
+            data_model = patch_data_model(json_data["data_model"], json_data["patch"])
+    except JsonPatchTestFailed as e:
+        logger.error("JSON patch test failed: %s", e)
+        return jsonify({"error": str(e)}), 409
+    except JsonPatchError as e:
+        logger.error("Invalid JSON patch: %s", e)
+        return jsonify({"error": str(e)}), 400
+    except json_validator.InvalidDataModelError as e:
+        logger.error("Patched data model is invalid: %s", e)
+        record_failed_rules([getattr(e, "rule", UNCLASSIFIED_RULE)])
+        return jsonify({"error": str(e)}), 400
+    logger.info("JSON patch of %d operations applied", len(json_data["patch"]))
+    with timed("serialize"):
+        return json_response(data_model)
+
+@app.route("/batch/excel-to-json", methods=["POST"])
+def batch_excel_to_json():
+    logger.info("batch_excel_to_json endpoint accessed")
+    try:
+        with timed("upload"):
+            workbooks = collect_workbooks(request.files, BATCH_MAX_FILES, BATCH_MAX_BYTES)
+    except InvalidBatchError as e:
+        logger.error("Invalid batch: %s", e)
+        return jsonify({"error": str(e)}), 400
+    logger.info("Processing batch of %d workbooks", len(workbooks))
+    with timed("convert"):
+        output, manifest = batch_converter.convert(workbooks)
+    record(workbooks=len(manifest))
+    converted = sum(entry["status"] == "converted" for entry in manifest)
+    logger.info("Batch processed, %d of %d workbooks converted", converted, len(manifest))
+    return send_file(
+        output,
+        as_attachment=True,
+        download_name="data_models.zip",
+        mimetype="application/zip",
+    )
+
+@app.route("/jobs/excel-to-json", methods=["POST"])
+@sheet_upload
+def submit_excel_to_json_job():
+    logger.info("submit_excel_to_json_job endpoint accessed")
+    if "file" not in request.files:
+        logger.error("No file part in request")
+        return jsonify({"error": "No file part"}), 400
+    file = request.files["file"]
+    if file.filename == "":
+        logger.error("No selected file")
+        return jsonify({"error": "No selected file"}), 400
+    # The job outlives the request and its upload stream.
+    content = file.read()
+    job_id = job_runner.submit(content, filename=file.filename, content_type=file.mimetype)
+    logger.info("Job %s submitted for file: %s", job_id, file.filename)
+    response = jsonify({"job_id": job_id, "status": "queued"})
+    response.headers["Location"] = f"/jobs/{job_id}"
+    return response, 202
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = job_runner.store.status(job_id)
+    if job is None:
+        return jsonify({"error": f"Job {job_id} not found"}), 404
+    return jsonify(job)
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    job = job_runner.store.result(job_id)
+    if job is None:
+        return jsonify({"error": f"Job {job_id} not found"}), 404
+    status, result, error, error_status = job
+    if status == FAILED:
+        return jsonify({"error": error}), error_status
+    if status != SUCCEEDED:
+        return jsonify({"error": f"Job {job_id} is {status}"}), 409
+    return json_response(json.loads(result))
+
+def model_summary(model_id, model):
+    data_model = model.data_model.to_json()
+    return {
+        "model_id": model_id,
+        "code": data_model.get("code"),
+        "label": data_model.get("label"),
+        "version": data_model.get("version"),
+        "cdes": model.cde_count,
+        "groups": len(model.groups),
+    }
+
+def model_not_found(model_id):
+    return jsonify({"error": f"Model {model_id} not found, load it with POST /models"}), 404
+
+@app.route("/models", methods=["POST"])
+@sheet_upload
+def load_model():
+    logger.info("load_model endpoint accessed")
+    if request.files:
+        file = request.files.get("file")
+        if not file or file.filename == "":
+            logger.error("No selected file")
+            return jsonify({"error": "No selected file"}), 400
+        # The same bytes read as a workbook, CSV or TSV give different models.
+        reader = csv_delimiter(file.filename, file.mimetype) or "xlsx"
+        model_id = stream_hash(file.stream, prefix=f"{reader}\0".encode())
+    else:
+        model_id = content_hash(request.get_data())
+    model = model_store.get(model_id)
+    status = 200
+    if model is None:
+        try:
+            if request.files:
+                with timed("validate_convert"):
+                    data_model = excel_to_model(file.stream, filename=file.filename, content_type=file.mimetype)
+            else:
+                with timed("parse"):
+                    json_data = request.get_json(silent=True)
+                if not json_data:
+                    logger.error("No JSON provided in request")
+                    return jsonify({"error": "No JSON provided"}), 400
+                with timed("validate"):
+                    json_validator.validate_json(json_data)
+                # Loaded only once valid, the store being the one step that needs the DataModel.
+                with timed("load"):
+                    data_model = load_json(json_data)
+        except json_validator.InvalidDataModelError as e:
+            logger.error("Model validation error: %s", e)
+            record_failed_rules([getattr(e, "rule", UNCLASSIFIED_RULE)])
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            logger.error("Error loading model: %s", e)
+            return jsonify({"error": str(e)}), 500
+        with timed("index"):
+            model = IndexedModel(data_model)
+        if not model_store.set(model_id, model):
+            logger.error("Model of %d elements over MODEL_STORE_MAX_ELEMENTS rejected", model.size)
+            return jsonify({
+                "error": f"The model has {model.size} CDEs, groups and enumerations, "
+                f"more than the {model_store.max_size} the store holds"
+            }), 413
+        status = 201
+        logger.info("Model %s loaded: %d CDEs", model_id, model.cde_count)
+    else:
+        logger.info("Model %s already loaded", model_id)
+    record(cdes=model.cde_count)
+    response = jsonify(model_summary(model_id, model))
+    response.headers["Location"] = f"/models/{model_id}"
+    return response, status
+
+@app.route("/models/<model_id>", methods=["GET"])
+def model_details(model_id):
+    model = model_store.get(model_id)
+    if model is None:
+        return model_not_found(model_id)
+    return jsonify(model_summary(model_id, model))
+
+@app.route("/models/<model_id>/cdes/<path:code>", methods=["GET"])
+def model_cde(model_id, code):
+    model = model_store.get(model_id)
+    if model is None:
+        return model_not_found(model_id)
+    cde = model.data_model.cde(code)
+    if cde is None:
+        return jsonify({"error": f"No CDE with code '{code}'"}), 404
+    return jsonify({**cde_summary(cde), "group": group_summary(cde.group, model)})
+
+def model_group(model_id):
+    """The stored model and its group at '?path=', the data model itself by default, or else an error response."""
+    model = model_store.get(model_id)
+    if model is None:
+        return None, None, model_not_found(model_id)
+    concept_path = request.args.get("path")
+    group = model.group(concept_path)
+    if group is None:
+        return model, None, (jsonify({"error": f"No group with concept path '{concept_path}'"}), 404)
+    return model, group, None
+
+@app.route("/models/<model_id>/cdes", methods=["GET"])
+def model_cdes(model_id):
+    model, group, error = model_group(model_id)
+    if error is not None:
+        return error
+    offset, limit = page_requested()
+    cdes, total = model.cdes_under(group, offset, limit)
+    return jsonify(page([cde_summary(cde) for cde in cdes], total, offset, limit))
+
+@app.route("/models/<model_id>/groups", methods=["GET"])
+def model_groups(model_id):
+    model, group, error = model_group(model_id)
+    if error is not None:
+        return error
+    offset, limit = page_requested()
+    groups, total = model.groups_under(group, offset, limit)
+    return jsonify(page([group_summary(sub_group, model) for sub_group in groups], total, offset, limit))
+
 if __name__ == '__main__':
     logger.info("Starting Flask server...")
     app.run(host='0.0.0.0', port=8000)
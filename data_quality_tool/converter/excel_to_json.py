@@ -1,7 +1,14 @@
 import pandas as pd
-import json
 
-from common_entities import EXCEL_TYPE_2_SQL_TYPE_ISCATEGORICAL_MAP, InvalidDataModelError
+from common_entities import EXCEL_TYPE_2_SQL_TYPE_ISCATEGORICAL_MAP, InvalidDataModelError, parse_enumerations
+from datamodel.model import (
+    JSON_OBJECT_TYPES,
+    CommonDataElement,
+    DataModelBuilder,
+    compact_enumerations,
+    expand_enumerations,
+    is_empty,
+)
 
 
 EXCEL_JSON_FIELDS_MAP_WITHOUT_VALUES = {
@@ -16,55 +23,24 @@ EXCEL_JSON_FIELDS_MAP_WITHOUT_VALUES = {
     "methodology": "methodology",
 }
 
-
-def process_enumerations(values):
+def process_enumerations(values, enumerations=None):
     """
     Parses a custom-formatted string into a list of dictionaries with 'code' and 'label'.
     Expected format: '{"code1", "label1"}, {"code2", "label2"}'.
+    The result of parse_enumerations can be passed to skip parsing 'values' again.
     """
-    # Transform the string to a JSON-compatible format
-    try:
-        # Transforming {"key","value"} into [{"key": "value"}]
-        transformed_values = "[" + values.replace('","', '":"').replace('", "', '": "') + "]"
-        enumerations = json.loads(transformed_values)
-    except json.JSONDecodeError:
-        raise InvalidDataModelError(
-            'Nominal values format error: \'{"code", "label"}, {"code", "label"}\' expected but got ' + values + "."
-        )
-    return [
-        {"code": list(item.keys())[0], "label": list(item.values())[0]}
-        for item in enumerations
-    ]
+    if enumerations is None:
+        enumerations = parse_enumerations(values)
+    return [{"code": code, "label": label} for code, label in enumerations]
 
 
-def insert_variable_into_structure(root, variable, path):
-    """
-    Insert a variable into the hierarchical structure based on the provided path.
-    """
-    # The last path element of the list is always the variable.
-    for part in path[:-1]:
-        # Find or create the group at the current level
-        found = False
-        for group in root["groups"]:
-            if group["code"] == part:
-                root = group
-                found = True
-                break
-
-        if not found:
-            new_group = {"code": part, "label": part, "groups": [], "variables": []}
-            root["groups"].append(new_group)
-            root = new_group
-
-    root["variables"].append(variable)
-
-
-def process_values_based_on_type(row, variable):
+def process_values_based_on_type(row, variable, enumerations=None):
     """
     Processes the 'values' field based on the variable's 'type':
     - For 'integer' or 'real', extracts 'minValue' and 'maxValue' from a range specified in 'values'
       and ensures these values are of the appropriate type.
-    - For 'nominal', retrieves a list of 'enumerations' from 'values'.
+    - For 'nominal', retrieves a list of 'enumerations' from 'values',
+      or from the already parsed 'enumerations' when given.
     """
     code = row.get("code")
     values = row.get("values")
@@ -103,7 +79,7 @@ def process_values_based_on_type(row, variable):
             raise InvalidDataModelError(
                 f"The 'values' should not be empty for variable {code} when type is 'nominal'"
             )
-        variable["enumerations"] = process_enumerations(values)
+        variable["enumerations"] = process_enumerations(values, enumerations)
 
 
 def validate_variable_type(row):
@@ -116,7 +92,7 @@ def validate_variable_type(row):
         )
 
 
-def process_variable(row):
+def process_variable(row, enumerations=None):
     """
     Processes a single row into a variable dictionary, applying validations
     and transformations based on the row's data.
@@ -132,7 +108,7 @@ def process_variable(row):
     }
 
     # Process 'values' based on variable type, which might modify 'variable' in-place
-    process_values_based_on_type(row, variable)
+    process_values_based_on_type(row, variable, enumerations)
 
     variable["sql_type"], variable["isCategorical"] = EXCEL_TYPE_2_SQL_TYPE_ISCATEGORICAL_MAP[variable["type"]]
 
@@ -140,44 +116,59 @@ def process_variable(row):
 
 
 def clean_empty_fields(data):
-    if isinstance(data, dict):  # If the item is a dictionary
-        keys_to_delete = [key for key, value in data.items() if (key in ['variables', 'groups', 'enumerations'] and not value) or value == ""]
-        for key in keys_to_delete:
-            del data[key]  # Delete the key if its value is an empty list or an empty string
-        for key in data:  # Recursively clean remaining dictionary items
-            clean_empty_fields(data[key])
+    """
+    Removes the empty 'variables', 'groups' and 'enumerations' lists and the empty strings, at any depth,
+    of JSON data or of an element of a datamodel.model.DataModel.
+    """
+    if isinstance(data, CommonDataElement) and type(data.enumerations) is tuple:
+        # Compacted enumerations are cleaned as they are, rather than expanded for good.
+        data.enumerations = compact_enumerations(expand_enumerations(data.enumerations), clean=True)
+    if isinstance(data, JSON_OBJECT_TYPES):
+        for key in [key for key in data.keys() if is_empty(key, data.get(key))]:
+            data.pop(key)  # Delete the key if its value is an empty list or an empty string
+        for key in data.keys():  # Recursively clean remaining items
+            clean_empty_fields(data.get(key))
     elif isinstance(data, list):  # If the item is a list, apply the function to each element
         for item in data:
             clean_empty_fields(item)
 
 
+def iter_variables_by_row(df):
+    """
+    Yields the variables of a normalised DataFrame by processing it row by row.
+    """
+    for _, row in df.iterrows():
+        yield process_variable(row.to_dict())
+
+
+def build_data_model(variables):
+    """
+    Builds the data model out of processed variables, placing each one in the group
+    hierarchy described by its 'conceptPath', and returns its JSON.
+    """
+    builder = DataModelBuilder()
+
+    try:
+        for variable in variables:
+            builder.insert(variable)
+    except InvalidDataModelError as e:
+        raise InvalidDataModelError(f"Error processing variable: {e}")
+
+    return builder.finish().to_dict()
+
+
 def convert_excel_to_json(df):
     """
     Converts a DataFrame from Excel into a JSON structure, handling enumerations specifically,
     and adds 'isCategorical' and 'sql_type' based on the 'type'.
     """
     df = df.astype(str).replace("nan", None)
-    root = {"variables": [], "groups": [], "code": "root"}
+    return build_data_model(iter_variables_by_row(df))
 
-    for _, row in df.iterrows():
-        try:
 
-            variable = process_variable(row.to_dict())
-            if "conceptPath" in variable and variable["conceptPath"] and variable["conceptPath"] != "None":
-                path = variable["conceptPath"].split("/")
-                del variable["conceptPath"]
-                insert_variable_into_structure(root, variable, path)
-            else:
-                raise InvalidDataModelError(
-                    f"The variable {variable['code']} is missing the conceptPath"
-                )
-        except InvalidDataModelError as e:
-            raise InvalidDataModelError(f"Error processing variable: {e}")
-
-    if root["groups"]:
-        data_model = root["groups"][0]
-        data_model["version"] = "to be defined"
-        clean_empty_fields(data_model)
-        return data_model
-    else:
-        return {"code": "No groups found", "groups": [], "variables": root["variables"]}
+def convert_excel_rows_to_json(rows):
+    """
+    Converts a stream of rows, as yielded by converter.row_reader, into a JSON structure
+    without materialising the sheet.
+    """
+    return build_data_model(process_variable(row) for row in rows)
@@ -0,0 +1,61 @@
+"""Constant-memory export of CDEs Metadata Schema rows to an Excel workbook."""
+import tempfile
+
+import xlsxwriter
+
+# Workbooks are kept in memory up to this size, and spooled to a temporary file beyond it.
+SPOOL_MAX_BYTES = 10 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+# The format of the header row written by pandas' to_excel.
+HEADER_FORMAT = {"bold": True, "border": 1, "align": "center", "valign": "top"}
+
+
+def cell_value(value):
+    """Leaves the values xlsxwriter can write as they are and writes anything else as a string, like pandas."""
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    return str(value)
+
+
+def write_excel_rows(file, columns, rows):
+    """
+    Writes the header and the rows to the first sheet of a workbook. xlsxwriter runs in
+    constant_memory mode, flushing every row once the next one is written, so rows can be
+    a generator and only one of them is held in memory at a time.
+    """
+    workbook = xlsxwriter.Workbook(file, {"constant_memory": True})
+    try:
+        worksheet = workbook.add_worksheet()
+        worksheet.write_row(0, 0, columns, workbook.add_format(HEADER_FORMAT))
+        for row_number, row in enumerate(rows, start=1):
+            worksheet.write_row(row_number, 0, [cell_value(value) for value in row])
+    finally:
+        workbook.close()
+
+
+def spool_excel_rows(columns, rows, spool_max_bytes=SPOOL_MAX_BYTES):
+    """
+    Writes the rows to a workbook kept in memory up to spool_max_bytes and in a temporary
+    file beyond that. Returns the file, rewound, along with its size.
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=spool_max_bytes)
+    try:
+        write_excel_rows(output, columns, rows)
+        size = output.tell()
+        output.seek(0)
+    except BaseException:
+        output.close()
+        raise
+    return output, size
+
+
+def iter_file_chunks(file, chunk_size=CHUNK_SIZE):
+    """Yields the content of a file chunk by chunk, closing it once read or when the generator is closed."""
+    try:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        file.close()
@@ -2,6 +2,7 @@
 import pandas as pd
 
 from common_entities import EXCEL_JSON_FIELDS_MAP, EXCEL_COLUMNS, InvalidDataModelError
+from datamodel.model import JSON_OBJECT_TYPES
 
 
 def extract_values(variable):
@@ -43,35 +44,49 @@ def parse_variables(variable, concept_path):
     return data_row
 
 
-def recursive_parse_json(json_data, concept_path=[]):
-    """Recursively parses JSON data to extract variables and their details.
+def iter_json_rows(json_data, concept_path=None):
+    """Lazily yields the Excel rows of the variables of a data model, in the order of recursive_parse_json.
+
+    Groups are walked depth first over an explicit stack, so deep models do not hit the recursion
+    limit, and every group holds the concept path of its parent joined once rather than a copy
+    of it. Nothing is shared between calls, which are safe to run from many threads at once.
 
     Args:
-        json_data (dict or list): The JSON data to parse.
-        concept_path (list): The path to the current position in the hierarchy.
+        json_data (dict, list or datamodel.model.DataModel): The JSON data or data model to parse.
+        concept_path (list): The path to the position of json_data in the hierarchy.
 
-    Returns:
-        list: A list of parsed variables with their details.
+    Yields:
+        list: The details of a variable, one per Excel column.
     """
-    data = []
+    prefix = "/".join(concept_path) if concept_path else None
+    stack = [(json_data, prefix)]
+    while stack:
+        group, prefix = stack.pop()
+        if not isinstance(group, JSON_OBJECT_TYPES):
+            continue
+        label = group.get("label", group.get("code", ""))
+        if label:  # Extend the concept path only if label or code is present
+            prefix = label if prefix is None else "/".join((prefix, label))
+        path = [] if prefix is None else [prefix]
+
+        for variable in group.get("variables") or []:
+            yield parse_variables(variable, path)
 
-    if isinstance(json_data, dict):
-        # Extract the concept path for the current level
-        label = json_data.get("label", json_data.get("code", ""))
-        if label:  # Update concept path only if label or code is present
-            concept_path.append(label)
+        # Pushed in reverse, so that sub groups are visited in order.
+        stack.extend((sub_group, prefix) for sub_group in reversed(group.get("groups") or []))
 
-        # Process variables at the current level
-        for variable in json_data.get("variables") or []:
-            data.append(parse_variables(variable, concept_path))
 
-        # Recursively process each group in the current level
-        for group in json_data.get("groups") or []:
-            data.extend(recursive_parse_json(group, concept_path.copy()))
+def recursive_parse_json(json_data, concept_path=None):
+    """Parses JSON data to extract variables and their details.
 
-        if label:  # Ensure concept path is not permanently altered
-            concept_path.pop()
-    return data
+    Args:
+        json_data (dict, list or datamodel.model.DataModel): The JSON data or data model to parse.
+        concept_path (list): The path to the current position in the hierarchy.
+
+    Returns:
+        list: A list of parsed variables with their details.
+    """
+    return list(iter_json_rows(json_data, concept_path))
 
 
 def convert_json_to_excel(cdes_data):
@@ -0,0 +1,69 @@
+"""Single-pass validation and conversion of a CDEs Metadata Schema from Excel to JSON."""
+from common_entities import InvalidDataModelError
+from converter.excel_to_json import process_variable
+from converter.row_reader import open_rows
+from datamodel.model import DataModelBuilder
+from validator.excel_validator import validate_columns, validate_variable
+
+# Number of rows between two progress reports.
+PROGRESS_INTERVAL = 1000
+
+
+def report_progress(rows, progress, interval=PROGRESS_INTERVAL):
+    """Passes the rows through, reporting the number read so far every interval rows and at the end."""
+    count = 0
+    for count, row in enumerate(rows, start=1):
+        yield row
+        if count % interval == 0:
+            progress(count)
+    progress(count)
+
+
+def convert_rows_to_model(columns, rows):
+    """
+    Validates and converts a stream of rows in one pass, reading every row and parsing
+    its nominal values only once, into a datamodel.model.DataModel.
+
+    Raises the same error as validate_excel_rows followed by convert_excel_rows_to_json:
+    a conversion error is only raised once the remaining rows have passed validation.
+    """
+    validate_columns(columns)
+    builder = DataModelBuilder()
+    conversion_error = None
+
+    for row in rows:
+        enumerations = validate_variable(row)
+        if conversion_error is not None:
+            continue
+        try:
+            builder.insert(process_variable(row, enumerations))
+        except InvalidDataModelError as e:
+            conversion_error = InvalidDataModelError(f"Error processing variable: {e}")
+        except Exception as e:
+            conversion_error = e
+
+    if conversion_error is not None:
+        raise conversion_error
+    return builder.finish()
+
+
+def validate_and_convert_rows(columns, rows):
+    """Like convert_rows_to_model, but returns the JSON of the data model."""
+    return convert_rows_to_model(columns, rows).to_dict()
+
+
+def excel_to_model(file, progress=None, filename="", content_type=""):
+    """
+    Validates and converts an Excel workbook, or a CSV/TSV sheet according to its filename
+    or content type, into a datamodel.model.DataModel.
+    When given, progress is called with the number of rows processed so far.
+    """
+    with open_rows(file, filename, content_type) as (columns, rows):
+        if progress is not None:
+            rows = report_progress(rows, progress)
+        return convert_rows_to_model(columns, rows)
+
+
+def excel_to_data_model(file, progress=None, filename="", content_type=""):
+    """Like excel_to_model, but returns the JSON of the data model."""
+    return excel_to_model(file, progress, filename, content_type).to_dict()
@@ -0,0 +1,154 @@
+"""Streaming readers that yield the rows of a CDEs Metadata Schema without building a DataFrame."""
+import csv
+import io
+import posixpath
+from contextlib import contextmanager
+
+from openpyxl import load_workbook
+
+from common_entities import InvalidDataModelError
+
+# The strings pandas reads as NaN by default, which the DataFrame path then turns into None.
+NA_VALUES = frozenset(
+    [
+        "",
+        "#N/A",
+        "#N/A N/A",
+        "#NA",
+        "-1.#IND",
+        "-1.#QNAN",
+        "-NaN",
+        "-nan",
+        "1.#IND",
+        "1.#QNAN",
+        "<NA>",
+        "N/A",
+        "NA",
+        "NULL",
+        "NaN",
+        "None",
+        "n/a",
+        "nan",
+        "null",
+    ]
+)
+
+# Delimiters of the sheets uploaded as delimited text, by file extension and by content type.
+CSV_EXTENSION_DELIMITERS = {".csv": ",", ".tsv": "\t", ".tab": "\t"}
+CSV_CONTENT_TYPE_DELIMITERS = {
+    "text/csv": ",",
+    "application/csv": ",",
+    "text/tab-separated-values": "\t",
+}
+
+
+def normalise_cell(value):
+    """
+    Converts a cell value to what `pd.read_excel(...).astype(str).replace("nan", None)` gives,
+    i.e. a string or None. Unlike pandas, the representation depends on the cell alone and not
+    on the dtype of its column, so an integer in a column with blanks stays '5' and not '5.0'.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return None if value in NA_VALUES else value
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def parse_header(values):
+    """
+    Names the columns of the header row the way pandas does: empty cells become
+    'Unnamed: <index>' and repeated names get a '.<count>' suffix.
+    """
+    values = list(values)
+    while values and values[-1] is None:
+        values.pop()
+    columns, seen = [], {}
+    for index, value in enumerate(values):
+        name = f"Unnamed: {index}" if value is None else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def iter_rows(columns, values_iterator):
+    """
+    Yields a dictionary per row, keyed by column name. Blank rows are yielded only once a
+    non-blank row follows them, so trailing blank rows are dropped like pandas does.
+    """
+    width = len(columns)
+    blank_rows = 0
+    for values in values_iterator:
+        cells = [normalise_cell(value) for value in values[:width]]
+        cells.extend([None] * (width - len(cells)))
+        if all(cell is None for cell in cells):
+            blank_rows += 1
+            continue
+        for _ in range(blank_rows):
+            yield dict.fromkeys(columns)
+        blank_rows = 0
+        yield dict(zip(columns, cells))
+
+
+@contextmanager
+def open_excel_rows(file):
+    """
+    Opens the first sheet of a workbook in read-only mode and yields its column names
+    along with a generator over its rows. Only the current row is held in memory.
+    """
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        values_iterator = workbook.worksheets[0].iter_rows(values_only=True)
+        columns = parse_header(next(values_iterator, ()))
+        yield columns, iter_rows(columns, values_iterator)
+    finally:
+        workbook.close()
+
+
+def csv_rows(text, delimiter):
+    """Yields the rows of delimited text with the C-backed csv reader, reporting malformed input as invalid."""
+    try:
+        yield from csv.reader(text, delimiter=delimiter)
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise InvalidDataModelError(f"CSV format error: {e}")
+
+
+@contextmanager
+def open_csv_rows(file, delimiter=","):
+    """
+    Opens a CSV or TSV sheet, UTF-8 encoded, and yields its column names along with
+    a generator over its rows, like open_excel_rows. Cells are read as text, so they
+    only become None when blank or one of the strings pandas reads as NaN.
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        values_iterator = csv_rows(text, delimiter)
+        header = [value or None for value in next(values_iterator, ())]
+        columns = parse_header(header)
+        yield columns, iter_rows(columns, values_iterator)
+    finally:
+        # Leaves the underlying binary stream open for the caller.
+        text.detach()
+
+
+def csv_delimiter(filename, content_type):
+    """The delimiter of an uploaded sheet, from its content type or extension, or None for a workbook."""
+    delimiter = CSV_CONTENT_TYPE_DELIMITERS.get((content_type or "").split(";")[0].strip().lower())
+    if delimiter is None:
+        extension = posixpath.splitext((filename or "").lower())[1]
+        delimiter = CSV_EXTENSION_DELIMITERS.get(extension)
+    return delimiter
+
+
+def open_rows(file, filename="", content_type=""):
+    """Opens an uploaded sheet with the reader matching its format, CSV, TSV or else an Excel workbook."""
+    delimiter = csv_delimiter(filename, content_type)
+    if delimiter is None:
+        return open_excel_rows(file)
+    return open_csv_rows(file, delimiter)
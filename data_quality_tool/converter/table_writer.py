@@ -0,0 +1,44 @@
+"""Streamed exports of the flattened CDEs table as CSV or newline-delimited JSON."""
+import csv
+import io
+import json
+
+# The export formats of /json-to-excel and their media types, the first one being the default.
+EXPORT_MIMETYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_csv_chunks(columns, rows, chunk_size=CHUNK_SIZE):
+    """Yields the header and the rows as UTF-8 CSV, in chunks of about chunk_size, as the rows are produced."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def iter_ndjson_chunks(columns, rows, chunk_size=CHUNK_SIZE):
+    """Yields one JSON object per row, keyed by column, in chunks of about chunk_size, as the rows are produced."""
+    encoder = json.JSONEncoder(ensure_ascii=False, default=str)
+    lines, size = [], 0
+    for row in rows:
+        line = encoder.encode(dict(zip(columns, row))) + "\n"
+        lines.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield "".join(lines).encode()
+            lines, size = [], 0
+    if lines:
+        yield "".join(lines).encode()
+
+
+EXPORT_WRITERS = {"csv": iter_csv_chunks, "ndjson": iter_ndjson_chunks}
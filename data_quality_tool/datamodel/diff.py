@@ -0,0 +1,105 @@
+"""
+Structured differences between two versions of a data model, by CDE and group code. Either version is
+plain JSON or a datamodel.model.DataModel.
+"""
+
+# Keys of the groups and of the data model that hold their children rather than describe them.
+CHILD_KEYS = ("variables", "groups")
+CHANGE_KINDS = ("added", "removed", "moved", "modified")
+
+
+def index_data_model(data_model):
+    """
+    Indexes the CDEs and the groups of a valid data model by code, in one depth-first pass.
+    Each code maps to the path of the group codes leading to its element, joined by '/', and the
+    element itself. Both indexes follow the order of the elements in the model.
+    """
+    cdes, groups = {}, {}
+    stack = [(data_model, None, "")]
+    while stack:
+        group, parent_path, path = stack.pop()
+        if parent_path is not None:
+            groups[group["code"]] = (parent_path, group)
+        for cde in group.get("variables") or []:
+            cdes[cde["code"]] = (path, cde)
+        # Pushed in reverse, so that sub groups are visited in order.
+        for sub_group in reversed(group.get("groups") or []):
+            stack.append((sub_group, path, f"{path}/{sub_group['code']}" if path else sub_group["code"]))
+    return cdes, groups
+
+
+def diff_enumerations(old, new):
+    """The enumerations added, removed and relabelled between two lists of them, by code."""
+    old_labels = {enumeration["code"]: enumeration["label"] for enumeration in old or []}
+    new_labels = {enumeration["code"]: enumeration["label"] for enumeration in new or []}
+    return {
+        "added": [{"code": code, "label": label} for code, label in new_labels.items() if code not in old_labels],
+        "removed": [{"code": code, "label": label} for code, label in old_labels.items() if code not in new_labels],
+        "relabelled": [
+            {"code": code, "old": old_labels[code], "new": label}
+            for code, label in new_labels.items()
+            if code in old_labels and old_labels[code] != label
+        ],
+    }
+
+
+def diff_fields(old, new, ignored=()):
+    """
+    The fields whose value differs between two elements, as {field: {"old": ..., "new": ...}}, a missing
+    field being None. Enumerations are compared by code, reordering them is not a change.
+    """
+    changes = {}
+    # Keys only, {**old, **new} would index the CDEs and expand their compacted enumerations for good.
+    for field in dict.fromkeys([*old.keys(), *new.keys()]):
+        if field in ignored:
+            continue
+        old_value, new_value = old.get(field), new.get(field)
+        if old_value == new_value:
+            continue
+        if field == "enumerations":
+            enumerations = diff_enumerations(old_value, new_value)
+            if any(enumerations.values()):
+                changes[field] = enumerations
+        else:
+            changes[field] = {"old": old_value, "new": new_value}
+    return changes
+
+
+def diff_elements(old_index, new_index, ignored=()):
+    """The elements added, removed, moved to another group and modified between two indexes."""
+    changes = {kind: [] for kind in CHANGE_KINDS}
+    for code, (path, element) in new_index.items():
+        if code not in old_index:
+            changes["added"].append({"code": code, "path": path})
+            continue
+        old_path, old_element = old_index[code]
+        if old_path != path:
+            changes["moved"].append({"code": code, "from": old_path, "to": path})
+        fields = diff_fields(old_element, element, ignored)
+        if fields:
+            changes["modified"].append({"code": code, "path": path, "changes": fields})
+    changes["removed"] = [
+        {"code": code, "path": path} for code, (path, _) in old_index.items() if code not in new_index
+    ]
+    return changes
+
+
+def diff_data_models(old, new):
+    """
+    Compares two valid data models, in time linear in their size. Returns the changes of
+    the fields of the data model itself, and the CDEs and groups added, removed, moved,
+    i.e. whose path of group codes changed, and modified, along with a count of each.
+    """
+    old_cdes, old_groups = index_data_model(old)
+    new_cdes, new_groups = index_data_model(new)
+    cdes = diff_elements(old_cdes, new_cdes)
+    groups = diff_elements(old_groups, new_groups, ignored=CHILD_KEYS)
+    return {
+        "data_model": diff_fields(old, new, ignored=CHILD_KEYS),
+        "cdes": cdes,
+        "groups": groups,
+        "summary": {
+            "cdes": {kind: len(changes) for kind, changes in cdes.items()},
+            "groups": {kind: len(changes) for kind, changes in groups.items()},
+        },
+    }
@@ -0,0 +1,583 @@
+"""
+A compact object model of data models: slotted CDEs and groups, along with indexes of the CDEs by code
+and of the groups by concept path, built once as the model is loaded from JSON or from a stream of rows.
+The elements of the model read and edit like the JSON objects they stand for, so that the validators,
+converters, diff and patch take either.
+"""
+import functools
+import json
+import operator
+
+from common_entities import InvalidDataModelError
+
+# The JSON fields of the CDEs along with their attributes, in the order process_variable produces them.
+CDE_FIELDS = (
+    ("label", "label"),
+    ("code", "code"),
+    ("type", "type"),
+    ("units", "units"),
+    ("description", "description"),
+    ("canBeNull", "can_be_null"),
+    ("comments", "comments"),
+    ("methodology", "methodology"),
+    ("minValue", "min_value"),
+    ("maxValue", "max_value"),
+    ("enumerations", "enumerations"),
+    ("sql_type", "sql_type"),
+    ("isCategorical", "is_categorical"),
+)
+CDE_ATTRIBUTES = dict(CDE_FIELDS)
+CDE_KEYS = tuple(CDE_ATTRIBUTES)
+get_cde_fields = operator.attrgetter(*CDE_ATTRIBUTES.values())
+CHILD_KEYS = ("groups", "variables")
+ENUMERATION_KEYS = {("code", "label")}
+# The JSON fields of the groups and of the data model, in the order the converter produces them.
+GROUP_KEYS = ("code", "label") + CHILD_KEYS
+DATA_MODEL_KEYS = GROUP_KEYS + ("version",)
+DEFAULT_VERSION = "to be defined"
+NO_GROUPS_CODE = "No groups found"
+# Distinct orders of keys shared between elements, beyond which the rarest ones are no longer shared.
+KEY_ORDER_CACHE_SIZE = 1024
+
+
+class _Missing:
+    """The value of the fields an element does not have, as opposed to fields set to null."""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return "MISSING"
+
+    def __bool__(self):
+        return False
+
+
+MISSING = _Missing()
+
+
+def is_empty(key, value):
+    """Whether clean_empty_fields removes the field."""
+    return (key in CHILD_KEYS or key == "enumerations") and not value or value == ""
+
+
+def compact_enumerations(enumerations, clean=False):
+    """
+    Stores enumerations that are dicts of a code and a label as a tuple of (code, label) pairs, which
+    take a fraction of the memory of a list of dicts, and anything else as it is. When clean, empty
+    codes and labels are left out.
+    """
+    if type(enumerations) is not list:
+        return enumerations
+    try:
+        # Only dicts of a code then a label, and nothing else, expand back to the same JSON.
+        if set(map(tuple, enumerations)) != ENUMERATION_KEYS:
+            return enumerations
+        pairs = tuple(map(tuple, map(dict.values, enumerations)))
+    except TypeError:
+        return enumerations
+    if clean and any("" in pair for pair in pairs):
+        # Rare enough to be kept as dicts, so that the pairs always hold both.
+        return [
+            {key: value for key, value in enumeration.items() if not is_empty(key, value)}
+            for enumeration in enumerations
+        ]
+    return pairs
+
+
+def expand_enumerations(enumerations):
+    if type(enumerations) is not tuple:
+        return enumerations
+    return [{"code": code, "label": label} for code, label in enumerations]
+
+
+def key_orders(known):
+    """
+    The function giving the order of the keys of a JSON object whose known keys are known: None when
+    to_json gives them in that order already, the known ones first and in order, else the keys themselves,
+    the same tuple for all the objects having that order.
+    """
+    known_set = frozenset(known)
+
+    @functools.lru_cache(maxsize=KEY_ORDER_CACHE_SIZE)
+    def key_order(keys):
+        present = frozenset(keys)
+        canonical = tuple(key for key in known if key in present) + tuple(
+            key for key in keys if key not in known_set
+        )
+        return None if keys == canonical else keys
+
+    return key_order
+
+
+class Element:
+    """
+    An element of a data model, read and edited like the dict of its JSON. The fields in _attributes are
+    attributes, MISSING when absent, and any other field is kept in extra. order keeps the order of the
+    keys of the JSON when it differs from the one of _keys followed by the extra fields.
+    """
+
+    __slots__ = ()
+    _attributes = {}
+
+    def _value(self, key):
+        """The stored value of a field, or MISSING."""
+        attribute = self._attributes.get(key)
+        if attribute is not None:
+            value = getattr(self, attribute)
+            if value is not MISSING:
+                return value
+        return self.extra.get(key, MISSING) if self.extra else MISSING
+
+    def _store(self, key, value):
+        attribute = self._attributes.get(key)
+        if attribute is not None:
+            setattr(self, attribute, value)
+            return
+        if self.extra is None:
+            self.extra = {}
+        self.extra[key] = value
+
+    def _remove(self, key):
+        attribute = self._attributes.get(key)
+        if attribute is not None and getattr(self, attribute) is not MISSING:
+            setattr(self, attribute, MISSING)
+            return
+        del self.extra[key]
+        if not self.extra:
+            self.extra = None
+
+    def get(self, key, default=None):
+        value = self._value(key)
+        return default if value is MISSING else value
+
+    def __contains__(self, key):
+        return self._value(key) is not MISSING
+
+    def __getitem__(self, key):
+        value = self._value(key)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            # New keys come last, as in a dict.
+            self.order = self._key_order((*self.keys(), key))
+        self._store(key, value)
+
+    def pop(self, key):
+        value = self[key]
+        self._remove(key)
+        if self.order is not None:
+            self.order = self._key_order(tuple(other for other in self.order if other != key))
+        return value
+
+    def keys(self):
+        return self.to_json().keys()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def _ordered(self, fields):
+        """The fields of to_json in the order of the keys of the JSON the element was loaded from."""
+        if self.order is None:
+            return fields
+        ordered = {key: fields[key] for key in self.order if key in fields}
+        ordered.update(fields)
+        return ordered
+
+    def to_dict(self):
+        return to_dict(self)
+
+
+class CommonDataElement(Element):
+    """A CDE of a data model. group is the group or data model holding it."""
+
+    __slots__ = tuple(attribute for _, attribute in CDE_FIELDS) + ("extra", "order", "group")
+    _attributes = CDE_ATTRIBUTES
+    _key_order = staticmethod(key_orders(CDE_KEYS))
+
+    def __init__(self, fields, group=None, clean=False):
+        """Makes a CDE out of its JSON fields. When clean, the fields clean_empty_fields would remove are dropped."""
+        if clean:
+            fields = {key: value for key, value in fields.items() if not is_empty(key, value)}
+        for key, attribute in CDE_FIELDS:
+            setattr(self, attribute, fields.get(key, MISSING))
+        if self.enumerations is not MISSING:
+            self.enumerations = compact_enumerations(self.enumerations, clean)
+        if CDE_ATTRIBUTES.keys() >= fields.keys():
+            self.extra = None
+        else:
+            self.extra = {key: value for key, value in fields.items() if key not in CDE_ATTRIBUTES}
+        self.order = self._key_order(tuple(fields))
+        self.group = group
+
+    def __repr__(self):
+        return f"CommonDataElement(code={self.code!r})"
+
+    def __contains__(self, key):
+        attribute = CDE_ATTRIBUTES.get(key)
+        if attribute is None:
+            return bool(self.extra) and key in self.extra
+        return getattr(self, attribute) is not MISSING
+
+    def get(self, key, default=None):
+        """The value of a JSON field, like dict.get on the JSON of the CDE."""
+        attribute = CDE_ATTRIBUTES.get(key)
+        if attribute is None:
+            return self.extra.get(key, default) if self.extra else default
+        value = getattr(self, attribute)
+        if value is MISSING:
+            return default
+        return expand_enumerations(value) if attribute == "enumerations" else value
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if type(value) is tuple and key == "enumerations":
+            # Expanded for good, so that the enumerations handed out can be edited in place.
+            value = self.enumerations = expand_enumerations(value)
+        return value
+
+    def to_json(self):
+        fields = {key: value for key, value in zip(CDE_KEYS, get_cde_fields(self)) if value is not MISSING}
+        if type(self.enumerations) is tuple:
+            fields["enumerations"] = expand_enumerations(self.enumerations)
+        if self.extra:
+            fields.update(self.extra)
+        return self._ordered(fields)
+
+
+class Group(Element):
+    """
+    A group of a data model, holding CDEs and sub groups. concept_path joins the labels, or else the codes,
+    of the groups from the data model down to it, as in the conceptPath column of the sheets. Its groups
+    and variables are lists of elements, or MISSING when its JSON has no such list.
+    """
+
+    __slots__ = ("code", "label", "groups", "variables", "extra", "order", "parent", "concept_path")
+    _keys = GROUP_KEYS
+    _attributes = {key: key for key in GROUP_KEYS}
+    _key_order = staticmethod(key_orders(GROUP_KEYS))
+
+    def __init__(self, code=MISSING, label=MISSING, parent=None, concept_path=""):
+        self.code = code
+        self.label = label
+        self.groups = MISSING
+        self.variables = MISSING
+        self.extra = None
+        self.order = None
+        self.parent = parent
+        self.concept_path = concept_path
+
+    def __repr__(self):
+        return f"{type(self).__name__}(code={self.code!r}, concept_path={self.concept_path!r})"
+
+    def _store(self, key, value):
+        if key not in CHILD_KEYS:
+            super()._store(key, value)
+            return
+        extra = self.extra or {}
+        if type(value) is list and all(isinstance(item, JSON_OBJECT_TYPES) for item in value):
+            # Copied, reindex making its JSON objects into elements in place.
+            setattr(self, key, list(value))
+            extra.pop(key, None)
+        else:
+            # Anything else is kept as it is, for the validators to report.
+            setattr(self, key, MISSING)
+            extra[key] = value
+        self.extra = extra or None
+
+    def load(self, fields):
+        """Sets the fields of a JSON group, its sub groups and CDEs being left as JSON until reindexed."""
+        for key, value in fields.items():
+            self._store(key, value)
+        self.order = self._key_order(tuple(fields))
+
+    def add_group(self, code, group_class=None):
+        """Appends a new sub group, of group_class or else Group, whose code and label are code, and returns it."""
+        # Empty codes are left out of the JSON, as clean_empty_fields does.
+        sub_group = (group_class or Group)(code or MISSING, code or MISSING, parent=self)
+        sub_group.concept_path = child_concept_path(self.concept_path, sub_group)
+        if self.groups is MISSING:
+            self.groups = []
+        self.groups.append(sub_group)
+        return sub_group
+
+    def add_cde(self, cde):
+        cde.group = self
+        if self.variables is MISSING:
+            self.variables = []
+        self.variables.append(cde)
+
+    def to_json(self):
+        """The JSON of the group, its sub groups and CDEs being left as objects."""
+        fields = {}
+        for key in self._keys:
+            value = getattr(self, key)
+            if value is not MISSING:
+                fields[key] = value
+        if self.extra:
+            fields.update(self.extra)
+        return self._ordered(fields)
+
+
+class DataModel(Group):
+    """
+    A data model, the root group of its CDEs and groups, along with indexes built as it is loaded:
+    cde_index maps the code of each CDE to the first CDE with that code, and group_index the concept
+    path of each group, the data model included, to the first group with that path. cde_count counts
+    every CDE, duplicate codes included.
+    """
+
+    __slots__ = ("version", "cde_index", "group_index", "cde_count")
+    _keys = DATA_MODEL_KEYS
+    _attributes = {key: key for key in DATA_MODEL_KEYS}
+    _key_order = staticmethod(key_orders(DATA_MODEL_KEYS))
+
+    def __init__(self, code=MISSING, label=MISSING, parent=None, concept_path=""):
+        super().__init__(code, label, parent, concept_path)
+        self.version = MISSING
+        self.cde_index = {}
+        self.group_index = {}
+        self.cde_count = 0
+
+    def cde(self, code):
+        """The CDE with a code, or None."""
+        return self.cde_index.get(code)
+
+    def group(self, concept_path):
+        """The group with a concept path, or None."""
+        return self.group_index.get(concept_path)
+
+    def iter_groups(self):
+        """Yields the data model and all its groups, depth first and in order."""
+        stack = [self]
+        while stack:
+            group = stack.pop()
+            yield group
+            if group.groups:
+                stack.extend(reversed(group.groups))
+
+    def iter_cdes(self):
+        """Yields all the CDEs of the data model, depth first and in order."""
+        for group in self.iter_groups():
+            yield from group.variables or ()
+
+    def reindex(self):
+        """
+        Rebuilds the indexes and the count of the CDEs, along with the parents and concept paths of the
+        groups, in one pass over an explicit stack. The sub groups and CDEs still in JSON, as loaded or as
+        a patch added them, are made into elements on the way.
+        """
+        self.parent = None
+        self.concept_path = child_concept_path("", self)
+        self.cde_index, self.group_index, self.cde_count = {}, {}, 0
+        stack = [self]
+        while stack:
+            group = stack.pop()
+            self.group_index.setdefault(group.concept_path, group)
+            variables = group.variables
+            if variables:
+                for index, cde in enumerate(variables):
+                    if type(cde) is dict:
+                        cde = variables[index] = CommonDataElement(cde, group)
+                    else:
+                        cde.group = group
+                    try:
+                        self.cde_index.setdefault(cde.code, cde)
+                    except TypeError:
+                        # Codes that are not strings nor numbers, as in invalid models, are not indexed.
+                        pass
+                self.cde_count += len(variables)
+            groups = group.groups
+            if groups:
+                for index, sub_group in enumerate(groups):
+                    if type(sub_group) is dict:
+                        fields, sub_group = sub_group, Group()
+                        sub_group.load(fields)
+                        groups[index] = sub_group
+                    sub_group.parent = group
+                    sub_group.concept_path = child_concept_path(group.concept_path, sub_group)
+                # Pushed in reverse, so that the CDEs are indexed in order.
+                stack.extend(reversed(groups))
+
+
+# The values that stand for JSON objects, in the model or in plain JSON.
+JSON_OBJECT_TYPES = (dict, Element)
+
+
+def to_dict(element):
+    """The plain JSON of an element of the model, its sub groups and CDEs included, built without recursion."""
+    if isinstance(element, CommonDataElement):
+        return element.to_json()
+    result = element.to_json()
+    stack = [result]
+    while stack:
+        fields = stack.pop()
+        for key in CHILD_KEYS:
+            children = fields.get(key)
+            if type(children) is not list:
+                continue
+            fields[key] = [child.to_json() if isinstance(child, Element) else child for child in children]
+            if key == "groups":
+                stack.extend(group for group, child in zip(fields[key], children) if isinstance(child, Group))
+    return result
+
+
+def json_default(value):
+    """Encodes the elements of the model for json.dumps and json.JSONEncoder, one level at a time."""
+    if isinstance(value, Element):
+        return value.to_json()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class DataModelEncoder(json.JSONEncoder):
+    """
+    A JSON encoder of the elements of the model, giving the same text as encoding their to_dict().
+    Groups are laid out by the encoder itself and each CDE is encoded on its own. This spares the
+    pure Python encoder used for pretty-printed output a generator per level of nesting for every
+    value, and the JSON of the whole model is never built.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("default", json_default)
+        super().__init__(**kwargs)
+
+    def encode(self, o):
+        if isinstance(o, Element):
+            return "".join(self.iterencode(o))
+        return super().encode(o)
+
+    def iterencode(self, o, _one_shot=False):
+        if not isinstance(o, Group):
+            return super().iterencode(o, _one_shot)
+        return self._iterencode_group(o)
+
+    def _newline(self, level):
+        if self.indent is None:
+            return ""
+        indent = " " * self.indent if isinstance(self.indent, int) else self.indent
+        return "\n" + indent * level
+
+    def _encode_value(self, value, level):
+        """Encodes a value, CDEs included, nested level deep."""
+        text = super().encode(value.to_json() if isinstance(value, CommonDataElement) else value)
+        return text.replace("\n", self._newline(level)) if self.indent is not None and level else text
+
+    def _iterencode_group(self, group):
+        # Fragments of text along with the elements still to encode and their level, in reverse order.
+        stack = [(group, 0)]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                yield item
+                continue
+            element, level = item
+            if not isinstance(element, Group):
+                yield self._encode_value(element, level)
+                continue
+            fields = element.to_json()
+            if not fields:
+                yield "{}"
+                continue
+            parts = ["{"]
+            for position, (key, value) in enumerate(fields.items()):
+                separator = self.item_separator if position else ""
+                parts.append(f"{separator}{self._newline(level + 1)}{super().encode(key)}{self.key_separator}")
+                if key in CHILD_KEYS and type(value) is list and value:
+                    parts.append("[")
+                    for index, child in enumerate(value):
+                        parts.append(f"{self.item_separator if index else ''}{self._newline(level + 2)}")
+                        parts.append((child, level + 2))
+                    parts.append(f"{self._newline(level + 1)}]")
+                else:
+                    parts.append((value, level + 1))
+            parts.append(f"{self._newline(level)}}}")
+            stack.extend(reversed(parts))
+
+
+def child_concept_path(parent_path, group):
+    """The concept path of a group below parent_path, which its label or else its code extends when not empty."""
+    label = group.get("label", group.get("code", ""))
+    if not label:
+        return parent_path
+    return f"{parent_path}/{label}" if parent_path else f"{label}"
+
+
+def load_json(data_model):
+    """
+    Loads a JSON data model in one pass, indexing its CDEs and groups along the way. Nothing is validated:
+    the values the model has no place for, such as lists of sub groups or CDEs holding anything but objects,
+    are kept as they are for the validators to report, and to_dict gives the same JSON back, in the same order.
+    """
+    model = DataModel()
+    model.load(data_model)
+    model.reindex()
+    return model
+
+
+class DataModelBuilder:
+    """
+    Builds a data model out of processed variables, placing each one in the group hierarchy described
+    by its 'conceptPath'. Groups are indexed by their whole path, so that placing a variable costs a
+    single lookup once its group exists, and the CDEs are indexed as they are added.
+    """
+
+    def __init__(self):
+        self.root = Group("root")
+        self._groups = {}
+        self._cde_index = {}
+        self._cde_count = 0
+
+    def _group(self, path):
+        """The group at a path of group codes, created along with its missing parents."""
+        key = "/".join(path)
+        group = self._groups.get(key)
+        if group is not None:
+            return group
+        group = self.root
+        for depth, code in enumerate(path, start=1):
+            prefix = "/".join(path[:depth])
+            sub_group = self._groups.get(prefix)
+            if sub_group is None:
+                # The first top group becomes the data model, the other ones are dropped.
+                top = group is self.root and not group.groups
+                sub_group = group.add_group(code, DataModel if top else None)
+                self._groups[prefix] = sub_group
+            group = sub_group
+        return group
+
+    def insert(self, variable):
+        """Places a processed variable, as made by process_variable, in the group its 'conceptPath' describes."""
+        if "conceptPath" in variable and variable["conceptPath"] and variable["conceptPath"] != "None":
+            path = variable["conceptPath"].split("/")
+            del variable["conceptPath"]
+        else:
+            raise InvalidDataModelError(f"The variable {variable['code']} is missing the conceptPath")
+        if len(path) == 1:
+            # Variables outside of any group are only kept, as they are, when no group exists.
+            self.root.add_cde(CommonDataElement(variable))
+            return
+        group = self._group(path[:-1])
+        cde = CommonDataElement(variable, clean=True)
+        group.add_cde(cde)
+        self._cde_index.setdefault(cde.code, cde)
+        self._cde_count += 1
+
+    def finish(self):
+        """The data model, the first top group, or one holding the variables outside of groups if there is none."""
+        if not self.root.groups:
+            model = DataModel(NO_GROUPS_CODE)
+            model.groups, model.variables = [], self.root.variables or []
+            model.reindex()
+            return model
+        model = self.root.groups[0]
+        model.parent = None
+        model.version = DEFAULT_VERSION
+        if len(self.root.groups) == 1:
+            model.cde_index, model.cde_count = self._cde_index, self._cde_count
+            for group in model.iter_groups():
+                model.group_index.setdefault(group.concept_path, group)
+        else:
+            model.reindex()
+        return model
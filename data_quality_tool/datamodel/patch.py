@@ -0,0 +1,298 @@
+"""RFC 6902 JSON Patch of data models, revalidating only the CDEs and groups a patch touched."""
+import copy
+import re
+
+from common_entities import InvalidDataModelError
+from datamodel.model import JSON_OBJECT_TYPES, DataModel, Element
+from validator.json_validator import (
+    FailFast,
+    LazyPath,
+    collect_data_model_content_errors,
+    collect_data_model_field_errors,
+    validate_common_data_element,
+    walk_groups,
+)
+
+OPERATIONS = ("add", "remove", "replace", "move", "copy", "test")
+ARRAY_INDEX_REGEX = re.compile(r"0|[1-9][0-9]*")
+CHILD_KEYS = ("variables", "groups")
+# Fields that the uniqueness of the codes, the dataset CDE or the longitudinal ones depend on.
+# Editing them needs a walk of the whole model, the other edits only the edited CDEs.
+CDE_IDENTITY_FIELDS = frozenset(["code", "type", "sql_type", "isCategorical"])
+DATA_MODEL_IDENTITY_FIELDS = frozenset(["code", "longitudinal", "variables", "groups"])
+
+
+class JsonPatchError(Exception):
+    """Exception raised for patches that are malformed or cannot be applied to the data model."""
+
+
+class JsonPatchTestFailed(JsonPatchError):
+    """Exception raised when a 'test' operation of a patch does not hold."""
+
+
+def parse_pointer(pointer):
+    """Splits an RFC 6901 JSON pointer into its unescaped reference tokens."""
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith("/")):
+        raise JsonPatchError(f"Invalid JSON pointer {pointer!r}")
+    if not pointer:
+        return []
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def array_index(array, token, pointer, allow_end=False):
+    """The index of an array that a reference token designates, '-' being past its end when allowed."""
+    if allow_end and token == "-":
+        return len(array)
+    if not ARRAY_INDEX_REGEX.fullmatch(token):
+        raise JsonPatchError(f"Invalid array index '{token}' in '{pointer}'")
+    index = int(token)
+    if index > len(array) or (index == len(array) and not allow_end):
+        raise JsonPatchError(f"Array index {index} out of range in '{pointer}'")
+    return index
+
+
+def resolve(document, tokens, pointer):
+    value = document
+    for token in tokens:
+        if isinstance(value, JSON_OBJECT_TYPES):
+            if token not in value:
+                raise JsonPatchError(f"Path '{pointer}' does not exist")
+            value = value[token]
+        elif isinstance(value, list):
+            value = value[array_index(value, token, pointer)]
+        else:
+            raise JsonPatchError(f"Path '{pointer}' does not exist")
+    return value
+
+
+def resolve_parent(document, tokens, pointer):
+    parent = resolve(document, tokens[:-1], pointer)
+    if not isinstance(parent, (*JSON_OBJECT_TYPES, list)):
+        raise JsonPatchError(f"Path '{pointer}' does not exist")
+    return parent, tokens[-1]
+
+
+def add(document, tokens, value, pointer):
+    if not tokens:
+        return value
+    parent, token = resolve_parent(document, tokens, pointer)
+    if isinstance(parent, JSON_OBJECT_TYPES):
+        parent[token] = value
+    else:
+        parent.insert(array_index(parent, token, pointer, allow_end=True), value)
+    return document
+
+
+def remove(document, tokens, pointer):
+    """Removes the value at the pointer and returns it."""
+    if not tokens:
+        raise JsonPatchError("The whole data model cannot be removed")
+    parent, token = resolve_parent(document, tokens, pointer)
+    if isinstance(parent, JSON_OBJECT_TYPES):
+        if token not in parent:
+            raise JsonPatchError(f"Path '{pointer}' does not exist")
+        return parent.pop(token)
+    return parent.pop(array_index(parent, token, pointer))
+
+
+def replace(document, tokens, value, pointer):
+    if not tokens:
+        return value
+    parent, token = resolve_parent(document, tokens, pointer)
+    if isinstance(parent, JSON_OBJECT_TYPES):
+        if token not in parent:
+            raise JsonPatchError(f"Path '{pointer}' does not exist")
+        parent[token] = value
+    else:
+        parent[array_index(parent, token, pointer)] = value
+    return document
+
+
+def plain(value):
+    """A value of the document as plain JSON, the elements of a datamodel.model.DataModel included."""
+    if isinstance(value, Element):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [plain(item) for item in value]
+    return value
+
+
+def json_equal(first, second):
+    """Equality of JSON values, where unlike in Python true is not 1 and false is not 0."""
+    if isinstance(first, bool) or isinstance(second, bool):
+        return type(first) is type(second) and first == second
+    if isinstance(first, dict):
+        return (
+            isinstance(second, dict)
+            and first.keys() == second.keys()
+            and all(json_equal(value, second[key]) for key, value in first.items())
+        )
+    if isinstance(first, list):
+        return isinstance(second, list) and len(first) == len(second) and all(map(json_equal, first, second))
+    return first == second
+
+
+def operation_field(operation, field, index):
+    if field not in operation:
+        raise JsonPatchError(f"Missing '{field}' in operation {index} of the patch")
+    return operation[field]
+
+
+class TouchedElements:
+    """
+    The CDEs a patch touched, along with their concept paths, and whether it touched the fields
+    of the data model itself or changed its structure, i.e. added, removed or moved CDEs or groups
+    or edited a field that the uniqueness of the codes or the required CDEs depend on.
+    """
+
+    def __init__(self):
+        self.cdes = {}
+        self.data_model_fields = False
+        self.structural = False
+
+    def add_cde(self, cde, path):
+        if isinstance(cde, JSON_OBJECT_TYPES):
+            self.cdes[id(cde)] = (cde, path)
+
+    def add_tree(self, value, key):
+        """
+        Adds the CDEs of an element of a 'variables' or 'groups' list, or of such a list, in any group below it.
+        Their paths are left out, structural changes being revalidated by a walk of the whole model.
+        """
+        items = value if isinstance(value, list) else [value]
+        if key == "variables":
+            for cde in items:
+                self.add_cde(cde, None)
+            return
+        stack = [group for group in items if isinstance(group, JSON_OBJECT_TYPES)]
+        while stack:
+            group = stack.pop()
+            variables, groups = group.get("variables"), group.get("groups")
+            for cde in variables if isinstance(variables, list) else []:
+                self.add_cde(cde, None)
+            if isinstance(groups, list):
+                stack.extend(sub_group for sub_group in groups if isinstance(sub_group, JSON_OBJECT_TYPES))
+
+    def touch(self, data_model, tokens):
+        """Records what the operation on the pointer made of tokens touched, once applied to data_model."""
+        if not tokens or not isinstance(data_model, JSON_OBJECT_TYPES):
+            self.structural = True
+            return
+        group, path, nested, index = data_model, LazyPath("", data_model.get("code")), False, 0
+        while True:
+            token = tokens[index]
+            if token not in CHILD_KEYS:
+                if not nested and token not in DATA_MODEL_IDENTITY_FIELDS:
+                    self.data_model_fields = True
+                elif not nested or token == "code":
+                    self.structural = True
+                return
+            children = group.get(token)
+            child = None
+            if isinstance(children, list) and index + 1 < len(tokens):
+                position = tokens[index + 1]
+                if position == "-" and children:
+                    # Added at the end of the list.
+                    child = children[-1]
+                elif ARRAY_INDEX_REGEX.fullmatch(position) and int(position) < len(children):
+                    child = children[int(position)]
+            if index + 2 >= len(tokens):
+                # A whole 'variables' or 'groups' list, or one of their elements.
+                self.structural = True
+                self.add_tree(children if index + 1 == len(tokens) else child, token)
+                return
+            if not isinstance(child, JSON_OBJECT_TYPES):
+                self.structural = True
+                return
+            if token == "variables":
+                if tokens[index + 2] in CDE_IDENTITY_FIELDS:
+                    self.structural = True
+                self.add_cde(child, LazyPath(path, child.get("code")))
+                return
+            group, path, nested, index = child, LazyPath(path, child.get("code")), True, index + 2
+
+
+def apply_patch(document, operations, touched=None):
+    """
+    Applies the operations of an RFC 6902 JSON Patch to a document, in place, and returns the
+    patched document. When given, touched records the parts of the data model they touched.
+    """
+    if not isinstance(operations, list):
+        raise JsonPatchError("The patch must be a list of operations")
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or operation.get("op") not in OPERATIONS:
+            raise JsonPatchError(f"Operation {index} of the patch must have an 'op' among: {', '.join(OPERATIONS)}")
+        op = operation["op"]
+        pointer = operation_field(operation, "path", index)
+        tokens = parse_pointer(pointer)
+        if op == "test":
+            if not json_equal(plain(resolve(document, tokens, pointer)), operation_field(operation, "value", index)):
+                raise JsonPatchTestFailed(f"Test of operation {index} failed at '{pointer}'")
+            continue
+        if op in ("move", "copy"):
+            source = operation_field(operation, "from", index)
+            source_tokens = parse_pointer(source)
+            if op == "move":
+                if tokens[: len(source_tokens)] == source_tokens and len(tokens) > len(source_tokens):
+                    raise JsonPatchError(f"Operation {index} moves '{source}' into one of its children")
+                if touched is not None:
+                    touched.touch(document, source_tokens)
+                # Moved as plain JSON, like copies, the elements taking their place again once reindexed.
+                document = add(document, tokens, plain(remove(document, source_tokens, source)), pointer)
+            else:
+                value = copy.deepcopy(plain(resolve(document, source_tokens, source)))
+                document = add(document, tokens, value, pointer)
+        elif op == "remove":
+            remove(document, tokens, pointer)
+        elif op == "add":
+            document = add(document, tokens, operation_field(operation, "value", index), pointer)
+        else:
+            document = replace(document, tokens, operation_field(operation, "value", index), pointer)
+        if touched is not None:
+            touched.touch(document, tokens)
+    return document
+
+
+def revalidate(data_model, touched):
+    """
+    Raises an InvalidDataModelError for the first violation in the parts of a data model that a patch
+    touched. Edits of the fields of CDEs only revalidate these CDEs. Structural changes walk the groups
+    of the whole model again, for the uniqueness of the codes and the required CDEs, but still only
+    validate the touched CDEs.
+    """
+    errors = FailFast()
+    if touched.structural:
+        if not isinstance(data_model, JSON_OBJECT_TYPES):
+            errors.add("data_model", "The data model must be a dictionary")
+        collect_data_model_field_errors(data_model, errors)
+
+        def validate_touched_cde(cde, path):
+            if id(cde) in touched.cdes:
+                validate_common_data_element(cde, path)
+
+        seen_codes = set()
+        dataset_present = walk_groups(data_model, "", errors, seen_codes, set(), validate_cde=validate_touched_cde)
+        collect_data_model_content_errors(data_model, dataset_present, seen_codes, errors)
+        return
+    if touched.data_model_fields:
+        collect_data_model_field_errors(data_model, errors)
+    for cde, path in touched.cdes.values():
+        try:
+            validate_common_data_element(cde, path)
+        except InvalidDataModelError as e:
+            errors.add("common_data_element", str(e))
+
+
+def patch_data_model(data_model, operations):
+    """
+    Applies a JSON Patch to a valid data model, JSON or a datamodel.model.DataModel, in place, and
+    revalidates the CDEs and groups it touched. Returns the patched data model. The parts of the
+    model the patch left alone are not validated again.
+    """
+    touched = TouchedElements()
+    data_model = apply_patch(data_model, operations, touched)
+    revalidate(data_model, touched)
+    if isinstance(data_model, DataModel):
+        # The groups and CDEs the patch added are still JSON, and its indexes out of date.
+        data_model.reindex()
+    return data_model
@@ -0,0 +1,22 @@
+"""Gunicorn settings, loaded from the working directory when the service starts."""
+import os
+import shutil
+import tempfile
+
+# Every worker writes its metrics there, for /metrics to aggregate them.
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "data_quality_tool_metrics")
+)
+
+
+def on_starting(server):
+    # Samples of a previous run would be added to the new ones.
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,150 @@
+"""Per-stage timing of the requests, reported in a Server-Timing header and a structured log line."""
+import json
+import logging
+import time
+
+from flask import g, has_request_context, request
+
+from request_logging import current_request_id
+
+logger = logging.getLogger("request")
+
+SERVER_TIMING_HEADER = "Server-Timing"
+
+
+class RequestTimer:
+    """
+    Accumulates the time spent in each stage of a request, on a monotonic clock. Stages are
+    exclusive: the time of a stage nested in another one is only counted in the nested stage.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.fields = {}
+        # The time spent in nested stages, for each stage being timed, the request being the outermost.
+        self._nested = [0.0]
+
+    def _add(self, name, elapsed, nested):
+        self.stages[name] = self.stages.get(name, 0.0) + elapsed - nested
+        self._nested[-1] += elapsed
+
+    def stage(self, name):
+        return TimedStage(self, name)
+
+    def rows(self, rows, name):
+        """Passes the rows through, counting them and timing how long producing them takes as the name stage."""
+        rows = iter(rows)
+        count = 0
+        while True:
+            self._nested.append(0.0)
+            start = time.perf_counter()
+            try:
+                row = next(rows)
+            except StopIteration:
+                break
+            finally:
+                self._add(name, time.perf_counter() - start, self._nested.pop())
+            count += 1
+            self.fields["rows"] = count
+            yield row
+        self.fields["rows"] = count
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+
+class TimedStage:
+    """Times a stage of a request as a context manager."""
+
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.timer._nested.append(0.0)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timer._add(self.name, time.perf_counter() - self.start, self.timer._nested.pop())
+
+
+def current_timer():
+    """The timer of the current request, or a throwaway one outside of requests, e.g. in tests."""
+    if has_request_context() and "request_timer" in g:
+        return g.request_timer
+    return RequestTimer()
+
+
+def timed(name):
+    """Times the code of a with block as the name stage of the current request."""
+    return current_timer().stage(name)
+
+
+def timed_rows(rows, name="read"):
+    """Times how long producing the rows takes as the name stage of the current request, and counts them."""
+    return current_timer().rows(rows, name)
+
+
+def record(**fields):
+    """Adds fields, such as the number of CDEs, to the log line of the current request."""
+    current_timer().fields.update(fields)
+
+
+def record_failed_rules(rules):
+    """Counts the rules broken by the validation errors of the current request."""
+    failed_rules = current_timer().fields.setdefault("failed_rules", {})
+    for rule in rules:
+        failed_rules[rule] = failed_rules.get(rule, 0) + 1
+
+
+def server_timing(stages, total):
+    """Formats stage durations, in seconds, as a Server-Timing header value in milliseconds."""
+    metrics = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in stages.items()]
+    metrics.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(metrics)
+
+
+def instrument(app, observers=()):
+    """
+    Times every request of the app, adding a Server-Timing header and logging one JSON line per request.
+    Each observer is then called with the request, the response, the timer and the total duration.
+    """
+
+    @app.before_request
+    def start_timer():
+        g.request_timer = RequestTimer()
+
+    @app.after_request
+    def report_timings(response):
+        timer = g.pop("request_timer", None)
+        if timer is None:
+            return response
+        total = timer.elapsed()
+        response.headers[SERVER_TIMING_HEADER] = server_timing(timer.stages, total)
+        if logger.isEnabledFor(logging.INFO):
+            line = {
+                "request_id": current_request_id(),
+                "method": request.method,
+                "path": request.path,
+                "endpoint": request.endpoint,
+                "status": response.status_code,
+                "duration_ms": round(total * 1000, 3),
+                "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in timer.stages.items()},
+                "input_bytes": request.content_length,
+                "response_bytes": response.content_length,
+                "cache": response.headers.get("X-Cache"),
+                **timer.fields,
+            }
+            logger.info(json.dumps(line))
+        for observer in observers:
+            try:
+                observer(request, response, timer, total)
+            except Exception:
+                logger.exception("Request observer %r failed", observer)
+        return response
+
+    return app
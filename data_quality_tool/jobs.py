@@ -0,0 +1,219 @@
+"""Asynchronous conversion jobs, run on a local thread pool and tracked in a SQLite store."""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from io import BytesIO
+
+from common_entities import InvalidDataModelError
+from converter.pipeline import excel_to_model
+from datamodel.model import DataModelEncoder
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+# Running jobs that have not reported progress for this long are considered stuck.
+STALE_AFTER_SECONDS = 600
+INTERRUPTED_ERROR = "The job was interrupted before it finished"
+# Only unfinished jobs are updated, so that a job that failed as stale stays failed.
+FAIL_QUERY = (
+    "UPDATE jobs SET status = ?, finished = ?, error = ?, error_status = ? WHERE id = ? AND finished IS NULL"
+)
+
+
+def process_owner():
+    """Identifies the current worker process, on this host, as the owner of the jobs it queues."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def owner_alive(owner):
+    """Whether the process owning a job is still running. Processes of other hosts cannot be checked."""
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobStore:
+    """
+    Keeps the state and result of the jobs in a SQLite database, so that any worker
+    process sharing the file can answer for a job. Finished jobs are kept for ttl seconds.
+    Unfinished jobs fail once the worker process that queued them is gone, once they have not
+    reported progress for stale_after seconds while running, or ttl seconds after they were created.
+    """
+
+    def __init__(self, path, ttl, stale_after=STALE_AFTER_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self.stale_after = stale_after
+        with closing(self._connect()) as connection, connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    rows_processed INTEGER NOT NULL DEFAULT 0,
+                    created REAL NOT NULL,
+                    finished REAL,
+                    result TEXT,
+                    error TEXT,
+                    error_status INTEGER,
+                    owner TEXT,
+                    heartbeat REAL
+                )
+                """
+            )
+            # Databases created before the jobs tracked their owner and heartbeat.
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in (("owner", "TEXT"), ("heartbeat", "REAL")):
+                if column not in columns:
+                    connection.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+
+    def _connect(self):
+        # A connection per operation, as jobs are updated from the pool threads.
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _execute(self, query, parameters=()):
+        with closing(self._connect()) as connection, connection:
+            return connection.execute(query, parameters).fetchone()
+
+    def create(self):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (id, status, created, owner, heartbeat) VALUES (?, ?, ?, ?, ?)",
+            (job_id, QUEUED, now, process_owner(), now),
+        )
+        return job_id
+
+    def start(self, job_id):
+        self._execute(
+            "UPDATE jobs SET status = ?, heartbeat = ? WHERE id = ? AND finished IS NULL",
+            (RUNNING, time.time(), job_id),
+        )
+
+    def progress(self, job_id, rows_processed):
+        self._execute(
+            "UPDATE jobs SET rows_processed = ?, heartbeat = ? WHERE id = ? AND finished IS NULL",
+            (rows_processed, time.time(), job_id),
+        )
+
+    def succeed(self, job_id, result):
+        self._execute(
+            "UPDATE jobs SET status = ?, finished = ?, result = ? WHERE id = ? AND finished IS NULL",
+            (SUCCEEDED, time.time(), result, job_id),
+        )
+
+    def fail(self, job_id, error, error_status):
+        self._execute(FAIL_QUERY, (FAILED, time.time(), error, error_status, job_id))
+
+    def purge(self):
+        """Deletes the jobs that finished more than ttl seconds ago."""
+        self._execute("DELETE FROM jobs WHERE finished < ?", (time.time() - self.ttl,))
+
+    def fail_stale(self):
+        """
+        Fails the unfinished jobs whose worker process is gone, that have been running without
+        reporting progress for stale_after seconds, or that were created more than ttl seconds ago.
+        """
+        now = time.time()
+        with closing(self._connect()) as connection, connection:
+            unfinished = connection.execute(
+                "SELECT id, status, created, owner, heartbeat FROM jobs WHERE finished IS NULL"
+            ).fetchall()
+            stale = [
+                (FAILED, now, INTERRUPTED_ERROR, 500, job_id)
+                for job_id, status, created, owner, heartbeat in unfinished
+                if created < now - self.ttl
+                or (status == RUNNING and (heartbeat or created) < now - self.stale_after)
+                or not owner_alive(owner)
+            ]
+            connection.executemany(FAIL_QUERY, stale)
+
+    def status(self, job_id):
+        """Returns the status of a job as a dictionary, or None when it is unknown or expired."""
+        self.purge()
+        self.fail_stale()
+        row = self._execute(
+            "SELECT status, rows_processed, error FROM jobs WHERE id = ?", (job_id,)
+        )
+        if row is None:
+            return None
+        status, rows_processed, error = row
+        job = {"job_id": job_id, "status": status, "rows_processed": rows_processed}
+        if error is not None:
+            job["error"] = error
+        return job
+
+    def result(self, job_id):
+        """Returns the status, result, error and error status of a job, or None when it is unknown."""
+        self.purge()
+        self.fail_stale()
+        return self._execute(
+            "SELECT status, result, error, error_status FROM jobs WHERE id = ?", (job_id,)
+        )
+
+
+class JobRunner:
+    """
+    Runs conversion jobs on a pool of at most max_workers threads, created on first use
+    so that it is not inherited by forked gunicorn workers.
+    """
+
+    def __init__(self, store, max_workers):
+        self.store = store
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+            return self._pool
+
+    def submit(self, content, filename="", content_type=""):
+        """
+        Queues the conversion of a workbook, or of a CSV/TSV sheet according to its filename
+        or content type, and returns the id of its job at once.
+        """
+        self.store.purge()
+        job_id = self.store.create()
+        self._get_pool().submit(self._run, job_id, content, filename, content_type)
+        return job_id
+
+    def _run(self, job_id, content, filename, content_type):
+        self.store.start(job_id)
+        try:
+            data_model = excel_to_model(
+                BytesIO(content),
+                progress=lambda rows: self.store.progress(job_id, rows),
+                filename=filename,
+                content_type=content_type,
+            )
+        except InvalidDataModelError as e:
+            self.store.fail(job_id, str(e), 400)
+        except Exception as e:
+            self.store.fail(job_id, str(e), 500)
+        else:
+            # Stored compact, the result endpoint formats it as requested.
+            self.store.succeed(job_id, json.dumps(data_model, separators=(",", ":"), cls=DataModelEncoder))
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
@@ -0,0 +1,73 @@
+"""JSON responses negotiated with the client: pretty or compact, compressed or not, buffered or streamed."""
+import zlib
+
+from flask import current_app, request
+
+from datamodel.model import DataModelEncoder
+
+# Encodings in order of preference, along with the zlib window bits producing them.
+ENCODING_WBITS = {"gzip": 31, "deflate": 15}
+IDENTITY = "identity"
+COMPRESSION_LEVEL = 6
+# Buffered bodies smaller than this are not worth compressing.
+MIN_COMPRESS_BYTES = 1024
+CHUNK_SIZE = 64 * 1024
+
+
+def flag_requested(name, default):
+    """Whether a '?<name>=true' flag is set in the query string."""
+    return request.args.get(name, default).lower() in ("1", "true", "yes")
+
+
+def negotiated_encoding():
+    """The preferred content encoding of the Accept-Encoding header among the supported ones."""
+    return request.accept_encodings.best_match(list(ENCODING_WBITS), default=IDENTITY)
+
+
+def compress_chunks(chunks, encoding, level=COMPRESSION_LEVEL):
+    """Compresses a stream of byte chunks incrementally, yielding the non-empty compressed chunks."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, ENCODING_WBITS[encoding])
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def encode_chunks(encoder, data, chunk_size=CHUNK_SIZE):
+    """Encodes data incrementally, joining the small fragments of the encoder into chunks of about chunk_size."""
+    buffer, size = [], 0
+    for fragment in encoder.iterencode(data):
+        buffer.append(fragment)
+        size += len(fragment)
+        if size >= chunk_size:
+            yield "".join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+def json_response(data, status=200):
+    """
+    Serialises data, plain JSON or a datamodel.model.DataModel, for the current request: pretty-printed
+    with an indent of 4 unless '?pretty=false' asks for compact output, encoded incrementally into a
+    streamed response with '?stream=true', and compressed with gzip or deflate when Accept-Encoding allows it.
+    """
+    if flag_requested("pretty", "true"):
+        encoder = DataModelEncoder(indent=4)
+    else:
+        encoder = DataModelEncoder(separators=(",", ":"))
+    encoding = negotiated_encoding()
+    headers = {"Vary": "Accept-Encoding"}
+
+    if flag_requested("stream", "false"):
+        body = encode_chunks(encoder, data)
+        if encoding != IDENTITY:
+            body = compress_chunks(body, encoding)
+            headers["Content-Encoding"] = encoding
+    else:
+        body = encoder.encode(data).encode()
+        if encoding != IDENTITY and len(body) >= MIN_COMPRESS_BYTES:
+            body = b"".join(compress_chunks([body], encoding))
+            headers["Content-Encoding"] = encoding
+    return current_app.response_class(body, status=status, mimetype="application/json", headers=headers)
@@ -0,0 +1,77 @@
+"""
+Prometheus metrics of the service, in the text exposition format.
+
+Under gunicorn, every worker writes its samples to the PROMETHEUS_MULTIPROC_DIR directory,
+set up by gunicorn.conf.py, and /metrics aggregates the samples of all of them.
+"""
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+PREFIX = "data_quality_tool"
+# Durations from a millisecond to a few minutes, for whole requests and single stages.
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Sizes from a kilobyte to a gigabyte.
+SIZE_BUCKETS = tuple(1024 * 4**power for power in range(11))
+
+REQUESTS = Counter(f"{PREFIX}_requests", "Requests handled, by route, method and status.", ["route", "method", "status"])
+REQUEST_DURATION = Histogram(
+    f"{PREFIX}_request_duration_seconds", "Duration of the requests, by route.", ["route"], buckets=DURATION_BUCKETS
+)
+STAGE_DURATION = Histogram(
+    f"{PREFIX}_stage_duration_seconds",
+    "Duration of the stages of the requests, by route and stage.",
+    ["route", "stage"],
+    buckets=DURATION_BUCKETS,
+)
+REQUEST_SIZE = Histogram(
+    f"{PREFIX}_request_size_bytes", "Size of the request bodies, by route.", ["route"], buckets=SIZE_BUCKETS
+)
+RESPONSE_SIZE = Histogram(
+    f"{PREFIX}_response_size_bytes",
+    "Size of the response bodies of known length, by route.",
+    ["route"],
+    buckets=SIZE_BUCKETS,
+)
+ROWS = Counter(f"{PREFIX}_rows_processed", "Sheet rows read or written, by route.", ["route"])
+CDES = Counter(f"{PREFIX}_cdes_processed", "CommonDataElements of the processed data models, by route.", ["route"])
+VALIDATION_FAILURES = Counter(
+    f"{PREFIX}_validation_failures", "Validation errors found, by route and rule.", ["route", "rule"]
+)
+
+
+def observe_request(request, response, timer, duration):
+    """Records the metrics of a finished request, from the stages and fields of its instrumentation timer."""
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    REQUESTS.labels(route, request.method, response.status_code).inc()
+    REQUEST_DURATION.labels(route).observe(duration)
+    for stage, seconds in timer.stages.items():
+        STAGE_DURATION.labels(route, stage).observe(seconds)
+    if request.content_length is not None:
+        REQUEST_SIZE.labels(route).observe(request.content_length)
+    if response.content_length is not None:
+        RESPONSE_SIZE.labels(route).observe(response.content_length)
+    if "rows" in timer.fields:
+        ROWS.labels(route).inc(timer.fields["rows"])
+    if "cdes" in timer.fields:
+        CDES.labels(route).inc(timer.fields["cdes"])
+    for rule, count in timer.fields.get("failed_rules", {}).items():
+        VALIDATION_FAILURES.labels(route, rule).inc(count)
+
+
+def exposition():
+    """Returns the metrics in the text exposition format, aggregated across processes in multiprocess mode."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,146 @@
+"""
+A bounded in-process store of loaded data models, keyed by the hash of their content, along with the
+indexes that answer lookups of CDEs by code and of the CDEs and groups under a concept path.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def content_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def stream_hash(stream, prefix=b""):
+    """The hash of a prefix and of the content of an uploaded stream, read in chunks. The stream is rewound."""
+    digest = hashlib.sha256(prefix)
+    for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+class IndexedModel:
+    """
+    A datamodel.model.DataModel along with its CDEs and groups laid out depth first, in order. The CDEs
+    and groups under any group are then contiguous, and each group maps to their (start, end) slices,
+    so that listing them costs the size of the page rather than of the subtree.
+    Its size, which the store is bounded by, counts its CDEs, groups and enumerations.
+    """
+
+    __slots__ = ("data_model", "cdes", "groups", "size", "_slices")
+
+    def __init__(self, data_model):
+        self.data_model = data_model
+        self.cdes = []
+        self.groups = []
+        self._slices = {}
+        # Each group is pushed twice: to lay out its elements, then to close its slices once its sub groups are done.
+        stack = [(data_model, None)]
+        while stack:
+            group, starts = stack.pop()
+            if starts is not None:
+                self._slices[id(group)] = (starts[0], len(self.cdes), starts[1], len(self.groups))
+                continue
+            if group is not data_model:
+                self.groups.append(group)
+            stack.append((group, (len(self.cdes), len(self.groups))))
+            self.cdes.extend(group.variables or ())
+            stack.extend((sub_group, None) for sub_group in reversed(group.groups or ()))
+        self.size = len(self.cdes) + len(self.groups) + sum(
+            len(cde.enumerations) for cde in self.cdes if isinstance(cde.enumerations, (list, tuple))
+        )
+
+    @property
+    def cde_count(self):
+        return len(self.cdes)
+
+    def group(self, concept_path):
+        """The group at a concept path, the data model itself when it is None, or None if there is none."""
+        if concept_path is None:
+            return self.data_model
+        return self.data_model.group(concept_path)
+
+    def cdes_under(self, group, offset=0, limit=DEFAULT_PAGE_SIZE):
+        """A page of the CDEs of a group and of all its sub groups, along with their total number."""
+        start, end, _, _ = self._slices[id(group)]
+        return self.cdes[min(start + offset, end):min(start + offset + limit, end)], end - start
+
+    def groups_under(self, group, offset=0, limit=DEFAULT_PAGE_SIZE):
+        """A page of the sub groups of a group, at any depth, along with their total number."""
+        _, _, start, end = self._slices[id(group)]
+        return self.groups[min(start + offset, end):min(start + offset + limit, end)], end - start
+
+    def count_cdes_under(self, group):
+        start, end, _, _ = self._slices[id(group)]
+        return end - start
+
+
+class ModelStore:
+    """
+    A thread-safe LRU store of indexed models, keyed by the hash of their content and bounded by
+    their total size, in CDEs, groups and enumerations. Models larger than the whole store are not kept.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._models)
+
+    def get(self, key):
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+            return model
+
+    def set(self, key, model):
+        """Stores a model, evicting the least recently used ones to make room. Returns whether it was kept."""
+        if model.size > self.max_size:
+            return False
+        with self._lock:
+            previous = self._models.pop(key, None)
+            if previous is not None:
+                self.size -= previous.size
+            self._models[key] = model
+            self.size += model.size
+            while self.size > self.max_size:
+                _, evicted = self._models.popitem(last=False)
+                self.size -= evicted.size
+        return True
+
+
+def group_summary(group, model):
+    """The fields of a group that lookups return, without its CDEs and sub groups."""
+    fields = group.to_json()
+    return {
+        "code": fields.get("code"),
+        "label": fields.get("label"),
+        "concept_path": group.concept_path,
+        "cdes": model.count_cdes_under(group),
+        "groups": len(group.groups or ()),
+    }
+
+
+def cde_summary(cde):
+    """A CDE as lookups return it, along with the concept path of its group."""
+    return {"concept_path": cde.group.concept_path, "cde": cde.to_json()}
+
+
+def page(items, total, offset, limit):
+    """A page of a listing, with the offset of the next one or None on the last page."""
+    return {
+        "items": items,
+        "offset": offset,
+        "limit": limit,
+        "total": total,
+        "next_offset": offset + limit if offset + limit < total else None,
+    }
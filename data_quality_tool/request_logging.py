@@ -0,0 +1,107 @@
+"""
+Logging of the service: every line carries the id of its request and is capped in size, and request
+bodies are logged as summaries, with truncated copies of a sample of them for debugging.
+"""
+import hashlib
+import logging
+import random
+import re
+import uuid
+
+from flask import g, has_request_context, request
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Ids of incoming requests are reused when they are safe to log as they are.
+REQUEST_ID_REGEX = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+NO_REQUEST_ID = "-"
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+MAX_MESSAGE_LENGTH = 4096
+PAYLOAD_MAX_BYTES = 1024
+HASH_LENGTH = 16
+
+payload_logger = logging.getLogger("payload")
+
+
+class RequestLogFormatter(logging.Formatter):
+    """Adds the id of the current request to the records and truncates messages longer than max_message_length."""
+
+    def __init__(self, fmt=LOG_FORMAT, max_message_length=MAX_MESSAGE_LENGTH):
+        super().__init__(fmt)
+        self.max_message_length = max_message_length
+
+    def formatMessage(self, record):
+        record.request_id = current_request_id()
+        if len(record.message) > self.max_message_length:
+            record.message = truncate(record.message, self.max_message_length)
+        return super().formatMessage(record)
+
+
+def truncate(text, max_length):
+    if len(text) <= max_length:
+        return text
+    return f"{text[:max_length]}... ({len(text)} characters in total)"
+
+
+def current_request_id():
+    if has_request_context():
+        return g.get("request_id", NO_REQUEST_ID)
+    return NO_REQUEST_ID
+
+
+def configure_logging(level=logging.INFO, max_message_length=MAX_MESSAGE_LENGTH):
+    """Logs to stderr with the request ids, the messages being capped to max_message_length."""
+    handler = logging.StreamHandler()
+    handler.setFormatter(RequestLogFormatter(max_message_length=max_message_length))
+    logging.basicConfig(level=level, handlers=[handler])
+
+
+def payload_summary(body, cdes=None):
+    """Describes a request body by its size, its hash and, when known, its number of CDEs."""
+    summary = f"{len(body)} bytes, sha256 {hashlib.sha256(body).hexdigest()[:HASH_LENGTH]}"
+    if cdes is not None:
+        summary += f", {cdes} CDEs"
+    return summary
+
+
+class PayloadLogger:
+    """
+    Logs a summary of the body of the current request and, for a sample_rate share of the
+    requests, its first max_bytes on the debug level of the payload logger.
+    """
+
+    def __init__(self, sample_rate=0.0, max_bytes=PAYLOAD_MAX_BYTES):
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        if sample_rate > 0:
+            payload_logger.setLevel(logging.DEBUG)
+
+    def log(self, logger, message):
+        body = request.get_data()
+        # Hashing large bodies is only worth it when the summary is logged.
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("%s: %s", message, payload_summary(body))
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            payload_logger.debug(
+                "%s, first %d of %d bytes: %s",
+                message,
+                min(len(body), self.max_bytes),
+                len(body),
+                body[: self.max_bytes].decode("utf-8", "replace"),
+            )
+
+
+def track_requests(app):
+    """Gives every request of the app an id, from its X-Request-ID header or else a new one, and returns it."""
+
+    @app.before_request
+    def assign_request_id():
+        request_id = request.headers.get(REQUEST_ID_HEADER, "")
+        g.request_id = request_id if REQUEST_ID_REGEX.fullmatch(request_id) else uuid.uuid4().hex
+
+    @app.after_request
+    def return_request_id(response):
+        if "request_id" in g:
+            response.headers[REQUEST_ID_HEADER] = g.request_id
+        return response
+
+    return app
@@ -0,0 +1,224 @@
+"""Content-addressed cache of the responses of the conversion and validation endpoints."""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+
+from common_entities import CONVERTER_VERSION
+from instrumentation import timed
+from json_responses import negotiated_encoding
+
+logger = logging.getLogger(__name__)
+
+CACHE_HEADER = "X-Cache"
+# Only deterministic outcomes are cached, server errors may be transient.
+CACHEABLE_STATUSES = (200, 400)
+CACHED_HEADERS = ("Content-Type", "Content-Disposition", "Content-Encoding", "Vary")
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class CachedResponse:
+    """The parts of a response needed to replay it."""
+
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def size(self):
+        return len(self.body)
+
+
+class MemoryCache:
+    """A thread-safe LRU cache bounded by the total size of the cached bodies."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous.size
+            self._entries[key] = entry
+            self.size += entry.size
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.size
+
+
+class DiskCache:
+    """
+    A cache of one file per entry, shared by all the worker processes using the same directory.
+    Once the files exceed max_bytes, the least recently used ones are deleted.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.cache")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as file:
+                metadata = json.loads(file.readline())
+                body = file.read()
+            # The modification time tracks the last use, for eviction.
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return CachedResponse(metadata["status"], metadata["headers"], body)
+
+    def set(self, key, entry):
+        if entry.size > self.max_bytes:
+            return
+        metadata = json.dumps({"status": entry.status, "headers": entry.headers})
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                file.write(metadata.encode() + b"\n")
+                file.write(entry.body)
+            os.replace(temporary_path, self._path(key))
+        except OSError:
+            logger.exception("Could not write cache entry %s", key)
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            return
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        with os.scandir(self.directory) as directory_entries:
+            for directory_entry in directory_entries:
+                if directory_entry.name.endswith(".cache"):
+                    try:
+                        stat = directory_entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, directory_entry.path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+
+
+class ResultCache:
+    """An in-memory LRU tier in front of an optional on-disk tier."""
+
+    def __init__(self, memory_max_bytes, disk_directory=None, disk_max_bytes=0):
+        self.memory = MemoryCache(memory_max_bytes)
+        self.disk = DiskCache(disk_directory, disk_max_bytes) if disk_directory else None
+
+    @property
+    def max_entry_bytes(self):
+        return max(self.memory.max_bytes, self.disk.max_bytes if self.disk else 0)
+
+    def get(self, key):
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self.memory.set(key, entry)
+        return entry
+
+    def set(self, key, entry):
+        self.memory.set(key, entry)
+        if self.disk is not None:
+            self.disk.set(key, entry)
+
+
+def request_key():
+    """
+    Hashes the current request with SHA-256, along with the converter version, the
+    negotiated content encoding and the accepted media types.
+    Uploaded files are hashed by content rather than the raw multipart body,
+    whose boundary changes on every upload of the same workbook, along with their
+    filename and content type, which select the reader of the sheet.
+    """
+    digest = hashlib.sha256()
+    digest.update(CONVERTER_VERSION.encode())
+    digest.update(b"\0" + request.path.encode())
+    digest.update(b"\0" + request.query_string)
+    # Responses are compressed according to Accept-Encoding, and their format may follow Accept.
+    digest.update(b"\0" + negotiated_encoding().encode())
+    digest.update(b"\0" + request.headers.get("Accept", "").encode())
+    if request.files:
+        for field, file in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+            digest.update(b"\0" + field.encode() + b"\0")
+            digest.update((file.filename or "").encode() + b"\0" + (file.mimetype or "").encode() + b"\0")
+            for chunk in iter(lambda: file.stream.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+            file.stream.seek(0)
+    else:
+        digest.update(b"\0" + request.get_data())
+    return digest.hexdigest()
+
+
+def cached_response(cache):
+    """
+    Serves the responses of a view from the cache, flagging them as a hit or a miss. Streamed
+    responses are passed through uncached, so that their body is never buffered in memory.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            with timed("cache"):
+                key = request_key()
+                entry = cache.get(key)
+            if entry is not None:
+                response = current_app.response_class(
+                    entry.body, status=entry.status, headers=entry.headers
+                )
+                response.headers[CACHE_HEADER] = "HIT"
+                return response
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if (
+                response.status_code in CACHEABLE_STATUSES
+                and not response.is_streamed
+                and not response.direct_passthrough
+                and response.content_length is not None
+                and response.content_length <= cache.max_entry_bytes
+            ):
+                headers = {
+                    name: response.headers[name] for name in CACHED_HEADERS if name in response.headers
+                }
+                with timed("cache"):
+                    cache.set(key, CachedResponse(response.status_code, headers, response.get_data()))
+            response.headers[CACHE_HEADER] = "MISS"
+            return response
+
+        return wrapper
+
+    return decorator
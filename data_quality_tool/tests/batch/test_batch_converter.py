@@ -0,0 +1,97 @@
+import json
+import unittest
+import zipfile
+from io import BytesIO
+
+from batch import BatchConverter, InvalidBatchError, output_name, read_zip_workbooks
+from controller import app
+
+
+def read_example():
+    with open("MinimalDataModelExample.xlsx", "rb") as file:
+        return file.read()
+
+
+class TestBatchConverter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.converter = BatchConverter(max_workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.converter.shutdown()
+
+    def test_failure_does_not_abort_other_files(self):
+        workbooks = [
+            ("first.xlsx", read_example()),
+            ("broken.xlsx", b"not a workbook"),
+            ("nested/first.xlsx", read_example()),
+        ]
+        output, manifest = self.converter.convert(workbooks)
+        self.assertEqual([entry["status"] for entry in manifest], ["converted", "failed", "converted"])
+        with zipfile.ZipFile(output) as archive:
+            self.assertEqual(
+                sorted(archive.namelist()), ["first.json", "manifest.json", "nested/first.json"]
+            )
+            self.assertEqual(json.loads(archive.read("first.json"))["code"], "Minimal Example")
+            self.assertEqual(json.loads(archive.read("manifest.json")), manifest)
+
+    def test_output_names_do_not_clash(self):
+        used_names = set()
+        self.assertEqual(output_name("model.xlsx", used_names), "model.json")
+        self.assertEqual(output_name("model.xlsx", used_names), "model_2.json")
+        self.assertEqual(output_name("manifest.xlsx", used_names), "manifest_2.json")
+        self.assertEqual(output_name("../../model.xlsx", used_names), "model_3.json")
+
+    def test_zip_limits(self):
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, "w") as zip_file:
+            zip_file.writestr("a.xlsx", b"x" * 10)
+            zip_file.writestr("b.xlsx", b"x" * 10)
+            zip_file.writestr("notes.txt", b"x")
+        with self.assertRaisesRegex(InvalidBatchError, "at most 1 workbooks"):
+            list(read_zip_workbooks(BytesIO(archive.getvalue()), max_files=1, max_bytes=100))
+        with self.assertRaisesRegex(InvalidBatchError, "at most 15 bytes"):
+            list(read_zip_workbooks(BytesIO(archive.getvalue()), max_files=5, max_bytes=15))
+        self.assertEqual(
+            [name for name, _ in read_zip_workbooks(BytesIO(archive.getvalue()), 5, 100)],
+            ["a.xlsx", "b.xlsx"],
+        )
+
+
+class TestBatchEndpoint(unittest.TestCase):
+    def setUp(self):
+        app.testing = True
+        self.client = app.test_client()
+
+    def test_multi_file_upload(self):
+        data = {
+            "files": [
+                (BytesIO(read_example()), "first.xlsx"),
+                (BytesIO(read_example()), "second.xlsx"),
+            ]
+        }
+        response = self.client.post("/batch/excel-to-json", content_type="multipart/form-data", data=data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content_type, "application/zip")
+        with zipfile.ZipFile(BytesIO(response.data)) as archive:
+            manifest = json.loads(archive.read("manifest.json"))
+        self.assertEqual([entry["output"] for entry in manifest], ["first.json", "second.json"])
+
+    def test_zip_upload(self):
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, "w") as zip_file:
+            zip_file.writestr("model.xlsx", read_example())
+        data = {"file": (BytesIO(archive.getvalue()), "models.zip")}
+        response = self.client.post("/batch/excel-to-json", content_type="multipart/form-data", data=data)
+        self.assertEqual(response.status_code, 200)
+
+    def test_invalid_archive(self):
+        data = {"file": (BytesIO(b"not a zip"), "models.zip")}
+        response = self.client.post("/batch/excel-to-json", content_type="multipart/form-data", data=data)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json, {"error": "The uploaded archive is not a valid zip file."})
+
+    def test_no_files(self):
+        response = self.client.post("/batch/excel-to-json", content_type="multipart/form-data", data={})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,55 @@
+import unittest
+
+from benchmarks.run import run_benchmarks
+from benchmarks.synthetic import generate_data_model
+from converter.json_to_excel import recursive_parse_json
+from validator.json_validator import validate_json
+
+
+class TestGenerateDataModel(unittest.TestCase):
+
+    def test_valid_model_of_the_requested_shape(self):
+        data_model = generate_data_model(cdes=50, depth=2, fan_out=3, enumeration_size=4, nominal_share=0.5)
+        validate_json(data_model)
+        self.assertEqual(len(data_model["groups"]), 3)
+        self.assertEqual(len(data_model["groups"][0]["groups"]), 3)
+        rows = recursive_parse_json(data_model)
+        self.assertEqual(len(rows), 51)
+        nominal = [variable for group in data_model["groups"] for variable in group["variables"] if variable["type"] == "nominal"]
+        self.assertTrue(all(len(variable["enumerations"]) == 4 for variable in nominal))
+
+    def test_reproducible(self):
+        self.assertEqual(generate_data_model(cdes=20, seed=1), generate_data_model(cdes=20, seed=1))
+        self.assertNotEqual(generate_data_model(cdes=20, seed=1), generate_data_model(cdes=20, seed=2))
+
+    def test_nominal_share(self):
+        data_model = generate_data_model(cdes=30, depth=1, fan_out=1, nominal_share=0)
+        self.assertEqual({variable["type"] for variable in data_model["groups"][0]["variables"]}, {"integer", "real"})
+
+    def test_invalid_shape(self):
+        with self.assertRaises(ValueError):
+            generate_data_model(depth=0)
+
+
+class TestRunBenchmarks(unittest.TestCase):
+
+    def test_every_stage_is_timed(self):
+        results = run_benchmarks({"cdes": 10, "depth": 1, "fan_out": 2}, repeat=1)
+        self.assertEqual(
+            list(results["stages"]),
+            [
+                "validate_json",
+                "validate_json_endpoint",
+                "load_json",
+                "convert_json_to_excel",
+                "xlsx_write",
+                "workbook_read",
+                "validate_excel",
+                "convert_excel_to_json",
+                "excel_to_data_model",
+                "excel_to_model",
+                "encode_model",
+                "excel_to_json",
+            ],
+        )
+        self.assertTrue(all(len(stage["seconds"]) == 1 for stage in results["stages"].values()))
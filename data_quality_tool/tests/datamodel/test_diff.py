@@ -0,0 +1,185 @@
+import copy
+import json
+import os
+import unittest
+from io import BytesIO
+
+from benchmarks.synthetic import generate_data_model
+from common_entities import EXCEL_COLUMNS
+from controller import app
+from converter.excel_writer import write_excel_rows
+from converter.json_to_excel import iter_json_rows
+from datamodel.diff import diff_data_models, diff_enumerations, index_data_model
+from datamodel.model import load_json
+
+TEST_DIR = os.path.dirname(os.path.dirname(__file__))
+
+
+def load_example():
+    with open(os.path.join(TEST_DIR, "MinimalDataModelExample.json")) as file:
+        return json.load(file)
+
+
+class TestIndexDataModel(unittest.TestCase):
+
+    def test_index(self):
+        cdes, groups = index_data_model(load_example())
+        self.assertEqual(list(cdes), ["dataset", "group_variable", "nested_group_variable"])
+        self.assertEqual(cdes["dataset"][0], "")
+        self.assertEqual(cdes["nested_group_variable"][0], "Example Group/Nested Group")
+        self.assertEqual({code: path for code, (path, _) in groups.items()}, {
+            "Example Group": "",
+            "Nested Group": "Example Group",
+        })
+
+    def test_deep_model(self):
+        data_model = load_example()
+        group = data_model["groups"][0]
+        for depth in range(5000):
+            sub_group = {"code": f"deep_{depth}", "label": f"deep_{depth}", "variables": [], "groups": []}
+            group["groups"].append(sub_group)
+            group = sub_group
+        group["variables"].append({"code": "deepest", "label": "Deepest", "type": "text", "sql_type": "text"})
+        cdes, groups = index_data_model(data_model)
+        self.assertEqual(cdes["deepest"][0].count("/"), 5000)
+        self.assertEqual(len(groups), 5002)
+
+
+class TestDiffDataModels(unittest.TestCase):
+    def setUp(self):
+        self.old = load_example()
+        self.new = copy.deepcopy(self.old)
+
+    def test_identical(self):
+        changes = diff_data_models(self.old, self.new)
+        self.assertEqual(changes["data_model"], {})
+        for element in ("cdes", "groups"):
+            self.assertEqual(changes["summary"][element], {"added": 0, "removed": 0, "moved": 0, "modified": 0})
+
+    def test_added_and_removed(self):
+        removed = self.new["groups"][0]["groups"].pop()
+        self.new["groups"][0]["variables"].append(
+            {"code": "new_variable", "label": "New", "type": "text", "sql_type": "text"}
+        )
+        changes = diff_data_models(self.old, self.new)
+        self.assertEqual(changes["cdes"]["added"], [{"code": "new_variable", "path": "Example Group"}])
+        self.assertEqual(
+            changes["cdes"]["removed"],
+            [{"code": "nested_group_variable", "path": "Example Group/Nested Group"}],
+        )
+        self.assertEqual(changes["groups"]["removed"], [{"code": removed["code"], "path": "Example Group"}])
+        self.assertEqual(changes["groups"]["modified"], [])
+
+    def test_moved(self):
+        nested = self.new["groups"][0]["groups"].pop()
+        self.new["groups"].append(nested)
+        changes = diff_data_models(self.old, self.new)
+        self.assertEqual(changes["groups"]["moved"], [{"code": "Nested Group", "from": "Example Group", "to": ""}])
+        self.assertEqual(
+            changes["cdes"]["moved"],
+            [{"code": "nested_group_variable", "from": "Example Group/Nested Group", "to": "Nested Group"}],
+        )
+        self.assertEqual(changes["cdes"]["modified"], [])
+
+    def test_modified(self):
+        self.new["version"] = "2.0"
+        self.new["groups"][0]["label"] = "Renamed Group"
+        variable = self.new["groups"][0]["variables"][0]
+        variable["maxValue"] = 120
+        variable["type"] = "real"
+        del variable["units"]
+        nested = self.new["groups"][0]["groups"][0]["variables"][0]
+        nested["enumerations"] = [
+            {"code": "nested_enum2", "label": "Nested Enumeration 2"},
+            {"code": "nested_enum1", "label": "First"},
+        ]
+        changes = diff_data_models(self.old, self.new)
+        self.assertEqual(changes["data_model"], {"version": {"old": "1.0", "new": "2.0"}})
+        self.assertEqual(
+            changes["groups"]["modified"],
+            [{"code": "Example Group", "path": "", "changes": {"label": {"old": "Example Group", "new": "Renamed Group"}}}],
+        )
+        modified = {change["code"]: change["changes"] for change in changes["cdes"]["modified"]}
+        self.assertEqual(modified["group_variable"], {
+            "maxValue": {"old": 100, "new": 120},
+            "type": {"old": "integer", "new": "real"},
+            "units": {"old": "years", "new": None},
+        })
+        self.assertEqual(modified["nested_group_variable"], {
+            "enumerations": {
+                "added": [{"code": "nested_enum2", "label": "Nested Enumeration 2"}],
+                "removed": [],
+                "relabelled": [{"code": "nested_enum1", "old": "Nested Enumeration 1", "new": "First"}],
+            }
+        })
+
+    def test_reordered_enumerations_are_unchanged(self):
+        old = [{"code": "a", "label": "A"}, {"code": "b", "label": "B"}]
+        self.assertEqual(
+            diff_enumerations(old, list(reversed(old))), {"added": [], "removed": [], "relabelled": []}
+        )
+
+    def test_large_models(self):
+        old = generate_data_model(cdes=5000, depth=3, fan_out=4, seed=1)
+        new = generate_data_model(cdes=5000, depth=3, fan_out=4, seed=2)
+        changes = diff_data_models(old, new)
+        self.assertEqual(changes["summary"]["cdes"]["added"], 0)
+        self.assertEqual(changes["summary"]["cdes"]["removed"], 0)
+        self.assertGreater(changes["summary"]["cdes"]["modified"], 0)
+
+
+    def test_same_changes_between_loaded_models(self):
+        old = generate_data_model(cdes=500, depth=3, fan_out=4, seed=1)
+        new = generate_data_model(cdes=500, depth=3, fan_out=4, seed=2)
+        new["groups"][0]["groups"].append(new["groups"][1]["groups"].pop())
+        new["groups"][2]["variables"].pop()
+        new["groups"][2]["label"] = "Relabelled"
+        changes = diff_data_models(old, new)
+        old_model, new_model = load_json(old), load_json(new)
+        self.assertEqual(diff_data_models(old_model, new_model), changes)
+        self.assertEqual(diff_data_models(old, new_model), changes)
+        # Diffing reads the models without expanding their compacted enumerations.
+        nominal = [cde for model in (old_model, new_model) for cde in model.iter_cdes() if cde.type == "nominal"]
+        self.assertTrue(nominal)
+        self.assertTrue(all(type(cde.enumerations) is tuple for cde in nominal))
+
+
+class TestDiffEndpoint(unittest.TestCase):
+    def setUp(self):
+        app.testing = True
+        self.client = app.test_client()
+
+    def test_json_models(self):
+        old = load_example()
+        new = copy.deepcopy(old)
+        new["label"] = "Diff Example"
+        response = self.client.post("/diff", json={"old": old, "new": new})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["data_model"], {"label": {"old": "Minimal Example", "new": "Diff Example"}})
+
+    def test_workbooks(self):
+        workbook = BytesIO()
+        write_excel_rows(workbook, EXCEL_COLUMNS, iter_json_rows(load_example()))
+        content = workbook.getvalue()
+        response = self.client.post(
+            "/diff", data={"old": (BytesIO(content), "old.xlsx"), "new": (BytesIO(content), "new.xlsx")}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["summary"]["cdes"], {"added": 0, "removed": 0, "moved": 0, "modified": 0})
+
+    def test_invalid_model(self):
+        old = load_example()
+        new = copy.deepcopy(old)
+        del new["code"]
+        response = self.client.post("/diff", json={"old": old, "new": new})
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.json["error"].startswith("Invalid 'new' data model: "))
+
+    def test_missing_model(self):
+        response = self.client.post("/diff", json={"new": load_example()})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json["error"], "Invalid 'old' data model: missing from the request body")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,331 @@
+import copy
+import json
+import os
+import unittest
+from io import BytesIO
+
+from benchmarks.synthetic import generate_data_model
+from common_entities import EXCEL_COLUMNS, InvalidDataModelError
+from controller import app
+from converter.excel_to_json import process_variable
+from converter.excel_writer import write_excel_rows
+from converter.json_to_excel import iter_json_rows
+from converter.pipeline import convert_rows_to_model
+from datamodel.model import MISSING, CommonDataElement, DataModel, DataModelBuilder, DataModelEncoder, load_json
+from validator.json_validator import collect_json_errors
+
+TEST_DIR = os.path.dirname(os.path.dirname(__file__))
+
+
+def load_example():
+    with open(os.path.join(TEST_DIR, "MinimalDataModelExample.json")) as file:
+        return json.load(file)
+
+
+def make_row(**fields):
+    return {column: fields.get(column) for column in EXCEL_COLUMNS}
+
+
+LIST_KEYS = ("variables", "groups", "enumerations")
+
+
+def build_with_dicts(variables):
+    """
+    The data model as the original converter built it out of processed variables, in plain dicts: a linear
+    search of each group, then clean_empty_fields over the whole model. DataModelBuilder must agree with it.
+    """
+    def insert(root, variable, path):
+        for part in path[:-1]:
+            for group in root["groups"]:
+                if group["code"] == part:
+                    root = group
+                    break
+            else:
+                group = {"code": part, "label": part, "groups": [], "variables": []}
+                root["groups"].append(group)
+                root = group
+        root["variables"].append(variable)
+
+    def clean(data):
+        if isinstance(data, dict):
+            empty = [key for key, value in data.items() if key in LIST_KEYS and not value or value == ""]
+            for key in empty:
+                del data[key]
+            for value in data.values():
+                clean(value)
+        elif isinstance(data, list):
+            for item in data:
+                clean(item)
+
+    root = {"variables": [], "groups": [], "code": "root"}
+    for variable in variables:
+        if not variable.get("conceptPath") or variable["conceptPath"] == "None":
+            raise InvalidDataModelError(f"The variable {variable['code']} is missing the conceptPath")
+        path = variable.pop("conceptPath").split("/")
+        insert(root, variable, path)
+    if not root["groups"]:
+        return {"code": "No groups found", "groups": [], "variables": root["variables"]}
+    data_model = root["groups"][0]
+    data_model["version"] = "to be defined"
+    clean(data_model)
+    return data_model
+
+
+class TestLoadJson(unittest.TestCase):
+
+    def setUp(self):
+        self.json_data = load_example()
+        self.data_model = load_json(self.json_data)
+
+    def test_indexes(self):
+        self.assertEqual(list(self.data_model.cde_index), ["dataset", "group_variable", "nested_group_variable"])
+        self.assertEqual(self.data_model.cde_count, 3)
+        nested = self.data_model.cde("nested_group_variable")
+        self.assertIs(self.data_model.group("Minimal Example/Example Group/Nested Group"), nested.group)
+        self.assertIs(self.data_model.group("Minimal Example"), self.data_model)
+        self.assertEqual(nested.group.parent.code, "Example Group")
+        self.assertIsNone(self.data_model.cde("missing"))
+
+    def test_fields(self):
+        cde = self.data_model.cde("dataset")
+        self.assertEqual(cde.sql_type, "text")
+        self.assertEqual(cde.get("isCategorical"), True)
+        self.assertEqual(cde.get("enumerations"), self.json_data["variables"][0]["enumerations"])
+        self.assertEqual(cde.units, "unit")
+        self.assertIs(cde.comments, MISSING)
+        self.assertEqual(cde.get("comments", ""), "")
+        self.assertFalse(hasattr(cde, "__dict__"))
+
+    def test_round_trip(self):
+        self.json_data["groups"][0]["variables"][0]["custom"] = {"kept": True}
+        self.json_data["groups"][0]["groups"][0]["variables"].append({"code": "raw", "enumerations": [{"code": "a"}]})
+        self.assertEqual(load_json(self.json_data).to_dict(), self.json_data)
+
+    def test_empty_lists_are_kept(self):
+        json_data = {"code": "dm", "label": "DM", "version": "1", "variables": [], "groups": [{"code": "g"}]}
+        self.assertEqual(load_json(json_data).to_dict(), json_data)
+
+    def test_key_order_round_trip(self):
+        def reverse_keys(value):
+            if isinstance(value, dict):
+                return {key: reverse_keys(value[key]) for key in reversed(list(value))}
+            if isinstance(value, list):
+                return [reverse_keys(item) for item in value]
+            return value
+
+        json_data = reverse_keys(self.json_data)
+        data_model = load_json(json_data)
+        self.assertEqual(json.dumps(data_model.to_dict()), json.dumps(json_data))
+        self.assertEqual(json.dumps(data_model, cls=DataModelEncoder, indent=4), json.dumps(json_data, indent=4))
+
+    def test_malformed_values_are_kept(self):
+        json_data = {
+            "code": "dm",
+            "variables": [1, {"code": "dataset", "enumerations": "none"}],
+            "groups": [{"code": "g", "groups": {"code": "h"}, "variables": "none"}, "group"],
+        }
+        data_model = load_json(json_data)
+        self.assertEqual(data_model.to_dict(), json_data)
+        self.assertEqual(collect_json_errors(data_model).to_dict(), collect_json_errors(json_data).to_dict())
+
+    def test_reads_like_a_dict(self):
+        group = self.data_model["groups"][0]
+        self.assertEqual(list(group), list(self.json_data["groups"][0]))
+        self.assertEqual((group["code"], group.get("missing", "default")), ("Example Group", "default"))
+        self.assertIn("variables", group)
+        self.assertNotIn("version", group)
+        with self.assertRaises(KeyError):
+            group["version"]
+        group["custom"] = {"kept": True}
+        group["label"] = "Renamed"
+        self.assertEqual(list(group)[-1], "custom")
+        self.assertEqual(group.pop("code"), "Example Group")
+        self.assertNotIn("code", group)
+        cde = self.data_model.cde("dataset")
+        cde["enumerations"].append({"code": "added", "label": "Added"})
+        self.json_data["variables"][0]["enumerations"].append({"code": "added", "label": "Added"})
+        self.json_data["groups"][0].update({"label": "Renamed", "custom": {"kept": True}})
+        del self.json_data["groups"][0]["code"]
+        self.assertEqual(self.data_model.to_dict(), self.json_data)
+
+    def test_cde_count(self):
+        json_data = {"code": "dm", "groups": [{"code": "g", "variables": [{"code": "a"}]}]}
+        self.assertEqual(load_json(json_data).cde_count, 1)
+        self.assertEqual(load_json({"code": "dm", "variables": [{"code": "dataset"}]}).cde_count, 1)
+        self.assertEqual(load_json({"code": "dm"}).cde_count, 0)
+
+    def test_deep_model(self):
+        group = self.json_data["groups"][0]
+        for depth in range(5000):
+            sub_group = {"code": f"deep_{depth}", "label": f"deep_{depth}", "groups": []}
+            group["groups"].append(sub_group)
+            group = sub_group
+        group["variables"] = [{"code": "deepest", "label": "Deepest", "type": "text"}]
+        data_model = load_json(self.json_data)
+        self.assertEqual(data_model.cde("deepest").group.code, "deep_4999")
+        group = data_model.to_dict()["groups"][0]["groups"][-1]
+        while "variables" not in group:
+            group = group["groups"][0]
+        self.assertEqual(group["variables"], [{"label": "Deepest", "code": "deepest", "type": "text"}])
+        self.assertIn('"code": "deepest"', json.dumps(data_model, cls=DataModelEncoder, indent=4))
+
+
+class TestConvertRowsToModel(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = [
+            make_row(name="Dataset", code="dataset", type="nominal",
+                     values='{"d1", "Dataset 1"}, {"d2", ""}', conceptPath="Model/dataset"),
+            make_row(name="Integer", code="int_var", type="integer",
+                     values="0-100", conceptPath="Model/Group/int_var"),
+            make_row(name="Text", code="text_var", type="text", conceptPath="Model/Group/Nested/text_var"),
+        ]
+
+    def assert_same_as_dicts(self, rows):
+        expected = build_with_dicts(process_variable(dict(row)) for row in rows)
+        data_model = convert_rows_to_model(EXCEL_COLUMNS, iter(copy.deepcopy(rows)))
+        self.assertEqual(data_model.to_dict(), expected)
+        for options in ({"indent": 4}, {"separators": (",", ":")}):
+            with self.subTest(options=options):
+                encoded = json.dumps(data_model, cls=DataModelEncoder, **options)
+                self.assertEqual(encoded, json.dumps(expected, **options))
+        return data_model
+
+    def test_same_as_dicts(self):
+        data_model = self.assert_same_as_dicts(self.rows)
+        self.assertIsInstance(data_model, DataModel)
+        self.assertEqual(data_model.version, "to be defined")
+        self.assertEqual(data_model.cde_count, 3)
+        self.assertEqual(data_model.cde("text_var").group.concept_path, "Model/Group/Nested")
+        self.assertIs(data_model.group("Model/Group"), data_model.cde("int_var").group)
+
+    def test_other_top_groups_are_dropped(self):
+        self.rows.append(make_row(name="Other", code="other", type="text", conceptPath="Other/other"))
+        self.rows.append(make_row(name="Top", code="top", type="text", conceptPath="top"))
+        data_model = self.assert_same_as_dicts(self.rows)
+        self.assertEqual(data_model.cde_count, 3)
+        self.assertIsNone(data_model.cde("other"))
+        self.assertIsNone(data_model.group("Other"))
+
+    def test_no_groups(self):
+        data_model = self.assert_same_as_dicts([
+            make_row(name="Top", code="top", type="nominal", values='{"a", ""}', conceptPath="top"),
+        ])
+        self.assertEqual(data_model.cde_count, 1)
+        self.assertIsInstance(data_model.cde("top"), CommonDataElement)
+
+    def test_cdes_outside_of_the_top_group(self):
+        response = app.test_client().post(
+            "/excel-to-json?pretty=false",
+            data={"file": (BytesIO(self.workbook(self.rows[1:2])), "model.xlsx")},
+            content_type="multipart/form-data",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["groups"][0]["variables"][0]["code"], "int_var")
+
+    @staticmethod
+    def workbook(rows):
+        output = BytesIO()
+        write_excel_rows(output, EXCEL_COLUMNS, [[row[column] or "" for column in EXCEL_COLUMNS] for row in rows])
+        return output.getvalue()
+
+
+
+class TestDataModelBuilder(unittest.TestCase):
+
+    def build(self, concept_paths):
+        builder = DataModelBuilder()
+        for concept_path in concept_paths:
+            builder.insert({"code": concept_path.split("/")[-1], "conceptPath": concept_path})
+        return builder.finish()
+
+    def test_groups_keep_first_appearance_order(self):
+        codes = [f"Group{i}" for i in range(1000, 0, -1)]
+        data_model = self.build([f"Model/{code}/V{index}" for index in range(2) for code in codes])
+        self.assertEqual([group["code"] for group in data_model["groups"]], codes)
+        self.assertTrue(all(len(group["variables"]) == 2 for group in data_model["groups"]))
+
+    def test_groups_and_cdes_are_indexed(self):
+        data_model = self.build(["M/G1/a", "M/G2/Shared/b", "M/G1/Shared/c", "M/G2/d", "M/G1/Shared/e"])
+        self.assertEqual(list(data_model.group_index), ["M", "M/G1", "M/G1/Shared", "M/G2", "M/G2/Shared"])
+        for concept_path, group in data_model.group_index.items():
+            self.assertEqual(group.concept_path, concept_path)
+        shared = data_model.group_index["M/G1/Shared"]
+        self.assertIs(shared, data_model["groups"][0]["groups"][0])
+        self.assertEqual([cde["code"] for cde in shared["variables"]], ["c", "e"])
+        self.assertIs(data_model.cde_index["e"], shared["variables"][1])
+        self.assertIs(data_model.cde_index["b"].group, data_model.group_index["M/G2/Shared"])
+        self.assertEqual(data_model.cde_count, 5)
+
+    def test_deeply_nested_groups(self):
+        data_model = self.build(["M/G1/G2/G3/G4/V"])
+        deepest = data_model.group_index["M/G1/G2/G3/G4"]
+        self.assertEqual(deepest["code"], "G4")
+        self.assertEqual(deepest["variables"][0].to_dict(), {"code": "V"})
+
+
+class TestBuilderAgreesWithDicts(unittest.TestCase):
+    """DataModelBuilder against build_with_dicts, so that the two cannot drift apart."""
+
+    def assert_agree(self, variables):
+        expected = build_with_dicts(copy.deepcopy(variables))
+        builder = DataModelBuilder()
+        for variable in copy.deepcopy(variables):
+            builder.insert(variable)
+        data_model = builder.finish()
+        self.assertEqual(data_model.to_dict(), expected)
+        self.assertEqual(json.dumps(data_model, cls=DataModelEncoder), json.dumps(expected))
+
+    @staticmethod
+    def variables(json_data):
+        return [process_variable(dict(zip(EXCEL_COLUMNS, row))) for row in iter_json_rows(json_data)]
+
+    def test_synthetic_models(self):
+        for depth, fan_out in ((1, 1), (3, 4), (6, 2)):
+            with self.subTest(depth=depth, fan_out=fan_out):
+                json_data = generate_data_model(cdes=500, depth=depth, fan_out=fan_out, seed=depth)
+                self.assert_agree(self.variables(json_data))
+
+    def test_example(self):
+        self.assert_agree(self.variables(load_example()))
+
+    def test_edge_cases(self):
+        text = {"type": "text", "name": "Text", "description": ""}
+        cases = {
+            "no groups": [make_row(code="a", conceptPath="a", **text), make_row(code="b", conceptPath="b", **text)],
+            "several top groups": [
+                make_row(code="a", conceptPath="Model/a", **text),
+                make_row(code="b", conceptPath="Other/b", **text),
+                make_row(code="c", conceptPath="Model/Group/c", **text),
+                make_row(code="d", conceptPath="Other/Group/d", **text),
+            ],
+            "outside of groups": [
+                make_row(code="a", conceptPath="a", **text),
+                make_row(code="b", conceptPath="M/b", **text),
+            ],
+            "empty group codes": [
+                make_row(code="a", conceptPath="/a", **text),
+                make_row(code="b", conceptPath="//b", **text),
+                make_row(code="c", conceptPath="/Group//c", **text),
+            ],
+            "empty enumeration labels": [
+                make_row(code="a", type="nominal", values='{"x", ""}, {"y", "Y"}', conceptPath="M/a"),
+                make_row(code="b", type="nominal", values='{"x", "X"}', conceptPath="M/G/b"),
+                make_row(code="c", type="nominal", values='{"x", ""}', conceptPath="c"),
+            ],
+        }
+        for name, rows in cases.items():
+            with self.subTest(name):
+                self.assert_agree([process_variable(row) for row in rows])
+
+    def test_missing_concept_path(self):
+        variables = [process_variable(make_row(code="a", type="text"))]
+        with self.assertRaises(InvalidDataModelError) as expected:
+            build_with_dicts(copy.deepcopy(variables))
+        with self.assertRaises(InvalidDataModelError) as error:
+            DataModelBuilder().insert(copy.deepcopy(variables[0]))
+        self.assertEqual(str(error.exception), str(expected.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
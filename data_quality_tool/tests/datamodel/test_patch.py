@@ -0,0 +1,274 @@
+import copy
+import json
+import os
+import unittest
+
+from controller import app
+from datamodel.model import CommonDataElement, DataModelEncoder, Group, load_json
+from datamodel.patch import (
+    JsonPatchError,
+    JsonPatchTestFailed,
+    TouchedElements,
+    apply_patch,
+    parse_pointer,
+    patch_data_model,
+)
+from validator.json_validator import InvalidDataModelError
+
+TEST_DIR = os.path.dirname(os.path.dirname(__file__))
+
+
+def load_example():
+    with open(os.path.join(TEST_DIR, "MinimalDataModelExample.json")) as file:
+        return json.load(file)
+
+
+class TestApplyPatch(unittest.TestCase):
+
+    def test_parse_pointer(self):
+        self.assertEqual(parse_pointer(""), [])
+        self.assertEqual(parse_pointer("/a~1b/m~0n/0"), ["a/b", "m~n", "0"])
+        with self.assertRaises(JsonPatchError):
+            parse_pointer("a/b")
+
+    def test_operations(self):
+        document = {"foo": ["bar", "baz"], "qux": {"baz": 1}}
+        document = apply_patch(document, [
+            {"op": "add", "path": "/foo/1", "value": "qux"},
+            {"op": "add", "path": "/foo/-", "value": "end"},
+            {"op": "remove", "path": "/foo/0"},
+            {"op": "replace", "path": "/qux/baz", "value": 2},
+            {"op": "copy", "from": "/qux", "path": "/copied"},
+            {"op": "move", "from": "/qux/baz", "path": "/moved"},
+            {"op": "test", "path": "/copied", "value": {"baz": 2}},
+        ])
+        self.assertEqual(document, {"foo": ["qux", "baz", "end"], "qux": {}, "copied": {"baz": 2}, "moved": 2})
+
+    def test_invalid_operations(self):
+        for operation in (
+            {"op": "remove", "path": "/missing"},
+            {"op": "replace", "path": "/list/5", "value": 1},
+            {"op": "add", "path": "/list/01", "value": 1},
+            {"op": "move", "from": "/list", "path": "/list/0"},
+            {"op": "add", "path": "/list/0"},
+            {"op": "rename", "path": "/list"},
+        ):
+            with self.subTest(operation=operation), self.assertRaises(JsonPatchError):
+                apply_patch({"list": [1, 2]}, [operation])
+
+    def test_failed_test(self):
+        with self.assertRaises(JsonPatchTestFailed):
+            apply_patch({"value": 1}, [{"op": "test", "path": "/value", "value": True}])
+
+
+class TestTouchedElements(unittest.TestCase):
+
+    def touched(self, *operations):
+        touched = TouchedElements()
+        apply_patch(load_example(), list(operations), touched)
+        return touched
+
+    def test_cde_field(self):
+        touched = self.touched({"op": "replace", "path": "/groups/0/variables/0/maxValue", "value": 50})
+        self.assertFalse(touched.structural)
+        self.assertEqual([str(path) for _, path in touched.cdes.values()], ["/example/Example Group/group_variable"])
+
+    def test_enumeration(self):
+        touched = self.touched(
+            {"op": "add", "path": "/groups/0/groups/0/variables/0/enumerations/-", "value": {"code": "a", "label": "A"}}
+        )
+        self.assertFalse(touched.structural)
+        self.assertEqual([cde["code"] for cde, _ in touched.cdes.values()], ["nested_group_variable"])
+
+    def test_data_model_field(self):
+        touched = self.touched({"op": "replace", "path": "/label", "value": "Renamed"})
+        self.assertTrue(touched.data_model_fields)
+        self.assertFalse(touched.structural)
+        self.assertEqual(touched.cdes, {})
+
+    def test_structural(self):
+        for operation in (
+            {"op": "replace", "path": "/groups/0/variables/0/code", "value": "renamed"},
+            {"op": "remove", "path": "/groups/0/groups/0"},
+            {"op": "replace", "path": "/groups/0/code", "value": "renamed"},
+            {"op": "replace", "path": "/longitudinal", "value": True},
+        ):
+            with self.subTest(operation=operation):
+                self.assertTrue(self.touched(operation).structural)
+
+    def test_added_group(self):
+        group = {"code": "added", "label": "Added", "variables": [], "groups": [load_example()["groups"][0]]}
+        touched = self.touched({"op": "add", "path": "/groups/-", "value": group})
+        self.assertTrue(touched.structural)
+        self.assertEqual(
+            sorted(cde["code"] for cde, _ in touched.cdes.values()), ["group_variable", "nested_group_variable"]
+        )
+
+
+class TestPatchDataModel(unittest.TestCase):
+    def setUp(self):
+        self.data_model = load_example()
+
+    def test_valid_edits(self):
+        data_model = patch_data_model(self.data_model, [
+            {"op": "replace", "path": "/groups/0/label", "value": "Renamed Group"},
+            {"op": "replace", "path": "/groups/0/variables/0/maxValue", "value": 50},
+            {"op": "add", "path": "/variables/0/enumerations/-", "value": {"code": "enum2", "label": "Enumeration 2"}},
+        ])
+        self.assertEqual(data_model["groups"][0]["label"], "Renamed Group")
+        self.assertEqual(data_model["groups"][0]["variables"][0]["maxValue"], 50)
+        self.assertEqual(len(data_model["variables"][0]["enumerations"]), 2)
+
+    def test_invalid_range(self):
+        with self.assertRaises(InvalidDataModelError) as context:
+            patch_data_model(
+                self.data_model, [{"op": "replace", "path": "/groups/0/variables/0/minValue", "value": 100}]
+            )
+        self.assertEqual(
+            str(context.exception),
+            "'minValue' >= 'maxValue' in CommonDataElement at '/example/Example Group/group_variable'",
+        )
+        self.assertEqual(context.exception.rule, "common_data_element")
+
+    def test_untouched_elements_are_not_revalidated(self):
+        self.data_model["groups"][0]["variables"][0]["minValue"] = 1000
+        data_model = patch_data_model(
+            self.data_model, [{"op": "replace", "path": "/groups/0/groups/0/variables/0/label", "value": "Label"}]
+        )
+        self.assertEqual(data_model["groups"][0]["groups"][0]["variables"][0]["label"], "Label")
+
+    def test_duplicate_code(self):
+        cde = copy.deepcopy(self.data_model["groups"][0]["variables"][0])
+        with self.assertRaises(InvalidDataModelError) as context:
+            patch_data_model(self.data_model, [{"op": "add", "path": "/groups/0/groups/0/variables/-", "value": cde}])
+        self.assertEqual(context.exception.rule, "cde_code")
+
+    def test_added_cde_is_validated(self):
+        cde = {"code": "added", "type": "nominal", "sql_type": "text", "isCategorical": True}
+        with self.assertRaises(InvalidDataModelError) as context:
+            patch_data_model(self.data_model, [{"op": "add", "path": "/groups/0/variables/0", "value": cde}])
+        self.assertIn("Missing 'enumerations'", str(context.exception))
+
+    def test_removed_dataset(self):
+        with self.assertRaises(InvalidDataModelError) as context:
+            patch_data_model(self.data_model, [{"op": "move", "from": "/variables/0", "path": "/groups/0/variables/-"}])
+        self.assertEqual(context.exception.rule, "data_model")
+        self.data_model = load_example()
+        self.data_model["variables"].append(copy.deepcopy(self.data_model["groups"][0]["variables"][0]))
+        self.data_model["groups"][0]["variables"] = []
+        with self.assertRaises(InvalidDataModelError) as context:
+            patch_data_model(self.data_model, [{"op": "remove", "path": "/variables/0"}])
+        self.assertEqual(context.exception.rule, "dataset")
+
+
+
+class TestPatchLoadedModel(unittest.TestCase):
+    """Patches of a loaded datamodel.model.DataModel against the same patches of its JSON."""
+
+    new_cde = {"code": "new_cde", "type": "text", "sql_type": "text", "isCategorical": False, "label": "New"}
+    patches = [
+        [
+            {"op": "replace", "path": "/groups/0/label", "value": "Renamed Group"},
+            {"op": "add", "path": "/groups/0/variables/0/custom", "value": {"kept": True}},
+            {"op": "add", "path": "/variables/0/enumerations/-", "value": {"code": "enum2", "label": "Enumeration 2"}},
+            {"op": "remove", "path": "/groups/0/variables/0/units"},
+        ],
+        [
+            {"op": "add", "path": "/groups/-", "value": {"label": "Added", "code": "Added", "variables": [new_cde]}},
+            {"op": "add", "path": "/groups/1/groups", "value": []},
+            {"op": "move", "from": "/groups/0/groups/0", "path": "/groups/1/groups/-"},
+            {"op": "test", "path": "/groups/1/variables/0", "value": new_cde},
+        ],
+        [
+            {"op": "copy", "from": "/groups/0/variables/0", "path": "/groups/0/groups/0/variables/-"},
+            {"op": "replace", "path": "/groups/0/groups/0/variables/1/code", "value": "copied"},
+            {"op": "replace", "path": "/groups/0/variables", "value": [new_cde]},
+        ],
+    ]
+
+    def test_same_as_json(self):
+        for patch in self.patches:
+            with self.subTest(patch=patch):
+                expected = patch_data_model(load_example(), copy.deepcopy(patch))
+                data_model = patch_data_model(load_json(load_example()), copy.deepcopy(patch))
+                self.assertEqual(json.dumps(data_model, cls=DataModelEncoder), json.dumps(expected))
+
+    def test_reindexed(self):
+        data_model = patch_data_model(load_json(load_example()), copy.deepcopy(self.patches[1]))
+        cde = data_model.cde("new_cde")
+        self.assertIsInstance(cde, CommonDataElement)
+        self.assertEqual(cde.group.concept_path, "Minimal Example/Added")
+        moved = data_model.cde("nested_group_variable").group
+        self.assertIsInstance(moved, Group)
+        self.assertEqual(moved.concept_path, "Minimal Example/Added/Nested Group")
+        self.assertIs(data_model.group(moved.concept_path), moved)
+        self.assertEqual(data_model.cde_count, 4)
+
+    def test_same_errors_as_json(self):
+        for patch in (
+            [{"op": "replace", "path": "/groups/0/variables/0/minValue", "value": 100}],
+            [{"op": "add", "path": "/groups/0/groups/0/variables/-", "value": {"code": "group_variable"}}],
+            [{"op": "move", "from": "/variables/0", "path": "/groups/0/variables/-"}],
+            [{"op": "test", "path": "/groups/0", "value": {"code": "Example Group"}}],
+            [{"op": "remove", "path": "/groups/0/missing"}],
+        ):
+            with self.subTest(patch=patch):
+                with self.assertRaises((JsonPatchError, InvalidDataModelError)) as expected:
+                    patch_data_model(load_example(), copy.deepcopy(patch))
+                with self.assertRaises(type(expected.exception)) as error:
+                    patch_data_model(load_json(load_example()), copy.deepcopy(patch))
+                self.assertEqual(str(error.exception), str(expected.exception))
+
+
+class TestPatchEndpoint(unittest.TestCase):
+    def setUp(self):
+        app.testing = True
+        self.client = app.test_client()
+
+    def post(self, patch):
+        return self.client.post("/patch-json", json={"data_model": load_example(), "patch": patch})
+
+    def test_patch(self):
+        response = self.post([{"op": "replace", "path": "/groups/0/variables/0/units", "value": "months"}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["groups"][0]["variables"][0]["units"], "months")
+
+    def test_same_text_as_the_patched_json(self):
+        for patch in TestPatchLoadedModel.patches:
+            with self.subTest(patch=patch):
+                # Posted as text, the test client sorting the keys of the JSON it encodes.
+                body = json.dumps({"data_model": load_example(), "patch": patch})
+                response = self.client.post("/patch-json", data=body, content_type="application/json")
+                expected = patch_data_model(load_example(), copy.deepcopy(patch))
+                self.assertEqual(response.get_data(as_text=True), json.dumps(expected, indent=4))
+
+    def test_invalid_result(self):
+        response = self.post([{"op": "replace", "path": "/groups/0/variables/0/type", "value": "text"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Mismatch in 'sql_type' or 'isCategorical'", response.json["error"])
+
+    def test_invalid_data_model(self):
+        data_model = load_example()
+        data_model["groups"][0]["variables"][0]["minValue"] = 1000
+        for patch in ([], [{"op": "replace", "path": "/groups/0/groups/0/variables/0/label", "value": "Label"}]):
+            with self.subTest(patch=patch):
+                response = self.client.post("/patch-json", json={"data_model": data_model, "patch": patch})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(
+                    response.json["error"],
+                    "The submitted data model is invalid: 'minValue' >= 'maxValue' in CommonDataElement at "
+                    "'/example/Example Group/group_variable'",
+                )
+
+    def test_failed_test(self):
+        response = self.post([{"op": "test", "path": "/version", "value": "2.0"}])
+        self.assertEqual(response.status_code, 409)
+
+    def test_malformed_patch(self):
+        self.assertEqual(self.post({"op": "remove"}).status_code, 400)
+        response = self.client.post("/patch-json", json={"patch": []})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 
 from converter.excel_to_json import clean_empty_fields
+from datamodel.model import load_json
 
 
 class TestCleanEmptyFields(unittest.TestCase):
@@ -98,3 +99,31 @@ class TestCleanEmptyFields(unittest.TestCase):
         }
         clean_empty_fields(data)
         self.assertEqual(data, expected)
+
+    def test_same_on_a_data_model(self):
+        data = {
+            "code": "dm",
+            "label": "",
+            "variables": [],
+            "groups": [
+                {
+                    "code": "",
+                    "variables": [
+                        {
+                            "code": "nominal",
+                            "description": "",
+                            "enumerations": [{"code": "a", "label": ""}, {"code": "b", "label": "B"}],
+                        },
+                        {"code": "empty", "enumerations": []},
+                        {"code": "compact", "description": "", "enumerations": [{"code": "c", "label": "C"}]},
+                    ],
+                    "groups": [{"code": "Nested Group", "variables": [], "groups": []}],
+                }
+            ],
+        }
+        data_model = load_json(data)
+        clean_empty_fields(data)
+        clean_empty_fields(data_model)
+        self.assertEqual(data_model.to_dict(), data)
+        # Compacted enumerations are cleaned without being expanded.
+        self.assertEqual(data_model.cde("compact").enumerations, (("c", "C"),))
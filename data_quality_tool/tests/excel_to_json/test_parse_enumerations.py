@@ -0,0 +1,56 @@
+import unittest
+
+from common_entities import EnumerationSyntaxError, parse_enumerations
+
+
+class TestParseEnumerations(unittest.TestCase):
+    def test_pairs(self):
+        self.assertEqual(
+            parse_enumerations('{"code1", "label1"},{"code2","label2"}'),
+            [("code1", "label1"), ("code2", "label2")],
+        )
+
+    def test_empty(self):
+        self.assertEqual(parse_enumerations(""), [])
+
+    def test_escapes_and_separators_in_labels(self):
+        self.assertEqual(
+            parse_enumerations('{"a", "yes\\", \\"no"}, {"b", "caf\\u00e9"}'),
+            [("a", 'yes", "no'), ("b", "café")],
+        )
+
+    def test_error_offsets(self):
+        cases = [
+            ('{"a", "A"}, {"b" "B"}', 16),
+            ('{"a", "A"} {"b", "B"}', 11),
+            ('{"a", "A"},', 11),
+            ('{"a", "A', 6),
+            ('{"a", "A\\q"}', 8),
+        ]
+        for values, position in cases:
+            with self.subTest(values=values):
+                with self.assertRaises(EnumerationSyntaxError) as context:
+                    parse_enumerations(values)
+                self.assertEqual(context.exception.position, position)
+                self.assertIn("Nominal values format error:", str(context.exception))
+
+    def test_separators(self):
+        # The separators the parsing with json.loads accepted before the tokenizer, and only these.
+        for values in ('{"a","A"}', '{"a", "A"}', '{"a":"A"}', '{ "a" : "A" }', '{"a", "A"}\n,  {"b","B"}'):
+            with self.subTest(values=values):
+                self.assertEqual(parse_enumerations(values)[0], ("a", "A"))
+        for values in ('{"a" , "A"}', '{"a",  "A"}', '{"a",\t"A"}', '{"a","A"} {"b","B"}', '{"a": "A", "b": "B"}'):
+            with self.subTest(values=values):
+                with self.assertRaises(EnumerationSyntaxError):
+                    parse_enumerations(values)
+
+    def test_not_a_string(self):
+        with self.assertRaises(EnumerationSyntaxError) as context:
+            parse_enumerations(None)
+        self.assertEqual(context.exception.position, 0)
+
+    def test_large_enumeration(self):
+        values = ", ".join(f'{{"C{i:05d}", "Label {i}"}}' for i in range(20000))
+        enumerations = parse_enumerations(values)
+        self.assertEqual(len(enumerations), 20000)
+        self.assertEqual(enumerations[-1], ("C19999", "Label 19999"))
@@ -0,0 +1,39 @@
+import unittest
+from io import BytesIO
+
+import pandas as pd
+
+from common_entities import EXCEL_COLUMNS
+from converter.excel_writer import iter_file_chunks, spool_excel_rows
+
+
+def make_rows(count):
+    for index in range(count):
+        row = [""] * len(EXCEL_COLUMNS)
+        row[EXCEL_COLUMNS.index("code")] = f"V{index}"
+        row[EXCEL_COLUMNS.index("conceptPath")] = f"G/V{index}"
+        yield row
+
+
+class TestSpoolExcelRows(unittest.TestCase):
+
+    def test_round_trip(self):
+        output, size = spool_excel_rows(EXCEL_COLUMNS, make_rows(3))
+        content = b"".join(iter_file_chunks(output, chunk_size=1024))
+        self.assertEqual(len(content), size)
+        self.assertTrue(output.closed)
+        df = pd.read_excel(BytesIO(content))
+        self.assertListEqual(list(df.columns), EXCEL_COLUMNS)
+        self.assertEqual(df["code"].tolist(), ["V0", "V1", "V2"])
+        self.assertTrue(df["csvFile"].isnull().all())
+
+    def test_spools_to_disk_past_threshold(self):
+        output, size = spool_excel_rows(EXCEL_COLUMNS, make_rows(2000), spool_max_bytes=1024)
+        with output:
+            self.assertGreater(size, 1024)
+            self.assertTrue(output._rolled)
+
+    def test_stays_in_memory_under_threshold(self):
+        output, _ = spool_excel_rows(EXCEL_COLUMNS, make_rows(1))
+        with output:
+            self.assertFalse(output._rolled)
@@ -0,0 +1,60 @@
+import json
+import time
+import unittest
+
+from controller import app
+from instrumentation import RequestTimer, server_timing
+
+
+class TestRequestTimer(unittest.TestCase):
+
+    def test_nested_stages_are_exclusive(self):
+        timer = RequestTimer()
+        with timer.stage("outer"):
+            time.sleep(0.02)
+            with timer.stage("inner"):
+                time.sleep(0.02)
+        self.assertGreaterEqual(timer.stages["inner"], 0.02)
+        self.assertGreaterEqual(timer.stages["outer"], 0.02)
+        self.assertLess(timer.stages["outer"], 0.035)
+
+    def test_rows(self):
+        def slow_rows():
+            for index in range(3):
+                time.sleep(0.01)
+                yield index
+
+        timer = RequestTimer()
+        with timer.stage("process"):
+            self.assertEqual(list(timer.rows(slow_rows(), "read")), [0, 1, 2])
+        self.assertEqual(timer.fields["rows"], 3)
+        self.assertGreaterEqual(timer.stages["read"], 0.03)
+        self.assertLess(timer.stages["process"], timer.stages["read"])
+
+    def test_server_timing(self):
+        self.assertEqual(
+            server_timing({"read": 0.0125, "validate": 0.002}, 0.02),
+            "read;dur=12.500, validate;dur=2.000, total;dur=20.000",
+        )
+
+
+class TestInstrumentedEndpoints(unittest.TestCase):
+    def setUp(self):
+        app.testing = True
+        self.client = app.test_client()
+
+    def test_server_timing_header_and_log_line(self):
+        with open("MinimalDataModelExample.json") as file:
+            json_data = json.load(file)
+        # A model of its own, so that the response does not come from the result cache.
+        json_data["label"] = "Instrumented Example"
+        with self.assertLogs("request", level="INFO") as logs:
+            response = self.client.post("/validate-json", json=json_data)
+        stages = [metric.split(";")[0] for metric in response.headers["Server-Timing"].split(", ")]
+        self.assertIn("validate", stages)
+        self.assertEqual(stages[-1], "total")
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(line["path"], "/validate-json")
+        self.assertEqual(line["status"], 200)
+        self.assertEqual(line["cdes"], 3)
+        self.assertGreater(line["input_bytes"], 0)
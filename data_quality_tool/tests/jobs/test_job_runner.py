@@ -0,0 +1,159 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from controller import app
+from jobs import (
+    FAILED,
+    INTERRUPTED_ERROR,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    JobRunner,
+    JobStore,
+    owner_alive,
+    process_owner,
+)
+
+
+def read_example():
+    with open("MinimalDataModelExample.xlsx", "rb") as file:
+        return file.read()
+
+
+def wait_for(store, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = store.status(job_id)
+        if job["status"] in (SUCCEEDED, FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+class TestJobStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = JobStore(os.path.join(self.directory.name, "jobs.sqlite3"), ttl=60)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_lifecycle(self):
+        job_id = self.store.create()
+        self.assertEqual(self.store.status(job_id), {"job_id": job_id, "status": QUEUED, "rows_processed": 0})
+        self.store.progress(job_id, 42)
+        self.store.succeed(job_id, "{}")
+        self.assertEqual(self.store.status(job_id)["rows_processed"], 42)
+        self.assertEqual(self.store.result(job_id), (SUCCEEDED, "{}", None, None))
+
+    def test_finished_jobs_expire(self):
+        store = JobStore(self.store.path, ttl=-1)
+        job_id = store.create()
+        self.assertIsNotNone(store.status(job_id))
+        store.fail(job_id, "error", 500)
+        self.assertIsNone(store.status(job_id))
+
+    def test_jobs_of_a_stopped_worker_fail(self):
+        queued, running = self.store.create(), self.store.create()
+        self.store.start(running)
+        self.assertEqual(self.store.status(running)["status"], RUNNING)
+        with mock.patch("jobs.owner_alive", return_value=False):
+            jobs = [self.store.status(job_id) for job_id in (queued, running)]
+        self.assertEqual([job["status"] for job in jobs], [FAILED, FAILED])
+        self.assertEqual(jobs[0]["error"], INTERRUPTED_ERROR)
+        self.assertEqual(self.store.result(running), (FAILED, None, INTERRUPTED_ERROR, 500))
+        # The worker finishing after all does not revive the job.
+        self.store.succeed(running, "{}")
+        self.assertEqual(self.store.status(running)["status"], FAILED)
+
+    def test_running_jobs_without_progress_fail(self):
+        store = JobStore(self.store.path, ttl=60, stale_after=-1)
+        queued, running = store.create(), store.create()
+        store.start(running)
+        self.assertEqual(store.status(queued)["status"], QUEUED)
+        self.assertEqual(store.status(running)["status"], FAILED)
+
+    def test_unfinished_jobs_expire_by_creation(self):
+        job_id = self.store.create()
+        self.assertEqual(self.store.status(job_id)["status"], QUEUED)
+        self.store._execute("UPDATE jobs SET created = created - 120 WHERE id = ?", (job_id,))
+        self.assertEqual(self.store.status(job_id)["status"], FAILED)
+
+
+    def test_owner_alive(self):
+        self.assertTrue(owner_alive(process_owner()))
+        process = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True)
+        host = process_owner().rpartition(":")[0]
+        self.assertFalse(owner_alive(f"{host}:{process.stdout.decode().strip()}"))
+        # Processes of other hosts, or of databases without owners, cannot be checked.
+        self.assertTrue(owner_alive("another-host:1"))
+        self.assertTrue(owner_alive(None))
+
+    def test_databases_without_owners_are_migrated(self):
+        path = os.path.join(self.directory.name, "old.sqlite3")
+        with sqlite3.connect(path) as connection:
+            connection.execute(
+                "CREATE TABLE jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, rows_processed INTEGER NOT NULL "
+                "DEFAULT 0, created REAL NOT NULL, finished REAL, result TEXT, error TEXT, error_status INTEGER)"
+            )
+        connection.close()
+        store = JobStore(path, ttl=60)
+        self.assertEqual(store.status(store.create())["status"], QUEUED)
+
+
+class TestJobRunner(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.runner = JobRunner(JobStore(os.path.join(self.directory.name, "jobs.sqlite3"), ttl=60), max_workers=1)
+
+    def tearDown(self):
+        self.runner.shutdown()
+        self.directory.cleanup()
+
+    def test_successful_job(self):
+        job = wait_for(self.runner.store, self.runner.submit(read_example()))
+        self.assertEqual(job["status"], SUCCEEDED)
+        self.assertEqual(job["rows_processed"], 3)
+
+    def test_failed_job(self):
+        job = wait_for(self.runner.store, self.runner.submit(b"not a workbook"))
+        self.assertEqual(job["status"], FAILED)
+        self.assertIn("error", job)
+
+
+class TestJobEndpoints(unittest.TestCase):
+    def setUp(self):
+        app.testing = True
+        self.client = app.test_client()
+
+    def test_submit_poll_and_fetch(self):
+        data = {"file": (open("MinimalDataModelExample.xlsx", "rb"), "MinimalDataModelExample.xlsx")}
+        response = self.client.post("/jobs/excel-to-json", content_type="multipart/form-data", data=data)
+        data["file"][0].close()
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json["job_id"]
+        self.assertEqual(response.headers["Location"], f"/jobs/{job_id}")
+
+        deadline = time.monotonic() + 10
+        while self.client.get(f"/jobs/{job_id}").json["status"] not in (SUCCEEDED, FAILED):
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+        result = self.client.get(f"/jobs/{job_id}/result")
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(json.loads(result.data)["code"], "Minimal Example")
+
+    def test_unknown_job(self):
+        self.assertEqual(self.client.get("/jobs/unknown").status_code, 404)
+        self.assertEqual(self.client.get("/jobs/unknown/result").status_code, 404)
+
+    def test_submit_without_file(self):
+        response = self.client.post("/jobs/excel-to-json", content_type="multipart/form-data", data={})
+        self.assertEqual(response.status_code, 400)
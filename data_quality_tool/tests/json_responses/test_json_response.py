@@ -0,0 +1,59 @@
+import gzip
+import json
+import unittest
+import zlib
+
+from flask import Flask
+
+from json_responses import json_response
+
+DATA = {"code": "model", "variables": [{"code": f"V{index}", "label": "Variable"} for index in range(200)]}
+
+
+class TestJsonResponse(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+
+    def respond(self, query_string="", headers=None):
+        with self.app.test_request_context(query_string=query_string, headers=headers or {}):
+            response = json_response(DATA)
+            response.direct_passthrough = False
+            return response, response.get_data()
+
+    def test_pretty_by_default(self):
+        response, body = self.respond()
+        self.assertEqual(body.decode(), json.dumps(DATA, indent=4))
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(response.headers["Vary"], "Accept-Encoding")
+
+    def test_compact(self):
+        _, body = self.respond("pretty=false")
+        self.assertEqual(body.decode(), json.dumps(DATA, separators=(",", ":")))
+
+    def test_gzip(self):
+        response, body = self.respond(headers={"Accept-Encoding": "gzip, deflate"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(body)), DATA)
+
+    def test_deflate(self):
+        response, body = self.respond(headers={"Accept-Encoding": "gzip;q=0.5, deflate"})
+        self.assertEqual(response.headers["Content-Encoding"], "deflate")
+        self.assertEqual(json.loads(zlib.decompress(body)), DATA)
+
+    def test_small_bodies_are_not_compressed(self):
+        with self.app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+            response = json_response({"code": "model"})
+        self.assertNotIn("Content-Encoding", response.headers)
+
+    def test_stream(self):
+        with self.app.test_request_context(query_string="stream=true&pretty=false"):
+            response = json_response(DATA)
+            self.assertTrue(response.is_streamed)
+            self.assertIsNone(response.content_length)
+            self.assertEqual(json.loads(b"".join(response.response)), DATA)
+
+    def test_stream_gzip(self):
+        response, body = self.respond("stream=true", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(body).decode(), json.dumps(DATA, indent=4))
@@ -1,6 +1,10 @@
 import unittest
 
-from converter.json_to_excel import recursive_parse_json
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.synthetic import generate_data_model
+from converter.json_to_excel import iter_json_rows, recursive_parse_json
+from datamodel.model import load_json
 
 
 class TestRecursiveParseJsonFunction(unittest.TestCase):
@@ -123,3 +127,43 @@ class TestRecursiveParseJsonFunction(unittest.TestCase):
             ["", "Variable *1", "V@1", "", "", "", "", "", "", "Group &1/V@1", ""]
         ]
         self.assertEqual(recursive_parse_json(json_data), expected)
+
+    def test_deep_hierarchy(self):
+        # Nesting far beyond the recursion limit is walked without recursing
+        json_data = group = {"code": "root"}
+        for level in range(5000):
+            group["groups"] = [{"code": f"g{level}"}]
+            group = group["groups"][0]
+        group["variables"] = [{"code": "V1", "label": "Variable 1"}]
+        (row,) = recursive_parse_json(json_data)
+        self.assertEqual(row[9].count("/"), 5001)
+        self.assertTrue(row[9].endswith("/g4999/V1"))
+
+    def test_same_rows_from_a_loaded_model(self):
+        json_data = generate_data_model(cdes=200, depth=3, fan_out=3)
+        json_data["groups"][0]["groups"][0]["label"] = ""
+        json_data["groups"][1]["variables"][0]["enumerations"] = [{"label": "Reversed", "code": "r"}]
+        self.assertEqual(recursive_parse_json(load_json(json_data)), recursive_parse_json(json_data))
+        group = load_json(json_data).groups[1]
+        self.assertEqual(
+            recursive_parse_json(group, ["Synthetic"]), recursive_parse_json(json_data["groups"][1], ["Synthetic"])
+        )
+
+    def test_rows_are_yielded_lazily(self):
+        rows = iter_json_rows({"code": "root", "variables": [{"code": "V1"}, {"code": "V2"}]})
+        self.assertEqual(next(rows)[2], "V1")
+        self.assertEqual(next(rows)[2], "V2")
+
+    def test_concurrent_calls(self):
+        def parse(index):
+            json_data = {
+                "code": f"root{index}",
+                "variables": [{"code": f"V{index}"}],
+                "groups": [{"code": "group", "variables": [{"code": f"W{index}"}]}],
+            }
+            return [row[9] for row in recursive_parse_json(json_data)]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(parse, range(200)))
+        for index, paths in enumerate(results):
+            self.assertEqual(paths, [f"root{index}/V{index}", f"root{index}/group/W{index}"])
@@ -0,0 +1,57 @@
+import json
+import unittest
+
+from prometheus_client import REGISTRY
+
+from controller import app
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        app.testing = True
+        self.client = app.test_client()
+
+    def test_metrics_endpoint(self):
+        self.client.get("/metrics")
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain"))
+        body = response.get_data(as_text=True)
+        self.assertIn('data_quality_tool_requests_total{method="GET",route="/metrics",status="200"}', body)
+        self.assertIn("data_quality_tool_request_duration_seconds_bucket", body)
+
+    def test_request_metrics(self):
+        with open("MinimalDataModelExample.json") as file:
+            json_data = json.load(file)
+        json_data["label"] = "Metrics Example"
+        before = sample("data_quality_tool_requests_total", route="/validate-json", method="POST", status="200")
+        cdes_before = sample("data_quality_tool_cdes_processed_total", route="/validate-json")
+        response = self.client.post("/validate-json", json=json_data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sample("data_quality_tool_requests_total", route="/validate-json", method="POST", status="200"),
+            before + 1,
+        )
+        self.assertEqual(sample("data_quality_tool_cdes_processed_total", route="/validate-json"), cdes_before + 3)
+        self.assertGreater(
+            sample("data_quality_tool_stage_duration_seconds_count", route="/validate-json", stage="validate"), 0
+        )
+
+    def test_validation_failures_by_rule(self):
+        with open("MinimalDataModelExample.json") as file:
+            json_data = json.load(file)
+        json_data["label"] = "Metrics Failure Example"
+        del json_data["code"]
+        before = sample("data_quality_tool_validation_failures_total", route="/validate-json", rule="data_model")
+        response = self.client.post("/validate-json", json=json_data)
+        self.assertEqual(response.status_code, 400)
+        after = sample("data_quality_tool_validation_failures_total", route="/validate-json", rule="data_model")
+        self.assertEqual(after, before + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,212 @@
+import json
+import os
+import unittest
+from io import BytesIO
+from unittest import mock
+
+from benchmarks.synthetic import generate_data_model
+from common_entities import EXCEL_COLUMNS
+from controller import app
+from converter.json_to_excel import iter_json_rows
+from datamodel.model import load_json
+from model_store import IndexedModel, ModelStore, content_hash, page, stream_hash
+
+TEST_DIR = os.path.dirname(os.path.dirname(__file__))
+
+
+def load_example():
+    with open(os.path.join(TEST_DIR, "MinimalDataModelExample.json")) as file:
+        return json.load(file)
+
+
+def subtree(group):
+    """The CDEs and groups under a group, depth first, by recursion."""
+    cdes, groups = list(group.variables or ()), []
+    for sub_group in group.groups or ():
+        groups.append(sub_group)
+        sub_cdes, sub_groups = subtree(sub_group)
+        cdes.extend(sub_cdes)
+        groups.extend(sub_groups)
+    return cdes, groups
+
+
+class TestIndexedModel(unittest.TestCase):
+
+    def setUp(self):
+        self.data_model = load_json(generate_data_model(cdes=300, depth=3, fan_out=3))
+        self.model = IndexedModel(self.data_model)
+
+    def test_subtrees(self):
+        self.assertEqual(self.model.cde_count, 301)
+        for group in [self.data_model, *self.data_model.iter_groups()]:
+            with self.subTest(group=group.concept_path):
+                cdes, groups = subtree(group)
+                self.assertEqual(self.model.cdes_under(group, 0, 1000), (cdes, len(cdes)))
+                self.assertEqual(self.model.groups_under(group, 0, 1000), (groups, len(groups)))
+                self.assertEqual(self.model.count_cdes_under(group), len(cdes))
+
+    def test_pages(self):
+        group = self.data_model.groups[0]
+        cdes, _ = subtree(group)
+        self.assertEqual(self.model.cdes_under(group, 10, 5), (cdes[10:15], len(cdes)))
+        self.assertEqual(self.model.cdes_under(group, len(cdes) + 10, 5), ([], len(cdes)))
+
+    def test_group(self):
+        self.assertIs(self.model.group(None), self.data_model)
+        self.assertIs(self.model.group(self.data_model.groups[0].concept_path), self.data_model.groups[0])
+        self.assertIsNone(self.model.group("Synthetic/missing"))
+
+
+class TestModelStore(unittest.TestCase):
+
+    @staticmethod
+    def indexed(cdes):
+        return IndexedModel(load_json(generate_data_model(cdes=cdes - 1, depth=1)))
+
+    def test_size(self):
+        enumerations = [{"code": "a", "label": "A"}, {"code": "b", "label": "B"}]
+        data_model = {
+            "code": "dm",
+            "variables": [{"code": "dataset", "enumerations": enumerations}],
+            "groups": [{"code": f"group_{index}"} for index in range(50)],
+        }
+        self.assertEqual(IndexedModel(load_json(data_model)).size, 1 + 50 + 2)
+
+    def test_eviction(self):
+        model = self.indexed(10)
+        store = ModelStore(max_size=2 * model.size + model.size // 2)
+        store.set("a", model)
+        store.set("b", self.indexed(10))
+        self.assertIsNotNone(store.get("a"))
+        store.set("c", self.indexed(10))
+        self.assertIsNone(store.get("b"))
+        self.assertIsNotNone(store.get("a"))
+        self.assertEqual((len(store), store.size), (2, 2 * model.size))
+
+    def test_replace_and_oversized(self):
+        small, large = self.indexed(10), self.indexed(20)
+        store = ModelStore(max_size=large.size + small.size // 2)
+        store.set("a", small)
+        store.set("a", large)
+        self.assertEqual((len(store), store.size), (1, large.size))
+        self.assertFalse(store.set("b", self.indexed(30)))
+        self.assertEqual((len(store), store.size), (1, large.size))
+
+    def test_hashes(self):
+        stream = BytesIO(b"content" * 1000)
+        self.assertEqual(stream_hash(stream), content_hash(b"content" * 1000))
+        self.assertEqual(stream.tell(), 0)
+
+    def test_page(self):
+        self.assertEqual(page([1, 2], 5, 0, 2)["next_offset"], 2)
+        self.assertIsNone(page([5], 5, 4, 2)["next_offset"])
+
+
+class TestModelEndpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.client = app.test_client()
+        self.json_data = load_example()
+        self.store = ModelStore(max_size=1000)
+        patcher = mock.patch("controller.model_store", self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post_json(self):
+        response = self.client.post("/models", data=json.dumps(self.json_data), content_type="application/json")
+        return response, response.get_json()
+
+    def test_load_json(self):
+        response, body = self.post_json()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(body["model_id"], content_hash(json.dumps(self.json_data).encode()))
+        self.assertEqual(response.headers["Location"], f"/models/{body['model_id']}")
+        self.assertEqual((body["label"], body["cdes"], body["groups"]), ("Minimal Example", 3, 2))
+        response, again = self.post_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(again, body)
+        self.assertEqual(self.client.get(f"/models/{body['model_id']}").get_json(), body)
+
+    def test_load_sheet(self):
+        with open(os.path.join(TEST_DIR, "MinimalDataModelExample.xlsx"), "rb") as file:
+            content = file.read()
+        response = self.client.post(
+            "/models",
+            data={"file": (BytesIO(content), "model.xlsx")},
+            content_type="multipart/form-data",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()["model_id"], stream_hash(BytesIO(content), prefix=b"xlsx\0"))
+        self.assertGreater(response.get_json()["cdes"], 0)
+
+    def post_sheet(self, content, filename):
+        return self.client.post(
+            "/models", data={"file": (BytesIO(content), filename)}, content_type="multipart/form-data"
+        )
+
+    def test_model_id_depends_on_the_reader(self):
+        # The same tab-separated bytes fail to read as CSV and are read as TSV.
+        lines = ["\t".join(EXCEL_COLUMNS)]
+        lines.extend("\t".join(value or "" for value in row) for row in iter_json_rows(self.json_data))
+        content = "\n".join(lines).encode()
+        self.assertEqual(self.post_sheet(content, "model.csv").status_code, 400)
+        response = self.post_sheet(content, "model.tsv")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.post_sheet(content, "model.csv").status_code, 400)
+        self.assertEqual(self.post_sheet(content, "other.tsv").get_json(), response.get_json())
+
+    def test_corrupt_workbook(self):
+        response = self.post_sheet(b"PK\x03\x04garbage", "model.xlsx")
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("error", response.get_json())
+        self.assertEqual(len(self.store), 0)
+
+    def test_lookups(self):
+        _, body = self.post_json()
+        model_id = body["model_id"]
+        response = self.client.get(f"/models/{model_id}/cdes/nested_group_variable")
+        self.assertEqual(response.status_code, 200)
+        cde = response.get_json()
+        self.assertEqual(cde["concept_path"], "Minimal Example/Example Group/Nested Group")
+        self.assertEqual(cde["cde"], self.json_data["groups"][0]["groups"][0]["variables"][0])
+        self.assertEqual(cde["group"]["code"], "Nested Group")
+
+        listing = self.client.get(f"/models/{model_id}/cdes", query_string={"limit": 2}).get_json()
+        self.assertEqual([item["cde"]["code"] for item in listing["items"]], ["dataset", "group_variable"])
+        self.assertEqual((listing["total"], listing["next_offset"]), (3, 2))
+
+        listing = self.client.get(
+            f"/models/{model_id}/cdes", query_string={"path": "Minimal Example/Example Group"}
+        ).get_json()
+        codes = [item["cde"]["code"] for item in listing["items"]]
+        self.assertEqual(codes, ["group_variable", "nested_group_variable"])
+        self.assertIsNone(listing["next_offset"])
+
+        groups = self.client.get(f"/models/{model_id}/groups").get_json()
+        self.assertEqual([group["code"] for group in groups["items"]], ["Example Group", "Nested Group"])
+        self.assertEqual([group["cdes"] for group in groups["items"]], [2, 1])
+
+    def test_not_found(self):
+        self.assertEqual(self.client.get("/models/missing").status_code, 404)
+        self.assertEqual(self.client.get("/models/missing/cdes").status_code, 404)
+        _, body = self.post_json()
+        model_id = body["model_id"]
+        self.assertEqual(self.client.get(f"/models/{model_id}/cdes/missing").status_code, 404)
+        response = self.client.get(f"/models/{model_id}/groups", query_string={"path": "Minimal Example/missing"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_model(self):
+        del self.json_data["code"]
+        response, body = self.post_json()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", body)
+        self.assertEqual(len(self.store), 0)
+
+    def test_model_larger_than_the_store(self):
+        with mock.patch("controller.model_store", ModelStore(max_size=2)):
+            response, _ = self.post_json()
+        self.assertEqual(response.status_code, 413)
+
+
+if __name__ == "__main__":
+    unittest.main()
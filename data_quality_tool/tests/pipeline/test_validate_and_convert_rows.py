@@ -0,0 +1,74 @@
+import json
+import unittest
+from io import BytesIO
+
+from common_entities import EXCEL_COLUMNS, InvalidDataModelError
+from converter.excel_to_json import convert_excel_rows_to_json
+from converter.pipeline import excel_to_data_model, validate_and_convert_rows
+from converter.row_reader import open_excel_rows
+from validator.excel_validator import validate_excel_rows
+
+
+def make_row(**fields):
+    return {column: fields.get(column) for column in EXCEL_COLUMNS}
+
+
+class TestValidateAndConvertRows(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = [
+            make_row(name="Dataset", code="dataset", type="nominal",
+                     values='{"d1", "Dataset 1"}', conceptPath="Model/dataset"),
+            make_row(name="Integer", code="int_var", type="integer",
+                     values="0-100", conceptPath="Model/Group/int_var"),
+            make_row(name="Text", code="text_var", type="text",
+                     conceptPath="Model/Group/Nested/text_var"),
+        ]
+
+    def assert_same_as_separate_stages(self):
+        def separate():
+            validate_excel_rows(EXCEL_COLUMNS, iter(dict(row) for row in self.rows))
+            return convert_excel_rows_to_json(dict(row) for row in self.rows)
+
+        results = []
+        for run in (separate, lambda: validate_and_convert_rows(EXCEL_COLUMNS, iter(self.rows))):
+            try:
+                results.append(json.dumps(run()))
+            except InvalidDataModelError as e:
+                results.append(str(e))
+        self.assertEqual(results[0], results[1])
+        return results[1]
+
+    def test_valid_rows(self):
+        result = json.loads(self.assert_same_as_separate_stages())
+        self.assertEqual(result["code"], "Model")
+        self.assertEqual(result["variables"][0]["enumerations"], [{"code": "d1", "label": "Dataset 1"}])
+
+    def test_validation_error(self):
+        self.rows[1]["values"] = "100-0"
+        message = self.assert_same_as_separate_stages()
+        self.assertIn("On :int_var got: Min value must be smaller than max value", message)
+
+    def test_validation_error_after_conversion_error(self):
+        # '1.5' passes validation but cannot be converted to an integer, the later
+        # validation error still takes precedence as it would with separate stages.
+        self.rows[1]["values"] = "1.5-100"
+        self.rows[2]["type"] = "invalid"
+        message = self.assert_same_as_separate_stages()
+        self.assertIn("On :text_var got: Invalid 'type'", message)
+
+    def test_conversion_error(self):
+        self.rows[1]["values"] = "1.5-100"
+        message = self.assert_same_as_separate_stages()
+        self.assertIn("Error processing variable: Range values for variable int_var", message)
+
+    def test_columns_mismatch(self):
+        with self.assertRaisesRegex(InvalidDataModelError, "Mismatch in Excel columns"):
+            validate_and_convert_rows(EXCEL_COLUMNS[:-1], iter(self.rows))
+
+    def test_minimal_example_workbook(self):
+        with open("MinimalDataModelExample.xlsx", "rb") as file:
+            stream = BytesIO(file.read())
+        with open_excel_rows(stream) as (columns, rows):
+            expected = convert_excel_rows_to_json(rows)
+        self.assertEqual(excel_to_data_model(stream), expected)
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import logging
+import unittest
+from unittest import mock
+
+from flask import g
+
+import controller
+from controller import app
+from request_logging import PayloadLogger, RequestLogFormatter, payload_summary
+
+
+def log_record(message, *args):
+    return logging.LogRecord("test", logging.INFO, __file__, 1, message, args, None)
+
+
+class TestRequestLogFormatter(unittest.TestCase):
+
+    def test_truncates_long_messages(self):
+        formatter = RequestLogFormatter(fmt="%(message)s", max_message_length=10)
+        self.assertEqual(formatter.format(log_record("%s", "x" * 25)), "xxxxxxxxxx... (25 characters in total)")
+        self.assertEqual(formatter.format(log_record("short")), "short")
+
+    def test_request_id(self):
+        formatter = RequestLogFormatter(fmt="[%(request_id)s] %(message)s")
+        self.assertEqual(formatter.format(log_record("outside")), "[-] outside")
+        with app.test_request_context():
+            g.request_id = "abc"
+            self.assertEqual(formatter.format(log_record("inside")), "[abc] inside")
+
+
+class TestPayloadSummary(unittest.TestCase):
+
+    def test_payload_summary(self):
+        body = b'{"code": "model"}'
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        self.assertEqual(payload_summary(body), f"17 bytes, sha256 {digest}")
+        self.assertEqual(payload_summary(body, cdes=3), f"17 bytes, sha256 {digest}, 3 CDEs")
+
+
+class TestRequestLogging(unittest.TestCase):
+    def setUp(self):
+        app.testing = True
+        self.client = app.test_client()
+        with open("MinimalDataModelExample.json") as file:
+            self.json_data = json.load(file)
+
+    def test_request_id_header(self):
+        response = self.client.get("/", headers={"X-Request-ID": "client-id.1"})
+        self.assertEqual(response.headers["X-Request-ID"], "client-id.1")
+        response = self.client.get("/", headers={"X-Request-ID": "not a valid id"})
+        self.assertRegex(response.headers["X-Request-ID"], r"^[0-9a-f]{32}$")
+        self.assertNotEqual(self.client.get("/").headers["X-Request-ID"], response.headers["X-Request-ID"])
+
+    def test_payload_is_summarized(self):
+        self.json_data["label"] = "Logged Example"
+        with self.assertLogs("controller", level="INFO") as logs:
+            self.client.post("/json-to-excel", json=self.json_data)
+        messages = "\n".join(record.getMessage() for record in logs.records)
+        self.assertIn("Processing JSON data: ", messages)
+        self.assertIn("JSON data validated: 3 CDEs", messages)
+        self.assertNotIn("Logged Example", messages)
+
+    def test_sampled_payloads(self):
+        self.json_data["label"] = "Sampled Example"
+        with mock.patch.object(controller, "payloads", PayloadLogger(sample_rate=1, max_bytes=20)):
+            with self.assertLogs("payload", level="DEBUG") as logs:
+                response = self.client.post("/validate-json", json=self.json_data)
+        self.assertEqual(response.status_code, 200)
+        message = logs.records[-1].getMessage()
+        self.assertRegex(message, r"^Validating JSON data, first 20 of \d+ bytes: ")
+        self.assertEqual(len(message.split("bytes: ", 1)[1]), 20)
+
+    def test_payloads_are_not_sampled_by_default(self):
+        self.json_data["label"] = "Unsampled Example"
+        with mock.patch("request_logging.payload_logger") as payload_logger:
+            self.client.post("/validate-json", json=self.json_data)
+        payload_logger.debug.assert_not_called()
+
+if __name__ == "__main__":
+    unittest.main()
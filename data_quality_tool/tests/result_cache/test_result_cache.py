@@ -0,0 +1,137 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from io import BytesIO
+
+from flask import Flask
+
+from controller import app
+from result_cache import CachedResponse, DiskCache, MemoryCache, ResultCache, cached_response
+
+
+def entry(body):
+    return CachedResponse(200, {"Content-Type": "application/json"}, body)
+
+
+class TestMemoryCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = MemoryCache(max_bytes=10)
+        cache.set("a", entry(b"1234"))
+        cache.set("b", entry(b"1234"))
+        cache.get("a")
+        cache.set("c", entry(b"1234"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+        self.assertEqual(cache.size, 8)
+
+    def test_skips_entries_larger_than_the_cache(self):
+        cache = MemoryCache(max_bytes=2)
+        cache.set("a", entry(b"123"))
+        self.assertIsNone(cache.get("a"))
+
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = DiskCache(self.directory.name, max_bytes=400)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        self.cache.set("a", CachedResponse(400, {"Content-Type": "text/plain"}, b"line\nbody"))
+        cached = self.cache.get("a")
+        self.assertEqual((cached.status, cached.headers, cached.body), (400, {"Content-Type": "text/plain"}, b"line\nbody"))
+
+    def test_evicts_by_size(self):
+        self.cache.set("a", entry(b"x" * 100))
+        os.utime(os.path.join(self.directory.name, "a.cache"), (time.time() - 60,) * 2)
+        self.cache.set("b", entry(b"x" * 100))
+        self.cache.set("c", entry(b"x" * 100))
+        self.assertIsNone(self.cache.get("a"))
+        self.assertIsNotNone(self.cache.get("b"))
+        self.assertIsNotNone(self.cache.get("c"))
+
+    def test_promotes_disk_hits_to_memory(self):
+        cache = ResultCache(memory_max_bytes=100, disk_directory=self.directory.name, disk_max_bytes=400)
+        self.cache.set("a", entry(b"body"))
+        self.assertIsNone(cache.memory.get("a"))
+        self.assertEqual(cache.get("a").body, b"body")
+        self.assertEqual(cache.memory.get("a").body, b"body")
+
+
+class TestCachedResponse(unittest.TestCase):
+    def test_streamed_responses_are_not_buffered(self):
+        cache = ResultCache(memory_max_bytes=1024)
+        consumed = []
+
+        def chunks():
+            consumed.append(True)
+            yield b"body"
+
+        @cached_response(cache)
+        def view():
+            return Flask.response_class(chunks(), headers={"Content-Length": "4"})
+
+        with Flask(__name__).test_request_context("/", method="POST", data=b"request"):
+            response = view()
+        self.assertEqual(response.headers["X-Cache"], "MISS")
+        self.assertEqual(consumed, [])
+        self.assertEqual(cache.memory.size, 0)
+        self.assertEqual(b"".join(response.response), b"body")
+
+
+class TestCachedEndpoints(unittest.TestCase):
+    def setUp(self):
+        app.testing = True
+        self.client = app.test_client()
+
+    def test_validate_excel_hit_and_miss(self):
+        responses = []
+        for _ in range(2):
+            with open("MinimalDataModelExample.xlsx", "rb") as file:
+                data = {"file": (file, "MinimalDataModelExample.xlsx"), "marker": "cache-test"}
+                responses.append(
+                    self.client.post("/validate-excel?cache-test", content_type="multipart/form-data", data=data)
+                )
+        self.assertEqual(responses[0].headers["X-Cache"], "MISS")
+        self.assertEqual(responses[1].headers["X-Cache"], "HIT")
+        self.assertEqual(responses[0].data, responses[1].data)
+        self.assertEqual(responses[1].content_type, "application/json")
+
+    def test_json_key_depends_on_body(self):
+        first = self.client.post("/validate-json?cache-test", json={"code": "first"})
+        second = self.client.post("/validate-json?cache-test", json={"code": "second"})
+        self.assertEqual(first.headers["X-Cache"], "MISS")
+        self.assertEqual(second.headers["X-Cache"], "MISS")
+        again = self.client.post("/validate-json?cache-test", json={"code": "first"})
+        self.assertEqual(again.headers["X-Cache"], "HIT")
+        self.assertEqual(again.status_code, 400)
+
+    def test_upload_key_depends_on_filename(self):
+        # The same tab-separated bytes fail to read as CSV and are read as TSV.
+        content = "\t".join(["name", "code", "type", "values", "unit", "description", "comments", "conceptPath"])
+        responses = [
+            self.client.post(
+                "/validate-excel?cache-test",
+                content_type="multipart/form-data",
+                data={"file": (BytesIO(content.encode()), filename)},
+            )
+            for filename in ("model.csv", "model.tsv", "model.csv")
+        ]
+        self.assertEqual([response.headers["X-Cache"] for response in responses], ["MISS", "MISS", "HIT"])
+        self.assertNotEqual(responses[0].get_json(), responses[1].get_json())
+        self.assertEqual(responses[0].get_json(), responses[2].get_json())
+
+    def test_json_to_excel_hit_and_miss(self):
+        with open("MinimalDataModelExample.json") as file:
+            data_model = json.load(file)
+        responses = [self.client.post("/json-to-excel?cache-test", json=data_model) for _ in range(2)]
+        self.assertEqual(responses[0].status_code, 200)
+        self.assertEqual(responses[0].headers["X-Cache"], "MISS")
+        self.assertEqual(responses[1].headers["X-Cache"], "HIT")
+        self.assertEqual(responses[0].data, responses[1].data)
+        self.assertEqual(responses[1].mimetype, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
@@ -0,0 +1,82 @@
+import json
+import unittest
+from io import BytesIO
+
+import pandas as pd
+
+from controller import app
+from common_entities import EXCEL_COLUMNS, InvalidDataModelError
+from converter.pipeline import excel_to_data_model
+from converter.row_reader import csv_delimiter, open_csv_rows
+
+
+def example_as_csv(separator=","):
+    df = pd.read_excel("MinimalDataModelExample.xlsx")
+    return df.to_csv(index=False, sep=separator).encode()
+
+
+class TestOpenCsvRows(unittest.TestCase):
+
+    def test_rows(self):
+        stream = BytesIO("﻿name,code,,code\nVariable,V1,,NA\n,,,\nOther,\"V,2\"\n\n".encode())
+        with open_csv_rows(stream) as (columns, rows):
+            self.assertEqual(columns, ["name", "code", "Unnamed: 2", "code.1"])
+            self.assertEqual(
+                list(rows),
+                [
+                    {"name": "Variable", "code": "V1", "Unnamed: 2": None, "code.1": None},
+                    {"name": None, "code": None, "Unnamed: 2": None, "code.1": None},
+                    {"name": "Other", "code": "V,2", "Unnamed: 2": None, "code.1": None},
+                ],
+            )
+        self.assertFalse(stream.closed)
+
+    def test_invalid_encoding(self):
+        with self.assertRaises(InvalidDataModelError):
+            with open_csv_rows(BytesIO(b"name\n\xff\n")) as (columns, rows):
+                list(rows)
+
+    def test_csv_and_tsv_convert_like_the_workbook(self):
+        with open("MinimalDataModelExample.xlsx", "rb") as file:
+            expected = excel_to_data_model(file)
+        for filename, separator in (("model.csv", ","), ("model.tsv", "\t")):
+            with self.subTest(filename=filename):
+                data_model = excel_to_data_model(BytesIO(example_as_csv(separator)), filename=filename)
+                self.assertEqual(data_model, expected)
+
+    def test_delimiter_detection(self):
+        self.assertEqual(csv_delimiter("model.CSV", None), ",")
+        self.assertEqual(csv_delimiter("model", "text/tab-separated-values; charset=utf-8"), "\t")
+        self.assertEqual(csv_delimiter("model.csv", "text/tab-separated-values"), "\t")
+        self.assertIsNone(csv_delimiter("model.xlsx", "application/octet-stream"))
+
+
+class TestCsvEndpoints(unittest.TestCase):
+    def setUp(self):
+        app.testing = True
+        self.client = app.test_client()
+
+    def test_excel_to_json(self):
+        data = {"file": (BytesIO(example_as_csv()), "model.csv")}
+        response = self.client.post("/excel-to-json", content_type="multipart/form-data", data=data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)["code"], "Minimal Example")
+
+    def test_validate_excel(self):
+        data = {"file": (BytesIO(b"name,code\nVariable,V1\n"), "model.csv", "text/csv")}
+        response = self.client.post("/validate-excel", content_type="multipart/form-data", data=data)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Mismatch in Excel columns", response.json["error"])
+
+    def test_nominal_without_values(self):
+        row = {"name": "Nominal", "code": "N1", "type": "nominal", "conceptPath": "Model/N1"}
+        content = ",".join(EXCEL_COLUMNS) + "\n" + ",".join(row.get(column, "") for column in EXCEL_COLUMNS) + "\n"
+        # /excel-to-json reports every error as a 500, but as JSON like /validate-excel.
+        for url, status_code in (("/validate-excel", 400), ("/excel-to-json", 500)):
+            with self.subTest(url=url):
+                data = {"file": (BytesIO(content.encode()), "model.csv")}
+                response = self.client.post(url, content_type="multipart/form-data", data=data)
+                self.assertEqual(response.status_code, status_code)
+                self.assertEqual(
+                    response.json["error"], "On :N1 got: The 'values' should not be empty when type is 'nominal'."
+                )
@@ -0,0 +1,79 @@
+import json
+import unittest
+from io import BytesIO
+
+import openpyxl
+import pandas as pd
+
+from converter.excel_to_json import convert_excel_rows_to_json, convert_excel_to_json
+from converter.row_reader import normalise_cell, open_excel_rows, parse_header
+from validator.excel_validator import validate_excel_rows
+
+
+def build_workbook(rows):
+    workbook = openpyxl.Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    stream = BytesIO()
+    workbook.save(stream)
+    stream.seek(0)
+    return stream
+
+
+class TestOpenExcelRows(unittest.TestCase):
+
+    def test_rows_match_read_excel(self):
+        stream = build_workbook(
+            [
+                ["name", "code", None, "code"],
+                ["Variable", "V1", None, "NA"],
+                [None, None, None, None],
+                ["Other", "V2", "x", "y"],
+                [None, None, None, None],
+            ]
+        )
+        with open_excel_rows(stream) as (columns, rows):
+            rows = list(rows)
+        stream.seek(0)
+        df = pd.read_excel(stream, engine="openpyxl").astype(str).replace("nan", None)
+        self.assertEqual(columns, list(df.columns))
+        self.assertEqual(rows, df.to_dict("records"))
+
+    def test_normalise_cell(self):
+        self.assertIsNone(normalise_cell(None))
+        self.assertIsNone(normalise_cell("N/A"))
+        self.assertEqual(normalise_cell("0-100"), "0-100")
+        self.assertEqual(normalise_cell(5.0), "5")
+        self.assertEqual(normalise_cell(2.5), "2.5")
+        self.assertEqual(normalise_cell(True), "True")
+
+    def test_numbers_do_not_depend_on_their_column(self):
+        # A deliberate difference with pandas, which reads a column of integers with blanks as floats.
+        stream = build_workbook([["name", "unit"], ["a", 5], ["b", None], ["c", 2.5]])
+        with open_excel_rows(stream) as (columns, rows):
+            self.assertEqual([row["unit"] for row in rows], ["5", None, "2.5"])
+        stream.seek(0)
+        df = pd.read_excel(stream, engine="openpyxl").astype(str).replace("nan", None)
+        self.assertEqual(df["unit"].tolist(), ["5.0", None, "2.5"])
+
+    def test_parse_header(self):
+        self.assertEqual(
+            parse_header(["a", None, "a", "a", None, None]),
+            ["a", "Unnamed: 1", "a.1", "a.2"],
+        )
+
+    def test_minimal_example_matches_dataframe_path(self):
+        with open("MinimalDataModelExample.xlsx", "rb") as file:
+            stream = BytesIO(file.read())
+        with open_excel_rows(stream) as (columns, rows):
+            validate_excel_rows(columns, rows)
+        with open_excel_rows(stream) as (columns, rows):
+            streamed = convert_excel_rows_to_json(rows)
+        stream.seek(0)
+        df = pd.read_excel(stream, engine="openpyxl")
+        self.assertEqual(json.dumps(streamed), json.dumps(convert_excel_to_json(df)))
+
+    def test_empty_workbook(self):
+        with open_excel_rows(build_workbook([])) as (columns, rows):
+            self.assertEqual(columns, [])
+            self.assertEqual(list(rows), [])
@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+import unittest
+
+from controller import app
+from converter.table_writer import iter_csv_chunks, iter_ndjson_chunks
+
+COLUMNS = ["code", "values", "conceptPath"]
+ROWS = [["V1", '{"a","A, or B"}', "G/V1"], ["V2", "", "G/V2"]]
+
+
+class TestTableWriter(unittest.TestCase):
+
+    def test_csv(self):
+        content = b"".join(iter_csv_chunks(COLUMNS, iter(ROWS))).decode()
+        self.assertEqual(list(csv.reader(io.StringIO(content))), [COLUMNS] + ROWS)
+
+    def test_ndjson(self):
+        content = b"".join(iter_ndjson_chunks(COLUMNS, iter(ROWS))).decode()
+        self.assertEqual(
+            [json.loads(line) for line in content.splitlines()],
+            [dict(zip(COLUMNS, row)) for row in ROWS],
+        )
+
+    def test_chunks_follow_the_rows(self):
+        rows = ([f"V{index}", "", "G"] for index in range(1000))
+        chunks = list(iter_ndjson_chunks(COLUMNS, rows, chunk_size=1024))
+        self.assertGreater(len(chunks), 10)
+        self.assertTrue(all(chunk.endswith(b"\n") for chunk in chunks))
+
+
+class TestJsonToExcelFormats(unittest.TestCase):
+    def setUp(self):
+        app.testing = True
+        self.client = app.test_client()
+        with open("MinimalDataModelExample.json") as file:
+            self.json_data = json.load(file)
+
+    def test_format_query_parameter(self):
+        response = self.client.post("/json-to-excel?format=csv", json=self.json_data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+        self.assertEqual([row["code"] for row in rows], ["dataset", "group_variable", "nested_group_variable"])
+
+    def test_accept_header(self):
+        response = self.client.post(
+            "/json-to-excel", json=self.json_data, headers={"Accept": "application/x-ndjson"}
+        )
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        self.assertEqual(json.loads(response.data.splitlines()[0])["code"], "dataset")
+
+    def test_xlsx_by_default(self):
+        response = self.client.post("/json-to-excel", json=self.json_data, headers={"Accept": "*/*"})
+        self.assertEqual(
+            response.mimetype, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+    def test_rows_that_cannot_be_exported(self):
+        for enumerations in ([{"code": "a"}], [{"code": 1, "label": "One"}]):
+            self.json_data["variables"][0]["enumerations"] = enumerations
+            for export_format in ("csv", "ndjson"):
+                with self.subTest(enumerations=enumerations, format=export_format):
+                    response = self.client.post(f"/json-to-excel?format={export_format}", json=self.json_data)
+                    self.assertEqual(response.status_code, 500)
+                    self.assertIn("error", response.get_json())
+
+    def test_unsupported_format(self):
+        response = self.client.post("/json-to-excel?format=pdf", json=self.json_data)
+        self.assertEqual(response.status_code, 400)
@@ -257,4 +257,46 @@ class TestController(unittest.TestCase):
 
             response_data = response.json
             self.assertIn("error", response_data)
-            self.assertEqual("Missing value for required column 'name'.", response_data["error"])
\ No newline at end of file
+            self.assertEqual("Missing value for required column 'name'.", response_data["error"])
+
+    def test_validate_json_collect_errors(self):
+        with open("MinimalDataModelExample.json", "r") as file:
+            json_data = json.load(file)
+
+        del json_data["code"]
+        json_data["version"] = ""
+        response = self.client.post(
+            "/validate-json?collect_errors=true&max_errors=5", json=json_data, content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [error["message"] for error in response.json["errors"]],
+            [
+                "Missing 'code' in DataModel",
+                "'version' in DataModel must be a non-empty string",
+                "Group missing 'code' field at ''",
+            ],
+        )
+        self.assertFalse(response.json["truncated"])
+
+    def test_validate_json_not_an_object(self):
+        for query in ("", "?collect_errors=true"):
+            with self.subTest(query=query):
+                response = self.client.post(f"/validate-json{query}", json=[1, 2])
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("The DataModel must be a dictionary", response.get_data(as_text=True))
+
+    def test_validate_excel_collect_errors(self):
+        with open("MinimalDataModelError.xlsx", "rb") as file:
+            data = {"file": (file, "MinimalDataModelError.xlsx")}
+            response = self.client.post(
+                "/validate-excel?collect_errors=true", content_type="multipart/form-data", data=data
+            )
+            self.assertEqual(response.status_code, 400)
+            error = response.json["errors"][0]
+            self.assertEqual(
+                (error["row"], error["rule"], error["message"]),
+                (2, "required_column", "Missing value for required column 'name'."),
+            )
+
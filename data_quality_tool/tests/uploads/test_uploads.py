@@ -0,0 +1,87 @@
+import io
+import os
+import unittest
+from io import BytesIO
+
+from flask import request
+
+from controller import app
+from uploads import SpooledUploadRequest, is_xlsx
+
+TEST_DIR = os.path.dirname(os.path.dirname(__file__))
+
+
+class TestSpooledUploadRequest(unittest.TestCase):
+
+    def file_stream(self, size):
+        with app.test_request_context(
+            "/", method="POST", data={"file": (BytesIO(b"x" * size), "data.xlsx")}
+        ):
+            return type(request.files["file"].stream)
+
+    def test_small_uploads_stay_in_memory(self):
+        self.assertTrue(issubclass(app.request_class, SpooledUploadRequest))
+        self.assertIs(self.file_stream(100), BytesIO)
+
+    def test_large_uploads_are_spooled(self):
+        previous = app.config["UPLOAD_SPOOL_MAX_BYTES"]
+        app.config["UPLOAD_SPOOL_MAX_BYTES"] = 1000
+        try:
+            self.assertIs(self.file_stream(2000), io.BufferedRandom)
+        finally:
+            app.config["UPLOAD_SPOOL_MAX_BYTES"] = previous
+
+    def test_is_xlsx(self):
+        stream = BytesIO(b"PK\x03\x04rest")
+        self.assertTrue(is_xlsx(stream))
+        self.assertEqual(stream.tell(), 0)
+        self.assertFalse(is_xlsx(BytesIO(b"<html>")))
+        self.assertFalse(is_xlsx(BytesIO(b"")))
+
+
+class TestUploadEndpoints(unittest.TestCase):
+    def setUp(self):
+        app.testing = True
+        self.client = app.test_client()
+
+    def test_spooled_workbook_is_converted(self):
+        previous = app.config["UPLOAD_SPOOL_MAX_BYTES"]
+        app.config["UPLOAD_SPOOL_MAX_BYTES"] = 0
+        try:
+            with open(os.path.join(TEST_DIR, "MinimalDataModelExample.xlsx"), "rb") as file:
+                response = self.client.post("/validate-excel", data={"file": (file, "spooled.xlsx")})
+        finally:
+            app.config["UPLOAD_SPOOL_MAX_BYTES"] = previous
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {"message": "Data model is valid."})
+
+    def test_non_workbook_is_rejected(self):
+        for endpoint in ("/excel-to-json", "/validate-excel", "/jobs/excel-to-json"):
+            with self.subTest(endpoint=endpoint):
+                response = self.client.post(
+                    endpoint, data={"file": (BytesIO(b"<html>not a workbook</html>"), "model.xlsx")}
+                )
+                self.assertEqual(response.status_code, 415)
+                self.assertIn("Unsupported file type", response.json["error"])
+
+    def test_csv_is_accepted(self):
+        response = self.client.post(
+            "/validate-excel", data={"file": (BytesIO(b"name,code\n"), "model.csv")}
+        )
+        self.assertNotEqual(response.status_code, 415)
+
+    def test_oversize_body_is_rejected(self):
+        previous = app.config["MAX_CONTENT_LENGTH"]
+        app.config["MAX_CONTENT_LENGTH"] = 1000
+        try:
+            response = self.client.post(
+                "/excel-to-json", data={"file": (BytesIO(b"PK\x03\x04" + b"x" * 2000), "model.xlsx")}
+            )
+        finally:
+            app.config["MAX_CONTENT_LENGTH"] = previous
+        self.assertEqual(response.status_code, 413)
+        self.assertIn("1000 bytes", response.json["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
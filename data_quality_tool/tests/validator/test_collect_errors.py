@@ -0,0 +1,191 @@
+import copy
+import unittest
+
+from common_entities import EXCEL_COLUMNS, InvalidDataModelError
+from controller import app
+from datamodel.model import load_json
+from validator.excel_validator import collect_excel_errors
+from validator.json_validator import collect_json_errors, validate_json
+
+
+def make_row(**fields):
+    return {column: fields.get(column) for column in EXCEL_COLUMNS}
+
+
+class TestCollectExcelErrors(unittest.TestCase):
+
+    def test_collects_every_violation_with_row_numbers(self):
+        rows = [
+            make_row(name="ok", code="ok", type="text", conceptPath="G/ok"),
+            make_row(code="A", type="invalid", conceptPath="G//A"),
+            make_row(name="b", code="B", type="integer", values="9-1", conceptPath="G/B"),
+            make_row(name="c", code="C", type="nominal", values='{"x", "X"}, {"x", "Y"}', conceptPath="G/C"),
+        ]
+        errors = collect_excel_errors(EXCEL_COLUMNS, iter(rows)).errors
+        self.assertEqual(
+            [(error["row"], error["code"], error["rule"]) for error in errors],
+            [
+                (3, "A", "required_column"),
+                (3, "A", "type"),
+                (3, "A", "concept_path"),
+                (4, "B", "min_max"),
+                (5, "C", "enumerations"),
+            ],
+        )
+        self.assertEqual(errors[0]["message"], "Missing value for required column 'name'.")
+
+    def test_not_a_dictionary(self):
+        for data_model in ([1, 2], "model", 42):
+            with self.subTest(data_model=data_model):
+                self.assertEqual(
+                    collect_json_errors(data_model).errors,
+                    [{"path": "", "rule": "data_model", "message": "The DataModel must be a dictionary"}],
+                )
+
+    def test_max_errors(self):
+        rows = [make_row(code=f"V{i}", type="text", conceptPath="G/V") for i in range(10)]
+        errors = collect_excel_errors(EXCEL_COLUMNS, iter(rows), max_errors=3)
+        self.assertEqual(len(errors.errors), 3)
+        self.assertTrue(errors.truncated)
+
+    def test_columns_mismatch(self):
+        errors = collect_excel_errors(["name"], iter([]))
+        self.assertEqual([error["rule"] for error in errors.errors], ["columns"])
+
+    def test_valid_rows(self):
+        rows = [make_row(name="n", code="N", type="nominal", values='{"a", "A"}', conceptPath="G/N")]
+        errors = collect_excel_errors(EXCEL_COLUMNS, iter(rows))
+        self.assertFalse(errors)
+        self.assertEqual(errors.to_dict(), {"errors": [], "truncated": False})
+
+
+class TestCollectJsonErrors(unittest.TestCase):
+
+    def setUp(self):
+        self.data_model = {
+            "code": "DM",
+            "version": "1.0",
+            "label": "Data Model",
+            "variables": [
+                {"code": "dataset", "sql_type": "text", "isCategorical": True, "type": "nominal",
+                 "enumerations": [{"code": "d", "label": "D"}]},
+            ],
+            "groups": [
+                {
+                    "code": "group",
+                    "variables": [
+                        {"code": "v1", "sql_type": "int", "isCategorical": False, "type": "integer",
+                         "minValue": 5, "maxValue": 1},
+                        {"code": "dataset", "sql_type": "text", "isCategorical": True, "type": "nominal",
+                         "enumerations": [{"code": "d", "label": "D"}]},
+                    ],
+                    "groups": [{"code": "group", "variables": [{"code": "v2", "type": "text"}]}],
+                }
+            ],
+        }
+
+    def test_collects_every_violation_with_paths(self):
+        errors = collect_json_errors(self.data_model).errors
+        self.assertEqual(
+            [(error["path"], error["rule"]) for error in errors],
+            [
+                ("/groups/0/variables/0", "common_data_element"),
+                ("/groups/0/variables/1", "cde_code"),
+                ("/groups/0/groups/0", "group_code"),
+                ("/groups/0/groups/0/variables/0", "common_data_element"),
+            ],
+        )
+        self.assertEqual(
+            errors[0]["message"], "'minValue' >= 'maxValue' in CommonDataElement at '/DM/group/v1'"
+        )
+
+    def test_data_model_fields_and_longitudinal(self):
+        del self.data_model["version"]
+        self.data_model["longitudinal"] = True
+        self.data_model["groups"] = []
+        messages = [error["message"] for error in collect_json_errors(self.data_model).errors]
+        self.assertEqual(
+            messages,
+            [
+                "Missing 'version' in DataModel",
+                "'groups' in DataModel must be a non-empty list of dictionaries",
+                "Missing 'subjectid' for a longitudinal study at 'DataModel'",
+                "Missing 'visitid' that meets the required conditions for a longitudinal study at 'DataModel'",
+            ],
+        )
+
+    def test_not_a_dictionary(self):
+        for data_model in ([1, 2], "model", 42):
+            with self.subTest(data_model=data_model):
+                self.assertEqual(
+                    collect_json_errors(data_model).errors,
+                    [{"path": "", "rule": "data_model", "message": "The DataModel must be a dictionary"}],
+                )
+
+    def test_same_errors_on_a_loaded_model(self):
+        variants = {"as is": lambda data_model: None}
+        variants.update({
+            "no version": lambda data_model: data_model.pop("version"),
+            "blank code": lambda data_model: data_model.update(code=" "),
+            "groups not a list": lambda data_model: data_model.update(groups={"code": "group"}),
+            "variables holding a string": lambda data_model: data_model["variables"].append("dataset"),
+            "sub groups not a list": lambda data_model: data_model["groups"][0].update(groups="none"),
+            "group holding a number": lambda data_model: data_model["groups"][0]["groups"].append(1),
+            "cde holding a list": lambda data_model: data_model["groups"][0]["variables"].append([]),
+            "enumerations not a list": lambda data_model: data_model["variables"][0].update(enumerations="d"),
+            "longitudinal": lambda data_model: data_model.update(longitudinal=True),
+        })
+        for name, change in variants.items():
+            with self.subTest(name):
+                self.setUp()
+                change(self.data_model)
+                expected = collect_json_errors(copy.deepcopy(self.data_model)).to_dict()
+                self.assertEqual(collect_json_errors(load_json(self.data_model)).to_dict(), expected)
+                with self.assertRaises(InvalidDataModelError) as first:
+                    validate_json(copy.deepcopy(self.data_model))
+                with self.assertRaises(InvalidDataModelError) as error:
+                    validate_json(load_json(self.data_model))
+                self.assertEqual(str(error.exception), str(first.exception))
+
+    def test_codes_that_are_lists_or_objects(self):
+        self.data_model["code"] = ["DM"]
+        self.data_model["groups"][0]["groups"][0]["code"] = {"code": "group"}
+        self.data_model["groups"][0]["variables"][0]["code"] = ["v1"]
+        self.data_model["groups"][0]["variables"][0]["type"] = ["integer"]
+        errors = collect_json_errors(self.data_model).errors
+        self.assertEqual(
+            [(error["path"], error["rule"]) for error in errors],
+            [
+                ("", "data_model"),
+                ("", "group_code"),
+                ("/groups/0/variables/0", "cde_code"),
+                ("/groups/0/variables/0", "common_data_element"),
+                ("/groups/0/variables/1", "cde_code"),
+                ("/groups/0/groups/0", "group_code"),
+                ("/groups/0/groups/0/variables/0", "common_data_element"),
+            ],
+        )
+        self.assertEqual(errors[1]["message"], "Group 'code' must be a string at ''")
+
+    def test_bounds_that_are_not_numbers(self):
+        self.data_model["groups"][0]["variables"][0]["minValue"] = "1"
+        errors = collect_json_errors(self.data_model).errors
+        self.assertEqual(errors[0]["path"], "/groups/0/variables/0")
+        self.assertEqual(
+            errors[0]["message"], "'minValue' and 'maxValue' must be numbers in CommonDataElement at '/DM/group/v1'"
+        )
+
+    def test_endpoint_reports_them(self):
+        self.data_model["groups"][0]["variables"][0].update(code=["v1"], minValue="1")
+        self.data_model["groups"][0]["groups"][0]["code"] = ["group"]
+        client = app.test_client()
+        for query in ("?collect_errors=true", ""):
+            with self.subTest(query=query):
+                response = client.post(f"/validate-json{query}", json=self.data_model)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.mimetype, "application/json")
+
+    def test_max_errors(self):
+        errors = collect_json_errors(self.data_model, max_errors=2)
+        self.assertEqual(len(errors.errors), 2)
+        self.assertTrue(errors.truncated)
@@ -0,0 +1,26 @@
+import unittest
+
+from validator.json_validator import count_cdes
+
+
+class TestCountCdes(unittest.TestCase):
+
+    def test_nested_groups(self):
+        data_model = {
+            "code": "dm",
+            "variables": [{"code": "dataset"}],
+            "groups": [
+                {"code": "g", "variables": [{"code": "a"}], "groups": [{"code": "h", "variables": [{"code": "b"}]}]},
+            ],
+        }
+        self.assertEqual(count_cdes(data_model), 3)
+
+    def test_without_top_level_cdes_or_groups(self):
+        # Converted models lose the 'variables' and 'groups' that clean_empty_fields found empty.
+        self.assertEqual(count_cdes({"code": "dm", "groups": [{"code": "g", "variables": [{"code": "a"}]}]}), 1)
+        self.assertEqual(count_cdes({"code": "dm", "variables": [{"code": "dataset"}]}), 1)
+        self.assertEqual(count_cdes({"code": "dm"}), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
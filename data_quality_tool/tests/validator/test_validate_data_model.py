@@ -481,3 +481,43 @@ class TestValidateDataModel(unittest.TestCase):
             "'groups' in DataModel must contain only dictionaries",
         ):
             validate_json(data_model)
+
+    def deep_data_model(self, depth):
+        data_model = {
+            "code": "DM001",
+            "version": "1.0",
+            "label": "Test Data Model",
+            "variables": [
+                {
+                    "code": "dataset",
+                    "sql_type": "text",
+                    "isCategorical": True,
+                    "type": "nominal",
+                    "enumerations": ["dataset1"],
+                }
+            ],
+            "groups": [],
+        }
+        group = data_model
+        for level in range(depth):
+            sub_group = {"code": f"group{level}", "variables": [], "groups": []}
+            group["groups"].append(sub_group)
+            group = sub_group
+        return data_model, group
+
+    def test_deep_hierarchy(self):
+        # Nesting far beyond the recursion limit is walked without recursing
+        data_model, deepest = self.deep_data_model(5000)
+        deepest["variables"].append(
+            {"code": "V001", "sql_type": "int", "isCategorical": False, "type": "integer"}
+        )
+        validate_json(data_model)
+
+    def test_deep_hierarchy_error_path(self):
+        data_model, deepest = self.deep_data_model(3)
+        deepest["variables"].append({"code": "V001", "sql_type": "int", "isCategorical": False})
+        with self.assertRaisesRegex(
+            InvalidDataModelError,
+            "Missing 'type' in CommonDataElement at '/DM001/group0/group1/group2/V001'",
+        ):
+            validate_json(data_model)
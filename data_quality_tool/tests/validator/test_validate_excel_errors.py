@@ -0,0 +1,54 @@
+import unittest
+
+import pandas as pd
+
+from common_entities import EXCEL_COLUMNS
+from validator.excel_validator import InvalidDataModelError, validate_excel
+
+
+VALID_ROWS = [
+    {"name": "n1", "code": "N1", "type": "nominal", "values": '{"a", "A"}', "conceptPath": "G/N1"},
+    {"name": "i1", "code": "I1", "type": "integer", "values": "1-10", "conceptPath": "G/I1"},
+    {"name": "r1", "code": "R1", "type": "real", "values": "0.5-1.5", "conceptPath": "G/H/R1"},
+    {"name": "t1", "code": "T1", "type": "text", "conceptPath": "G/T1"},
+]
+
+
+class TestValidateExcelErrors(unittest.TestCase):
+
+    def assert_error(self, rows, message):
+        with self.assertRaises(InvalidDataModelError) as context:
+            validate_excel(pd.DataFrame(rows, columns=EXCEL_COLUMNS))
+        self.assertEqual(str(context.exception), message)
+
+    def test_valid_rows(self):
+        validate_excel(pd.DataFrame(VALID_ROWS, columns=EXCEL_COLUMNS))
+
+    def test_first_failing_row_is_reported(self):
+        rows = [dict(row) for row in VALID_ROWS]
+        rows[1]["values"] = "10-1"
+        rows[0]["values"] = '{"a", "A"}, {"a", "B"}'
+        self.assert_error(
+            rows, "On :N1 got: Duplicate codes found in enumeration values codes=['a', 'a']."
+        )
+
+    def test_inverted_range(self):
+        rows = [dict(row) for row in VALID_ROWS]
+        rows[2]["values"] = "1.5-0.5"
+        self.assert_error(
+            rows,
+            "On :R1 got: Min value must be smaller than max value min_value='1.5' and max_value='0.5'.",
+        )
+
+    def test_missing_required_value_takes_precedence(self):
+        rows = [dict(row) for row in VALID_ROWS]
+        del rows[3]["name"]
+        rows[3]["conceptPath"] = "invalid//path"
+        self.assert_error(rows, "On :T1 got: Missing value for required column 'name'.")
+
+    def test_invalid_concept_path(self):
+        rows = [dict(row) for row in VALID_ROWS]
+        rows[3]["conceptPath"] = "/T1"
+        self.assert_error(
+            rows, "On :T1 got: ConceptPath format error: 'characters/characters/...' expected."
+        )
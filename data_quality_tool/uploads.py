@@ -0,0 +1,63 @@
+"""
+Handling of the uploaded sheets: small uploads stay in memory, larger ones are spooled to a
+temporary file, and uploads that are neither a workbook nor a CSV/TSV sheet are rejected before
+any work is done on them.
+"""
+import tempfile
+from functools import wraps
+from io import BytesIO
+
+from flask import Request, current_app, jsonify, request
+
+from converter.row_reader import csv_delimiter
+from instrumentation import timed
+
+UPLOAD_SPOOL_MAX_BYTES = 10 * 1024 * 1024
+# The local file header that every xlsx workbook, a zip archive, starts with.
+XLSX_SIGNATURE = b"PK\x03\x04"
+
+
+class SpooledUploadRequest(Request):
+    """
+    A request whose uploaded files are parsed into memory when the body is at most the
+    UPLOAD_SPOOL_MAX_BYTES setting of the app, and into an anonymous temporary file otherwise,
+    or when its size is unknown.
+    """
+
+    @property
+    def spool_max_bytes(self):
+        if current_app:
+            return current_app.config.get("UPLOAD_SPOOL_MAX_BYTES", UPLOAD_SPOOL_MAX_BYTES)
+        return UPLOAD_SPOOL_MAX_BYTES
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= self.spool_max_bytes:
+            return BytesIO()
+        return tempfile.TemporaryFile("wb+")
+
+
+def is_xlsx(stream):
+    """Whether an uploaded stream starts like a workbook. The stream is rewound."""
+    signature = stream.read(len(XLSX_SIGNATURE))
+    stream.seek(0)
+    return signature == XLSX_SIGNATURE
+
+
+def is_sheet(file):
+    """Whether an upload is an xlsx workbook, by its first bytes, or a CSV/TSV sheet, by its content type or extension."""
+    return csv_delimiter(file.filename, file.mimetype) is not None or is_xlsx(file.stream)
+
+
+def sheet_upload(view):
+    """Rejects the requests with an uploaded file that is not a sheet with a 415 response."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # Reading the multipart body is the upload, the sheet itself is only parsed by the view.
+        with timed("upload"):
+            files = request.files
+        if any(file.filename and not is_sheet(file) for _, file in files.items(multi=True)):
+            return jsonify({"error": "Unsupported file type, expected an .xlsx workbook or a CSV/TSV sheet"}), 415
+        return view(*args, **kwargs)
+
+    return wrapper
@@ -1,27 +1,25 @@
-import json
 import re
 import pandas as pd
 
 from common_entities import InvalidDataModelError, REQUIRED_COLUMNS, EXCEL_COLUMNS, \
-    EXCEL_TYPE_2_SQL_TYPE_ISCATEGORICAL_MAP
+    EXCEL_TYPE_2_SQL_TYPE_ISCATEGORICAL_MAP, parse_enumerations, DEFAULT_MAX_ERRORS, ErrorLimitReached, \
+    EnumerationSyntaxError, ValidationErrors
+
+# The header is the first row of the sheet, so the first data row is the second one.
+FIRST_DATA_ROW = 2
 
 # Regex for validation
 CONCEPT_PATH_PATTERN = r"^[^/]+(/[^/]+)*$"
+CONCEPT_PATH_REGEX = re.compile(CONCEPT_PATH_PATTERN)
 
 
 def validate_enumerations(values):
-    # Transform the string to a JSON-compatible format
-    try:
-        # Transforming {"key","value"} into [{"key": "value"}]
-        transformed_values = "[" + values.replace('","', '":"').replace('", "', '": "') + "]"
-        enumerations = json.loads(transformed_values)
-    except json.JSONDecodeError:
-        raise InvalidDataModelError(
-            'Nominal values format error: \'{"code", "label"}, {"code", "label"}\' expected but got ' + values + "."
-        )
-    codes = [code for _enum in enumerations for code, label in _enum.items()]
+    """Validate the nominal values and return them parsed, see common_entities.parse_enumerations."""
+    enumerations = parse_enumerations(values)
+    codes = [code for code, label in enumerations]
     if len(codes) != len(set(codes)):
         raise InvalidDataModelError(f"Duplicate codes found in enumeration values {codes=}.")
+    return enumerations
 
 
 def validate_min_max(values):
@@ -43,14 +41,17 @@ def validate_min_max(values):
 
 def validate_concept_path(concept_path):
     """Validate the format of conceptPath values."""
-    if not re.match(CONCEPT_PATH_PATTERN, concept_path):
+    if not CONCEPT_PATH_REGEX.match(concept_path):
         raise InvalidDataModelError(
             "ConceptPath format error: 'characters/characters/...' expected."
         )
 
 
 def validate_variable_type(row):
-    """Validate the type and values of a variable based on its type."""
+    """
+    Validate the type and values of a variable based on its type.
+    Returns the parsed enumerations of a nominal variable, None otherwise.
+    """
     type_val = row.get("type")
     valid_excel_types = EXCEL_TYPE_2_SQL_TYPE_ISCATEGORICAL_MAP.keys()
     if type_val not in valid_excel_types:
@@ -59,31 +60,114 @@ def validate_variable_type(row):
             f"Invalid 'type': {type_val}. Valid types: {valid_types_str}."
         )
     if type_val == "nominal":
-        validate_enumerations(row.get("values", ""))
+        if row.get("values") is None:
+            raise InvalidDataModelError("The 'values' should not be empty when type is 'nominal'.")
+        return validate_enumerations(row["values"])
     elif type_val in ["real", "integer"] and row.get("values"):
         validate_min_max(row["values"])
+    return None
 
 
 def validate_variable(row):
-    """Validate required columns, variable type, and conceptPath for a single row."""
+    """
+    Validate required columns, variable type, and conceptPath for a single row.
+    Returns the parsed enumerations of a nominal variable, None otherwise.
+    """
     try:
         for required_col in REQUIRED_COLUMNS:
             if pd.isnull(row[required_col]) or row[required_col] is None:
                 raise InvalidDataModelError(
                     f"Missing value for required column '{required_col}'."
                 )
-        validate_variable_type(row)
+        enumerations = validate_variable_type(row)
         validate_concept_path(row["conceptPath"])
     except InvalidDataModelError as e:
         raise InvalidDataModelError(f"On :{row['code']} got: {e}")
+    return enumerations
 
 
-def validate_excel(df):
-    """Validate the structure and data of an Excel file represented as a DataFrame."""
-    df = df.astype(str).replace("nan", None)
-    if set(df.columns) != set(EXCEL_COLUMNS):
-        missing_excel_columns = set(EXCEL_COLUMNS) - set(df.columns)
+def validate_columns(columns):
+    """Validate that the sheet has exactly the expected columns."""
+    if set(columns) != set(EXCEL_COLUMNS):
+        missing_excel_columns = set(EXCEL_COLUMNS) - set(columns)
         raise InvalidDataModelError(
             "Mismatch in Excel columns. Missing columns: " + ", ".join(missing_excel_columns)
         )
+
+
+def validate_excel(df):
+    """Validate the structure and data of an Excel file represented as a DataFrame."""
+    df = df.astype(str).replace("nan", None)
+    validate_columns(df.columns)
     df.apply(validate_variable, axis=1)
+
+
+def validate_excel_rows(columns, rows):
+    """Validate the structure and data of an Excel file streamed as rows by converter.row_reader."""
+    validate_columns(columns)
+    for row in rows:
+        validate_variable(row)
+
+
+def collect_variable_errors(row, row_number, errors):
+    """Checks every rule on a single row, adding each violation to errors instead of raising."""
+    code = row.get("code")
+
+    def check(rule, validation, *args):
+        try:
+            validation(*args)
+        except EnumerationSyntaxError as e:
+            errors.add(rule, str(e), row=row_number, code=code, offset=e.position)
+        except InvalidDataModelError as e:
+            errors.add(rule, str(e), row=row_number, code=code)
+
+    for required_col in REQUIRED_COLUMNS:
+        if pd.isnull(row[required_col]):
+            errors.add(
+                "required_column",
+                f"Missing value for required column '{required_col}'.",
+                row=row_number,
+                code=code,
+            )
+
+    type_val = row.get("type")
+    values = row.get("values")
+    if type_val is not None and type_val not in EXCEL_TYPE_2_SQL_TYPE_ISCATEGORICAL_MAP:
+        valid_types_str = ", ".join(EXCEL_TYPE_2_SQL_TYPE_ISCATEGORICAL_MAP)
+        errors.add(
+            "type", f"Invalid 'type': {type_val}. Valid types: {valid_types_str}.", row=row_number, code=code
+        )
+    elif type_val == "nominal":
+        if values is None:
+            errors.add(
+                "enumerations",
+                "The 'values' should not be empty when type is 'nominal'.",
+                row=row_number,
+                code=code,
+            )
+        else:
+            check("enumerations", validate_enumerations, values)
+    elif type_val in ["real", "integer"] and values:
+        check("min_max", validate_min_max, values)
+
+    if row["conceptPath"] is not None:
+        check("concept_path", validate_concept_path, row["conceptPath"])
+
+
+def collect_excel_errors(columns, rows, max_errors=DEFAULT_MAX_ERRORS):
+    """
+    Validates an Excel file streamed as rows without stopping at the first error.
+    Returns the ValidationErrors found, at most max_errors of them, with their sheet row numbers.
+    """
+    errors = ValidationErrors(max_errors)
+    try:
+        try:
+            validate_columns(columns)
+        except InvalidDataModelError as e:
+            errors.add("columns", str(e))
+            return errors
+        for row_number, row in enumerate(rows, start=FIRST_DATA_ROW):
+            collect_variable_errors(row, row_number, errors)
+    except ErrorLimitReached:
+        pass
+    return errors
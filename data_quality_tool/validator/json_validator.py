@@ -1,4 +1,5 @@
-from common_entities import InvalidDataModelError
+from common_entities import InvalidDataModelError, DEFAULT_MAX_ERRORS, ErrorLimitReached, ValidationErrors
+from datamodel.model import JSON_OBJECT_TYPES
 
 TYPE_2_SQL = {
     "nominal": ("text", True),
@@ -8,6 +9,15 @@ TYPE_2_SQL = {
 }
 
 
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def is_code(value):
+    """Whether a value can be told apart from other codes, i.e. is not a JSON list or object."""
+    return not isinstance(value, (list, *JSON_OBJECT_TYPES))
+
+
 def validate_common_data_element(cde, path):
     required_fields = ["code", "sql_type", "isCategorical", "type"]
 
@@ -17,7 +27,7 @@ def validate_common_data_element(cde, path):
                 f"Missing '{field}' in CommonDataElement at '{path}'"
             )
     type_key = cde.get("type")
-    if type_key not in TYPE_2_SQL:
+    if not isinstance(type_key, str) or type_key not in TYPE_2_SQL:
         raise InvalidDataModelError(
             f"Invalid 'type' in CommonDataElement at '{path}'. Must be one of {list(TYPE_2_SQL.keys())}"
         )
@@ -39,141 +49,188 @@ def validate_common_data_element(cde, path):
         )
 
     if cde.get("minValue") is not None and cde.get("maxValue") is not None:
+        if not is_number(cde["minValue"]) or not is_number(cde["maxValue"]):
+            raise InvalidDataModelError(
+                f"'minValue' and 'maxValue' must be numbers in CommonDataElement at '{path}'"
+            )
         if cde["minValue"] >= cde["maxValue"]:
             raise InvalidDataModelError(
                 f"'minValue' >= 'maxValue' in CommonDataElement at '{path}'"
             )
 
 
+class LazyPath:
+    """
+    A '/'-separated path, kept as a link to its parent path and only joined into a string
+    when it is formatted into an error message. The root parent is a plain string prefix.
+    """
+
+    __slots__ = ("parent", "segment")
+
+    def __init__(self, parent, segment):
+        self.parent = parent
+        self.segment = segment
+
+    def __str__(self):
+        segments, node = [], self
+        while isinstance(node, LazyPath):
+            segments.append(str(node.segment))
+            node = node.parent
+        segments.append(node)
+        return "/".join(reversed(segments))
+
+
+class FailFast:
+    """Stands in for ValidationErrors where only the first violation matters, raising it at once."""
+
+    def add(self, rule, message, **location):
+        error = InvalidDataModelError(message)
+        error.rule = rule
+        raise error
+
+
+def is_dataset_cde(cde):
+    return cde.get("code") == "dataset" and cde.get("sql_type") == "text" and bool(cde.get("isCategorical"))
+
+
+def walk_groups(
+    root, path, errors, seen_codes, seen_group_codes, pointer="", validate_cde=validate_common_data_element
+):
+    """
+    Validates a group and all its sub groups in a single depth-first walk over an explicit stack,
+    so that deep concept hierarchies do not hit the recursion limit. Each violation is added to
+    errors along with its JSON pointer. The codes of the CommonDataElements are added to seen_codes,
+    and each of them is checked with validate_cde. Groups and CommonDataElements are JSON objects
+    or the elements of a datamodel.model.DataModel, read alike.
+    Returns whether a dataset CommonDataElement was found.
+    """
+    dataset_present = False
+    stack = [(root, path, pointer)]
+    while stack:
+        group, path, pointer = stack.pop()
+        nested = group is not root
+        group_code = group.get("code")
+        if not group_code:
+            errors.add("group_code", f"Group missing 'code' field at '{path}'", path=str(pointer))
+        elif not is_code(group_code):
+            errors.add("group_code", f"Group 'code' must be a string at '{path}'", path=str(pointer))
+        elif group_code in seen_group_codes:
+            errors.add(
+                "group_code", f"Duplicate Group code '{group_code}' found at '{path}'", path=str(pointer)
+            )
+        if is_code(group_code):
+            seen_group_codes.add(group_code)
+        updated_path = LazyPath(path, group_code)
+
+        variables = group.get("variables") or []
+        if not isinstance(variables, list):
+            if nested:
+                errors.add(
+                    "group", f"'variables' of Group at '{updated_path}' must be a list", path=str(pointer)
+                )
+            variables = []
+        for index, variable in enumerate(variables):
+            if not isinstance(variable, JSON_OBJECT_TYPES):
+                if nested:
+                    errors.add(
+                        "common_data_element",
+                        f"CommonDataElement in Group '{group_code}' at '{updated_path}' must be a dictionary",
+                        path=f"{pointer}/variables/{index}",
+                    )
+                continue
+            code = variable.get("code")
+            if not is_code(code):
+                errors.add(
+                    "cde_code",
+                    f"CommonDataElement 'code' must be a string in Group '{group_code}' at '{updated_path}'",
+                    path=f"{pointer}/variables/{index}",
+                )
+            elif code in seen_codes:
+                errors.add(
+                    "cde_code",
+                    f"Duplicate CommonDataElement code '{code}' found in Group '{group_code}' at '{updated_path}'",
+                    path=f"{pointer}/variables/{index}",
+                )
+            else:
+                seen_codes.add(code)
+            dataset_present = dataset_present or is_dataset_cde(variable)
+            try:
+                validate_cde(variable, LazyPath(updated_path, code))
+            except InvalidDataModelError as e:
+                errors.add("common_data_element", str(e), path=f"{pointer}/variables/{index}")
+
+        groups = group.get("groups") or []
+        if not isinstance(groups, list):
+            if nested:
+                errors.add("group", f"'groups' of Group at '{updated_path}' must be a list", path=str(pointer))
+            groups = []
+        groups_pointer = LazyPath(pointer, "groups")
+        # Pushed in reverse, so that sub groups are visited in order.
+        for index in range(len(groups) - 1, -1, -1):
+            sub_group = groups[index]
+            if isinstance(sub_group, JSON_OBJECT_TYPES):
+                stack.append((sub_group, updated_path, LazyPath(groups_pointer, index)))
+            elif nested:
+                errors.add(
+                    "group",
+                    f"Group in '{updated_path}' must be a dictionary",
+                    path=f"{groups_pointer}/{index}",
+                )
+    return dataset_present
+
+
 def validate_group(group, path, seen_codes=None, seen_group_codes=None):
     if seen_codes is None:
         seen_codes = set()
     if seen_group_codes is None:
         seen_group_codes = set()
-
-    group_code = group.get("code")
-    if not group_code:
-        raise InvalidDataModelError(f"Group missing 'code' field at '{path}'")
-    if group_code in seen_group_codes:
-        raise InvalidDataModelError(
-            f"Duplicate Group code '{group_code}' found at '{path}'"
-        )
-    seen_group_codes.add(group_code)
-
-    updated_path = f"{path}/{group_code}"
-
-    for variable in group.get("variables") or []:
-        code = variable.get("code")
-        if code in seen_codes:
-            raise InvalidDataModelError(
-                f"Duplicate CommonDataElement code '{code}' found in Group '{group_code}' at '{updated_path}'"
-            )
-        seen_codes.add(code)
-        validate_common_data_element(variable, f"{updated_path}/{code}")
-
-    for sub_group in group.get("groups") or []:
-        validate_group(
-            sub_group,
-            updated_path,
-            seen_codes,
-            seen_group_codes,
-        )
+    walk_groups(group, path, FailFast(), seen_codes, seen_group_codes)
 
 
 def validate_json(data_model):
-    required_fields = ["code", "version", "label", "variables", "groups"]
-
-    for field in required_fields:
-        if field not in data_model:
-            raise InvalidDataModelError(f"Missing '{field}' in DataModel")
-
-    # Ensure 'code', 'version', and 'label' are not empty strings
-    for field in ["code", "version", "label"]:
-        if not isinstance(data_model[field], str) or not data_model[field].strip():
-            raise InvalidDataModelError(
-                f"'{field}' in DataModel must be a non-empty string"
-            )
-
-    # Validate 'variables' and 'groups' are non-empty lists of dictionaries
-    if not isinstance(data_model["variables"], list) or not data_model["variables"]:
-        raise InvalidDataModelError(
-            "'variables' in DataModel must be a non-empty list of dictionaries"
-        )
-    if not all(isinstance(var, dict) for var in data_model["variables"]):
-        raise InvalidDataModelError(
-            "'variables' in DataModel must contain only dictionaries"
-        )
-
-    if not isinstance(data_model["groups"], list) or not data_model["groups"]:
-        raise InvalidDataModelError(
-            "'groups' in DataModel must be a non-empty list of dictionaries"
-        )
-    if not all(isinstance(group, dict) for group in data_model["groups"]):
-        raise InvalidDataModelError(
-            "'groups' in DataModel must contain only dictionaries"
-        )
-
-    # Initialize sets for tracking seen codes and group codes
+    """
+    Raises an InvalidDataModelError for the first violation of the DataModel. Code uniqueness,
+    the dataset CommonDataElement and the longitudinal ones are all checked in a single walk.
+    """
+    errors = FailFast()
+    if not isinstance(data_model, JSON_OBJECT_TYPES):
+        errors.add("data_model", "The DataModel must be a dictionary", path="")
+    collect_data_model_field_errors(data_model, errors)
     seen_codes, seen_group_codes = set(), set()
+    dataset_present = walk_groups(data_model, "", errors, seen_codes, seen_group_codes)
+    collect_data_model_content_errors(data_model, dataset_present, seen_codes, errors)
 
-    validate_group(data_model, "", seen_codes, seen_group_codes)
 
-    if not contains_required_dataset(data_model["variables"], data_model["groups"]):
-        raise InvalidDataModelError(
-            "The data model must always contain a dataset CommonDataElement"
-        )
+def iter_variables(variables, groups):
+    """Yields the variables of a group and of all its sub groups, depth first, without recursion."""
+    stack = [(variables, groups)]
+    while stack:
+        variables, groups = stack.pop()
+        yield from variables
+        stack.extend((group.get("variables", []), group.get("groups", [])) for group in reversed(groups))
 
-    if data_model.get("longitudinal"):
-        validate_longitudinal_elements(
-            data_model["variables"], data_model["groups"], path="DataModel"
-        )
 
+def count_cdes(data_model):
+    """
+    Counts the CommonDataElements of a DataModel, in all its groups. The 'variables' and 'groups' that
+    clean_empty_fields dropped from a converted model count as empty.
+    """
+    return sum(1 for _ in iter_variables(data_model.get("variables", []), data_model.get("groups", [])))
 
-def contains_required_dataset(variables, groups, path=""):
-    # Check for a 'dataset' CDE in variables
-    dataset_present = any(
-        v.get("code") == "dataset"
-        and v.get("sql_type") == "text"
-        and v.get("isCategorical")
-        for v in variables
-    )
-    if dataset_present:
-        return True
-
-    # Recursively check in nested groups
-    for i, group in enumerate(groups, start=1):
-        if contains_required_dataset(
-            group.get("variables", []),
-            group.get("groups", []),
-            path=f"{path}/groups[{i}]",
-        ):
-            return True
 
-    return False
+def contains_required_dataset(variables, groups, path=""):
+    return any(is_dataset_cde(v) for v in iter_variables(variables, groups))
 
 
 def validate_longitudinal_elements(variables, groups, path):
-    # Check for 'subjectid' and 'visitid' in the top level
-    subjectid_present = any(v.get("code") == "subjectid" for v in variables)
-    visitid_present = any(v.get("code") == "visitid" for v in variables)
-
-    if not subjectid_present or not visitid_present:
-        # If either is missing at the top level, check in nested groups
-        for i, group in enumerate(groups, start=1):
-            group_path = f"{path}/groups[{i}]"
-            subjectid_present = subjectid_present or has_valid_cde_in_group(
-                "subjectid", group, group_path
-            )
-            visitid_present = visitid_present or has_valid_cde_in_group(
-                "visitid", group, group_path
-            )
+    codes = {v.get("code") for v in iter_variables(variables, groups)}
 
-    if not subjectid_present:
+    if "subjectid" not in codes:
         raise InvalidDataModelError(
             f"Missing 'subjectid' for a longitudinal study at '{path}'"
         )
 
-    if not visitid_present:
+    if "visitid" not in codes:
         raise InvalidDataModelError(
             f"Missing 'visitid' that meets the required conditions for a longitudinal study at '{path}'"
         )
@@ -181,13 +238,67 @@ def validate_longitudinal_elements(variables, groups, path):
 
 def has_valid_cde_in_group(cde_code, group, path):
     """Check for a valid CommonDataElement within a group or nested groups."""
-    valid_cde_found = any(v.get("code") == cde_code for v in group.get("variables", []))
-    if valid_cde_found:
-        return True
+    return any(
+        v.get("code") == cde_code
+        for v in iter_variables(group.get("variables", []), group.get("groups", []))
+    )
+
+
+def collect_data_model_field_errors(data_model, errors):
+    """Checks the top level fields of the DataModel, adding each violation to errors."""
+    required_fields = ["code", "version", "label", "variables", "groups"]
+
+    for field in required_fields:
+        if field not in data_model:
+            errors.add("data_model", f"Missing '{field}' in DataModel", path="")
+
+    for field in ["code", "version", "label"]:
+        if field in data_model and (
+            not isinstance(data_model[field], str) or not data_model[field].strip()
+        ):
+            errors.add("data_model", f"'{field}' in DataModel must be a non-empty string", path="")
+
+    for field in ["variables", "groups"]:
+        if field not in data_model:
+            continue
+        if not isinstance(data_model[field], list) or not data_model[field]:
+            errors.add(
+                "data_model", f"'{field}' in DataModel must be a non-empty list of dictionaries", path=""
+            )
+        elif not all(isinstance(item, JSON_OBJECT_TYPES) for item in data_model[field]):
+            errors.add("data_model", f"'{field}' in DataModel must contain only dictionaries", path="")
+
+
+def collect_data_model_content_errors(data_model, dataset_present, found_codes, errors):
+    """Checks the CommonDataElements the DataModel must contain, once its groups have been walked."""
+    if not dataset_present:
+        errors.add("dataset", "The data model must always contain a dataset CommonDataElement", path="")
+    if data_model.get("longitudinal"):
+        if "subjectid" not in found_codes:
+            errors.add("longitudinal", "Missing 'subjectid' for a longitudinal study at 'DataModel'", path="")
+        if "visitid" not in found_codes:
+            errors.add(
+                "longitudinal",
+                "Missing 'visitid' that meets the required conditions for a longitudinal study at 'DataModel'",
+                path="",
+            )
 
-    # Recursively check in nested groups
-    for i, nested_group in enumerate(group.get("groups", []), start=1):
-        if has_valid_cde_in_group(cde_code, nested_group, path=f"{path}/groups[{i}]"):
-            return True
 
-    return False
+def collect_json_errors(data_model, max_errors=DEFAULT_MAX_ERRORS):
+    """
+    Validates a DataModel without stopping at the first error, walking its groups once.
+    Returns the ValidationErrors found, at most max_errors of them, located by JSON pointer.
+    """
+    errors = ValidationErrors(max_errors)
+    if not isinstance(data_model, JSON_OBJECT_TYPES):
+        # Nothing else can be checked in a model that is not an object.
+        errors.add("data_model", "The DataModel must be a dictionary", path="")
+        return errors
+    try:
+        collect_data_model_field_errors(data_model, errors)
+        seen_codes, seen_group_codes = set(), set()
+        dataset_present = walk_groups(data_model, "", errors, seen_codes, seen_group_codes)
+        collect_data_model_content_errors(data_model, dataset_present, seen_codes, errors)
+    except ErrorLimitReached:
+        pass
+    return errors